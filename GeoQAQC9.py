@@ -1,22 +1,30 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
-from io import StringIO, BytesIO
+from io import StringIO
 import base64
 import re
-import os
-from datetime import datetime
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-import tempfile
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import seaborn as sns
+from geoqaqc_io import (
+    SEPARATORS, read_csv_sample, guess_numeric_columns, read_csv_chunked,
+    list_excel_sheets, read_excel_sheets
+)
+from geoqaqc_cache import UploadCache, AnalysisMemo, content_hash, frame_fingerprint, analysis_key
+from geoqaqc_engine import (
+    REGRESSION_METHODS, analyze_crm, analyze_blanks, analyze_blank_carryover, analyze_duplicates, analyze_crm_multi,
+    analyze_crm_grouped, analyze_duplicate_rows, DUPLICATE_ROW_FIELDS, compact_results, renamed_view,
+    COMPACT_FLOAT32_MIN_ROWS,
+    LOD_METHODS, LOD_GROUPINGS, LOD_GROUP_NONE, LOD_GROUP_BATCH, LOD_GROUP_PERIOD, LOD_PERIODS,
+    default_element_params, default_standard_params, restore_params, validate_element_params
+)
+from geoqaqc_charts import (
+    build_crm_figure, build_blank_figure, build_duplicate_figure,
+    build_crm_multi_figures, build_crm_multi_figure, build_crm_grouped_figure, build_crm_history_figure,
+    build_hard_figure, build_thompson_howarth_figure, build_carryover_figure, SCATTER_MODES
+)
+from geoqaqc_catalog import load_catalog
+from geoqaqc_history import CRMHistory, state_summary
+from geoqaqc_rules import RULES_COLUMN, RULE_DESCRIPTIONS
+from geoqaqc_bootstrap import DEFAULT_RESAMPLES, add_crm_intervals, add_blank_intervals, add_duplicate_intervals
+from geoqaqc_logo import get_logo_png
 
 # Configuration de la page
 st.set_page_config(
@@ -38,187 +46,6 @@ def make_valid_id(column_name):
     # Remplacer les caractères non alphanumériques par des underscores
     return re.sub(r'\W+', '_', column_name).lower()
 
-# Fonction pour mapper les colonnes
-def map_columns(df, mapping_dict):
-    # Créer un nouveau DataFrame avec les colonnes mappées
-    mapped_df = pd.DataFrame()
-    
-    for target_col, source_col in mapping_dict.items():
-        if source_col in df.columns:
-            mapped_df[target_col] = df[source_col]
-    
-    return mapped_df
-
-# Fonction pour générer un logo géologique
-def generate_geology_logo():
-    # Créer une figure matplotlib
-    fig, ax = plt.subplots(figsize=(2, 2), dpi=150)
-    
-    # Définir un fond beige clair
-    ax.set_facecolor('#f5f2e9')
-    
-    # Créer un cercle qui représente une coupe géologique
-    circle = plt.Circle((0.5, 0.5), 0.4, fill=False, edgecolor='#8c6d46', linewidth=2.5)
-    ax.add_patch(circle)
-    
-    # Ajouter quelques lignes de stratification
-    for i in range(5):
-        y = 0.3 + i * 0.08
-        ax.plot([0.1, 0.9], [y, y], color='#8c6d46', linewidth=1.5, linestyle='-')
-    
-    # Ajouter un symbole représentant un cristal/minéral
-    crystal_x = [0.5, 0.6, 0.5, 0.4, 0.5]
-    crystal_y = [0.7, 0.5, 0.3, 0.5, 0.7]
-    ax.fill(crystal_x, crystal_y, color='#3a7359', alpha=0.8)
-    
-    # Ajouter des points représentant des minéraux
-    for i in range(8):
-        x = 0.2 + 0.6 * np.random.random()
-        y = 0.2 + 0.6 * np.random.random()
-        size = 20 + 30 * np.random.random()
-        ax.scatter(x, y, color='#b5651d', s=size, alpha=0.7, zorder=3)
-    
-    # Supprimer les axes
-    ax.set_xlim(0, 1)
-    ax.set_ylim(0, 1)
-    ax.axis('off')
-    
-    # Convertir la figure en image
-    buf = BytesIO()
-    fig.savefig(buf, format='png', bbox_inches='tight', transparent=True)
-    plt.close(fig)
-    buf.seek(0)
-    
-    return buf
-
-# Fonction pour exporter un graphique Plotly en PNG
-def export_plotly_to_png(fig):
-    img_bytes = fig.to_image(format="png", width=1200, height=800, scale=2)
-    return img_bytes
-
-# Fonction pour exporter un DataFrame en PDF
-def export_to_pdf(title, fig, stats_dict, results_df, author="Didier Ouedraogo, P.Geo"):
-    # Créer un fichier temporaire pour le PDF
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-        temp_filename = tmp.name
-    
-    # Créer un document PDF
-    doc = SimpleDocTemplate(temp_filename, pagesize=A4)
-    styles = getSampleStyleSheet()
-    
-    # Créer des styles personnalisés
-    title_style = ParagraphStyle(
-        'TitleStyle', 
-        parent=styles['Heading1'], 
-        fontSize=16, 
-        spaceAfter=12
-    )
-    subtitle_style = ParagraphStyle(
-        'SubtitleStyle', 
-        parent=styles['Heading2'], 
-        fontSize=14, 
-        spaceAfter=10
-    )
-    normal_style = styles['Normal']
-    
-    # Liste d'éléments à ajouter au PDF
-    elements = []
-    
-    # Générer le logo
-    logo_buffer = generate_geology_logo()
-    logo_temp = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
-    logo_temp.write(logo_buffer.getvalue())
-    logo_temp.close()
-    
-    # Créer une table pour l'en-tête avec logo
-    logo_img = Image(logo_temp.name, width=0.8*inch, height=0.8*inch)
-    header_data = [[logo_img, Paragraph(f"<b>GeoQAQC - {title}</b>", title_style)]]
-    header_table = Table(header_data, colWidths=[1*inch, 5*inch])
-    header_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('ALIGN', (1, 0), (1, 0), 'LEFT'),
-        ('LEFTPADDING', (0, 0), (0, 0), 0),
-        ('RIGHTPADDING', (0, 0), (0, 0), 10),
-    ]))
-    elements.append(header_table)
-    
-    # Ajouter la date et l'auteur
-    elements.append(Paragraph(f"Date: {datetime.now().strftime('%d-%m-%Y %H:%M')}", normal_style))
-    elements.append(Paragraph(f"Auteur: {author}", normal_style))
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Exporter le graphique en PNG
-    img_bytes = export_plotly_to_png(fig)
-    
-    # Sauvegarder l'image temporairement
-    img_temp = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
-    img_temp.write(img_bytes)
-    img_temp.close()
-    
-    # Ajouter l'image au PDF
-    elements.append(Image(img_temp.name, width=6*inch, height=4*inch))
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Ajouter les statistiques
-    elements.append(Paragraph("Statistiques", subtitle_style))
-    stats_data = [[k, str(v)] for k, v in stats_dict.items()]
-    stats_table = Table(stats_data, colWidths=[3*inch, 3*inch])
-    stats_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('PADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(stats_table)
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Ajouter les résultats
-    elements.append(Paragraph("Résultats détaillés", subtitle_style))
-    
-    # Préparer les données du tableau
-    table_data = [results_df.columns.tolist()]
-    for i, row in results_df.iterrows():
-        table_data.append([str(cell) if not pd.isna(cell) else "" for cell in row.values])
-    
-    # Créer le tableau
-    results_table = Table(table_data, colWidths=None)
-    
-    # Style du tableau
-    style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('PADDING', (0, 0), (-1, -1), 4),
-    ])
-    
-    # Ajouter le style pour les valeurs hors limites
-    if 'Statut' in results_df.columns:
-        for i, row in enumerate(table_data[1:], 1):
-            status_index = results_df.columns.get_loc('Statut')
-            if status_index < len(row) and (row[status_index] == 'Hors limites' or row[status_index] == 'Élevé'):
-                style.add('BACKGROUND', (0, i), (-1, i), colors.lightpink)
-    
-    results_table.setStyle(style)
-    elements.append(results_table)
-    
-    # Ajouter un pied de page
-    elements.append(Spacer(1, 0.3*inch))
-    elements.append(Paragraph(f"GeoQAQC © 2025 - Rapport généré automatiquement", styles['Italic']))
-    
-    # Créer le document PDF
-    doc.build(elements)
-    
-    # Supprimer les fichiers temporaires
-    os.unlink(img_temp.name)
-    os.unlink(logo_temp.name)
-    
-    # Lire le fichier PDF et le retourner comme bytes
-    with open(temp_filename, "rb") as f:
-        pdf_bytes = f.read()
-    
-    # Supprimer le fichier PDF temporaire
-    os.unlink(temp_filename)
-    
-    return pdf_bytes
-
 # Définition des données d'exemple
 def get_crm_example_data():
     data = """Échantillon,Au_ppm,Cu_pct,Ag_ppm
@@ -262,26 +89,147 @@ S-108,DUP-108,2.14,2.20,0.70,0.72
 S-109,DUP-109,2.67,2.60,0.88,0.85"""
     return data
 
-# Fonction pour calculer les limites pour les CRM
-def calculate_crm_limits(reference_value, tolerance_type, tolerance_value, reference_stddev=None):
-    if tolerance_type == "Pourcentage (%)":
-        tolerance = tolerance_value / 100
-        upper_limit = reference_value * (1 + tolerance)
-        lower_limit = reference_value * (1 - tolerance)
-    else:  # Multiple de l'écart-type
-        if reference_stddev is None or reference_stddev == 0:
-            st.error("L'écart-type de référence doit être défini et supérieur à zéro pour utiliser ce type de tolérance.")
-            return None, None
-        upper_limit = reference_value + (tolerance_value * reference_stddev)
-        lower_limit = reference_value - (tolerance_value * reference_stddev)
+# Fonction pour générer des exemples de duplicatas sur des lignes séparées
+def get_duplicate_rows_example_data():
+    data = """Sample_ID,Original_Sample,Au,Cu
+S-100,,2.45,0.82
+DUP-100,S-100,2.38,0.79
+S-101,,3.18,1.05
+DUP-101,S-101,3.26,1.09
+S-102,,1.76,0.58
+DUP-102,S-102,1.70,0.55"""
+    return data
+
+# Cache disque des fichiers importés, partagé entre les sessions
+@st.cache_resource
+def get_upload_cache():
+    return UploadCache()
+
+# Historique persistant des CRM, partagé entre les sessions
+@st.cache_resource
+def get_crm_history():
+    return CRMHistory()
+
+# Fonction pour afficher l'historique enregistré des standards (statistiques cumulées et graphique)
+def show_crm_history(default_standard=None, default_element=None):
+    history = get_crm_history()
+    states = history.series()
+    if not states:
+        st.info("Aucun lot n'a encore été ajouté à l'historique.")
+        return
+    
+    st.dataframe(pd.DataFrame([state_summary(state) for state in states]), hide_index=True, use_container_width=True)
     
-    return lower_limit, upper_limit
+    labels = [f"{state['standard_id']} - {state['element']}" for state in states]
+    default_label = f"{default_standard} - {default_element}"
+    selected = st.selectbox(
+        "Série à afficher:",
+        labels,
+        index=labels.index(default_label) if default_label in labels else 0,
+        key="history_series"
+    )
+    state = states[labels.index(selected)]
+    history_df = history.load(state['standard_id'], state['element'])
+    st.plotly_chart(
+        build_crm_history_figure(history_df, state, f"Historique - {selected}", state['element']),
+        use_container_width=True
+    )
+
+# Fonction pour obtenir l'empreinte d'un fichier téléchargé (calculée une seule fois par fichier)
+def get_upload_digest(uploaded_file):
+    digests = st.session_state.setdefault('upload_digests', {})
+    file_id = getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)
+    if file_id not in digests:
+        digests[file_id] = content_hash(uploaded_file)
+    return digests[file_id]
+
+# Fonction pour lire un fichier téléchargé en passant par le cache columnar
+def read_upload_cached(uploaded_file, params, parse):
+    cache = get_upload_cache()
+    key = cache.make_key(get_upload_digest(uploaded_file), params)
+    df = cache.get(key)
+    if df is None:
+        df = parse()
+        cache.put(key, df)
+    return df
+
+# Fonction pour charger le catalogue local des CRM (partagé entre les sessions, rechargé si le fichier change)
+def get_crm_catalog():
+    try:
+        return load_catalog()
+    except (ValueError, OSError, pd.errors.ParserError) as e:
+        st.warning(f"Le catalogue des CRM n'a pas pu être lu: {e}")
+        return None
+
+# Fonction pour appliquer les valeurs certifiées du standard et de l'élément choisis dans le catalogue
+def apply_catalog_reference():
+    catalog = get_crm_catalog()
+    standard = st.session_state.get('catalog_standard')
+    if catalog is None or standard not in catalog.standards():
+        return
+    
+    elements = catalog.elements(standard)
+    if st.session_state.get('catalog_element') not in elements:
+        st.session_state.catalog_element = elements[0]
+    
+    found = catalog.lookup(standard, st.session_state.catalog_element).iloc[0]
+    st.session_state.reference_value = float(found['certified_value'])
+    st.session_state.reference_stddev = float(found['stddev'])
+
+# Fonction pour afficher le nombre de points signalés par chaque règle de Westgard
+def show_rule_summary(metrics):
+    rule_counts = metrics.get("rule_counts")
+    if not rule_counts:
+        return
+    
+    st.subheader("Règles de Westgard")
+    st.markdown(f"**Points signalés:** {metrics['rule_flagged']}")
+    st.dataframe(pd.DataFrame({
+        "Règle": list(rule_counts),
+        "Description": [RULE_DESCRIPTIONS[rule] for rule in rule_counts],
+        "Points": list(rule_counts.values())
+    }), hide_index=True, use_container_width=True)
+
+# Fonction pour préparer les résultats affichés: colonnes renommées sans copie, float32 pour les grands tableaux
+def display_results(results_df, columns):
+    return compact_results(renamed_view(results_df, columns), float32=len(results_df) >= COMPACT_FLOAT32_MIN_ROWS)
+
+# Fonction pour obtenir le nombre de rééchantillonnages du bootstrap (0 si désactivé)
+def get_bootstrap_resamples():
+    if not st.session_state.get('bootstrap_enabled', False):
+        return 0
+    return int(st.session_state.get('bootstrap_resamples', DEFAULT_RESAMPLES))
+
+# Fonction pour afficher les intervalles de confiance du bootstrap
+def show_bootstrap_intervals(stats):
+    intervals = {name: value for name, value in stats.items() if name.startswith("IC ")}
+    if not intervals:
+        return
+    
+    st.markdown("**Intervalles de confiance (bootstrap):**")
+    st.dataframe(pd.DataFrame({
+        "Statistique": list(intervals),
+        "Intervalle": list(intervals.values())
+    }), hide_index=True, use_container_width=True)
+
+# Configuration des colonnes de l'éditeur des valeurs de référence (par élément ou par standard)
+def params_column_config(label_column, label):
+    return {
+        label_column: st.column_config.TextColumn(label),
+        "reference_value": st.column_config.NumberColumn("Valeur de référence", min_value=0.0, format="%.4f"),
+        "reference_stddev": st.column_config.NumberColumn("Écart-type de référence", min_value=0.0, format="%.4f"),
+        "tolerance_type": st.column_config.SelectboxColumn(
+            "Type de tolérance",
+            options=["Pourcentage (%)", "Multiple de l'écart-type"],
+            required=True
+        ),
+        "tolerance_value": st.column_config.NumberColumn("Tolérance", min_value=0.0, format="%.2f")
+    }
 
 # Auteur et informations - Sidebar
 with st.sidebar:
-    # Générer le logo et l'afficher
-    logo_bytes = generate_geology_logo()
-    st.image(logo_bytes, width=150)
+    # Afficher le logo pré-rendu
+    st.image(get_logo_png(), width=150)
     
     st.markdown("### GeoQAQC")
     st.markdown("*Contrôle Qualité des Analyses Chimiques des Roches*")
@@ -345,6 +293,10 @@ if 'current_stats' not in st.session_state:
     st.session_state.current_stats = {}
 if 'current_results' not in st.session_state:
     st.session_state.current_results = None
+if 'analysis_memo' not in st.session_state:
+    st.session_state.analysis_memo = AnalysisMemo()
+if 'campaign_sections' not in st.session_state:
+    st.session_state.campaign_sections = []
 
 # ===== CONTENU SELON L'ONGLET SÉLECTIONNÉ =====
 if st.session_state.tab == "Type de Contrôle":
@@ -362,6 +314,65 @@ if st.session_state.tab == "Type de Contrôle":
     
     with control_subtabs[0]:
         if control_type == "Standards CRM":
+            # Standard unique, plusieurs colonnes d'éléments (Au, Cu, Ag, ...) ou plusieurs standards intercalés
+            crm_modes = ["Standard unique", "Multi-éléments", "Multi-standards"]
+            crm_mode = st.radio(
+                "Mode d'analyse:",
+                crm_modes,
+                index=crm_modes.index(st.session_state.get('crm_mode', "Standard unique")),
+                horizontal=True,
+                help="Multi-éléments: toutes les colonnes d'éléments d'un même standard. "
+                     "Multi-standards: plusieurs CRM identifiés par une colonne de standard."
+            )
+            st.session_state.crm_mode = crm_mode
+            st.session_state.multi_element_mode = crm_mode == "Multi-éléments"
+            st.session_state.multi_standard_mode = crm_mode == "Multi-standards"
+        
+        if control_type == "Standards CRM" and st.session_state.multi_standard_mode:
+            st.info("Les valeurs certifiées et les tolérances de chaque standard seront saisies à l'étape du mappage des colonnes.")
+            
+            # Chaque ligne est évaluée avec les valeurs certifiées de son propre standard
+            st.session_state.required_fields = {
+                "sample_id": "Identifiant de l'échantillon",
+                "standard_id": "Identifiant du standard",
+                "measured_value": "Valeur mesurée"
+            }
+        
+        elif control_type == "Standards CRM" and st.session_state.multi_element_mode:
+            st.info("Les valeurs de référence et les tolérances de chaque élément seront saisies à l'étape du mappage des colonnes.")
+            
+            # Seul l'identifiant est mappé ici; les colonnes d'éléments sont choisies au mappage
+            st.session_state.required_fields = {
+                "sample_id": "Identifiant de l'échantillon"
+            }
+        
+        elif control_type == "Standards CRM":
+            # Valeurs certifiées proposées par le catalogue local des CRM
+            catalog = get_crm_catalog()
+            catalog_reference = None
+            if catalog is not None and len(catalog):
+                cat_col1, cat_col2 = st.columns(2)
+                with cat_col1:
+                    catalog_standard = st.selectbox(
+                        "Standard du catalogue:",
+                        ["-- Saisie manuelle --"] + catalog.standards(),
+                        key="catalog_standard",
+                        on_change=apply_catalog_reference
+                    )
+                if catalog_standard != "-- Saisie manuelle --":
+                    with cat_col2:
+                        catalog_element = st.selectbox(
+                            "Élément:",
+                            catalog.elements(catalog_standard),
+                            key="catalog_element",
+                            on_change=apply_catalog_reference
+                        )
+                    catalog_reference = catalog.lookup(catalog_standard, catalog_element).iloc[0]
+                    st.caption(
+                        f"Valeur certifiée: {catalog_reference['certified_value']:.4f} {catalog_reference['units']} "
+                        f"(écart-type {catalog_reference['stddev']:.4f})"
+                    )
+            
             col1, col2 = st.columns(2)
             
             with col1:
@@ -434,19 +445,125 @@ if st.session_state.tab == "Type de Contrôle":
             }
         
         elif control_type == "Blancs":
-            # Définir les champs requis pour l'analyse des blancs
-            st.session_state.required_fields = {
-                "sample_id": "Identifiant du blanc",
-                "measured_value": "Valeur mesurée"
-            }
+            # Blancs seuls, ou flux complet des échantillons pour rechercher la contamination par l'échantillon précédent
+            blank_modes = ["Blancs seuls", "Contamination (flux complet)"]
+            blank_mode = st.radio(
+                "Mode d'analyse:",
+                blank_modes,
+                index=blank_modes.index(st.session_state.get('blank_mode', "Blancs seuls")),
+                horizontal=True,
+                help="Contamination: le fichier contient tous les échantillons dans l'ordre d'analyse; "
+                     "chaque blanc est comparé à l'échantillon de routine qui le précède."
+            )
+            st.session_state.blank_mode = blank_mode
+            st.session_state.carryover_mode = blank_mode == "Contamination (flux complet)"
+            
+            if st.session_state.carryover_mode:
+                st.session_state.blank_label = st.text_input(
+                    "Valeur identifiant les blancs dans la colonne du type d'échantillon:",
+                    value=st.session_state.get('blank_label', "BLANK")
+                )
+                
+                # Définir les champs requis pour l'analyse de la contamination
+                st.session_state.required_fields = {
+                    "sample_id": "Identifiant de l'échantillon",
+                    "sample_type": "Type d'échantillon",
+                    "sequence": "Ordre d'analyse (séquence)",
+                    "measured_value": "Valeur mesurée"
+                }
+            else:
+                # Estimateur de la LOD (robuste aux blancs contaminés) et regroupement par lot ou par période
+                lod_col1, lod_col2 = st.columns(2)
+                with lod_col1:
+                    st.session_state.lod_method = st.selectbox(
+                        "Estimateur de la LOD:",
+                        LOD_METHODS,
+                        index=LOD_METHODS.index(st.session_state.get('lod_method', LOD_METHODS[0])),
+                        help="La médiane + 3 MAD, le centile 99 et la moyenne tronquée sont peu sensibles "
+                             "à quelques blancs contaminés."
+                    )
+                with lod_col2:
+                    st.session_state.lod_grouping = st.selectbox(
+                        "Regroupement de la LOD:",
+                        LOD_GROUPINGS,
+                        index=LOD_GROUPINGS.index(st.session_state.get('lod_grouping', LOD_GROUPINGS[0])),
+                        help="Une LOD est calculée pour chaque lot analytique ou chaque période."
+                    )
+                
+                # Définir les champs requis pour l'analyse des blancs
+                st.session_state.required_fields = {
+                    "sample_id": "Identifiant du blanc",
+                    "measured_value": "Valeur mesurée"
+                }
+                
+                if st.session_state.lod_grouping == LOD_GROUP_BATCH:
+                    st.session_state.required_fields["batch_id"] = "Lot analytique"
+                elif st.session_state.lod_grouping == LOD_GROUP_PERIOD:
+                    period_names = list(LOD_PERIODS)
+                    st.session_state.lod_period = st.selectbox(
+                        "Période:",
+                        period_names,
+                        index=period_names.index(st.session_state.get('lod_period', "Semaine"))
+                    )
+                    st.session_state.required_fields["analysis_date"] = "Date d'analyse"
         
         elif control_type == "Duplicatas (nuage de points et régression)":
+            # Paires sur une même ligne, ou originaux et duplicatas sur des lignes séparées (export de laboratoire)
+            duplicate_layouts = ["Paires sur une ligne", "Lignes séparées (identifiant de l'original)"]
+            duplicate_layout = st.radio(
+                "Format des duplicatas:",
+                duplicate_layouts,
+                index=duplicate_layouts.index(st.session_state.get('duplicate_layout', duplicate_layouts[0])),
+                horizontal=True,
+                help="Lignes séparées: chaque duplicata donne l'identifiant de son échantillon original; "
+                     "les lignes sans identifiant parent sont les originaux."
+            )
+            st.session_state.duplicate_layout = duplicate_layout
+            st.session_state.duplicate_rows_mode = duplicate_layout == duplicate_layouts[1]
+            
             # Définir les champs requis pour l'analyse des duplicatas
-            st.session_state.required_fields = {
-                "original_value": "Valeur originale",
-                "duplicate_value": "Valeur dupliquée"
-            }
-        
+            if st.session_state.duplicate_rows_mode:
+                st.session_state.required_fields = dict(DUPLICATE_ROW_FIELDS)
+            else:
+                st.session_state.required_fields = {
+                    "original_value": "Valeur originale",
+                    "duplicate_value": "Valeur dupliquée"
+                }
+            
+            # Méthode de régression (erreurs sur les deux axes: RMA; robuste aux valeurs aberrantes: Theil-Sen)
+            st.session_state.regression_method = st.selectbox(
+                "Méthode de régression:",
+                REGRESSION_METHODS,
+                index=REGRESSION_METHODS.index(st.session_state.get('regression_method', REGRESSION_METHODS[0])),
+                help="Les duplicatas ont une erreur sur les deux axes: l'axe majeur réduit (RMA) ou Theil-Sen "
+                     "évitent le biais des moindres carrés; Theil-Sen est peu sensible aux valeurs aberrantes."
+            )
+            
+            # Rendu du nuage: carte de densité (histogramme 2-D) pour un très grand nombre de paires
+            st.session_state.scatter_mode = st.selectbox(
+                "Rendu du nuage de points:",
+                SCATTER_MODES,
+                index=SCATTER_MODES.index(st.session_state.get('scatter_mode', SCATTER_MODES[0])),
+                help="Densité: les paires sont comptées par classes (carte de chaleur); les paires dont le HARD "
+                     "dépasse 10% restent tracées individuellement. Automatique: densité au-delà de 100 000 paires."
+            )
+
+        # Intervalles de confiance par bootstrap (standard unique, blancs et duplicatas)
+        if not (control_type == "Standards CRM" and crm_mode != "Standard unique"):
+            st.session_state.bootstrap_enabled = st.checkbox(
+                "Calculer les intervalles de confiance (bootstrap)",
+                value=st.session_state.get('bootstrap_enabled', False),
+                help="Intervalles de confiance à 95% par rééchantillonnage (graine fixe: résultats reproductibles)."
+            )
+            if st.session_state.bootstrap_enabled:
+                st.session_state.bootstrap_resamples = st.number_input(
+                    "Nombre de rééchantillonnages:",
+                    min_value=100,
+                    max_value=100000,
+                    value=st.session_state.get('bootstrap_resamples', DEFAULT_RESAMPLES),
+                    step=100
+                )
+
         # Options de titre et auteur
         st.subheader("Personnalisation du rapport")
         
@@ -519,7 +636,10 @@ if st.session_state.tab == "Type de Contrôle":
                 st.rerun()
                 
         elif control_type == "Duplicatas (nuage de points et régression)":
-            example_data = get_duplicate_example_data()
+            if st.session_state.get('duplicate_rows_mode', False):
+                example_data = get_duplicate_rows_example_data()
+            else:
+                example_data = get_duplicate_example_data()
             st.markdown("""
             ### Format attendu pour l'analyse des Duplicatas
             
@@ -536,6 +656,9 @@ if st.session_state.tab == "Type de Contrôle":
             st.markdown("""
             **Note:** Pour les duplicatas, vous devez choisir un élément à analyser (Au, Cu, etc.) et mapper 
             ses colonnes correspondantes (originale et dupliquée) dans l'onglet de mappage.
+            
+            Si l'export du laboratoire liste les originaux et les duplicatas sur des lignes séparées, choisissez 
+            le format "Lignes séparées": chaque duplicata indique l'identifiant de son original.
             """)
             
             if st.button("Utiliser ces données d'exemple", key="use_duplicate_example"):
@@ -565,35 +688,121 @@ elif st.session_state.tab == "Importation des Données":
         
         if uploaded_file is not None:
             file_extension = uploaded_file.name.split(".")[-1].lower()
-            
+
             try:
+                df = None
+
                 if file_extension in ["xlsx", "xls"]:
-                    df = pd.read_excel(uploaded_file)
+                    # Lister les feuilles sans charger les cellules
+                    sheet_names = list_excel_sheets(uploaded_file, file_extension)
+
+                    selected_sheets = st.multiselect(
+                        "Feuilles à importer:",
+                        options=sheet_names,
+                        default=sheet_names[:1],
+                        key="excel_sheets"
+                    )
+
+                    if selected_sheets:
+                        df = read_upload_cached(
+                            uploaded_file,
+                            {"format": "excel", "sheets": selected_sheets},
+                            lambda: read_excel_sheets(uploaded_file, selected_sheets, file_extension)
+                        )
+                    else:
+                        st.warning("Veuillez sélectionner au moins une feuille.")
                 else:
                     separator = st.selectbox(
                         "Séparateur:",
                         [",", ";", "Tab"],
                         key="file_separator"
                     )
-                    
-                    sep_dict = {",": ",", ";": ";", "Tab": "\t"}
-                    if separator == "Tab":
-                        df = pd.read_csv(uploaded_file, sep="\t")
+
+                    streaming_mode = st.checkbox(
+                        "Lecture en continu (gros fichiers)",
+                        value=False,
+                        key="streaming_mode",
+                        help="Lit le fichier par blocs en ne conservant que les colonnes choisies, converties en valeurs numériques au fil de la lecture."
+                    )
+
+                    if streaming_mode:
+                        # Lire seulement l'en-tête et un échantillon pour proposer les colonnes
+                        sample = read_csv_sample(uploaded_file, SEPARATORS[separator])
+
+                        selected_columns = st.multiselect(
+                            "Colonnes à conserver (celles utilisées au mappage):",
+                            options=list(sample.columns),
+                            default=list(sample.columns),
+                            key="streaming_columns"
+                        )
+
+                        numeric_columns = st.multiselect(
+                            "Colonnes numériques:",
+                            options=selected_columns,
+                            default=[c for c in guess_numeric_columns(sample) if c in selected_columns],
+                            key="streaming_numeric_columns"
+                        )
+
+                        if st.button("Charger le fichier", key="load_streaming_file"):
+                            if not selected_columns:
+                                st.error("Veuillez sélectionner au moins une colonne.")
+                            else:
+                                progress_bar = st.progress(0.0, text="Lecture du fichier...")
+
+                                def update_progress(fraction, rows_read):
+                                    if fraction is not None:
+                                        progress_bar.progress(fraction, text=f"Lecture du fichier... {rows_read:,} lignes")
+
+                                df = read_upload_cached(
+                                    uploaded_file,
+                                    {
+                                        "format": "csv",
+                                        "sep": separator,
+                                        "usecols": selected_columns,
+                                        "numeric_columns": numeric_columns
+                                    },
+                                    lambda: read_csv_chunked(
+                                        uploaded_file,
+                                        SEPARATORS[separator],
+                                        usecols=selected_columns,
+                                        numeric_columns=numeric_columns,
+                                        progress_callback=update_progress
+                                    )
+                                )
+                                progress_bar.progress(1.0, text=f"Lecture terminée: {len(df):,} lignes")
+                                st.session_state.streaming_source = uploaded_file.name
+                        elif st.session_state.get('streaming_source') == uploaded_file.name and st.session_state.data is not None:
+                            # Conserver les données déjà chargées lors des réexécutions
+                            df = st.session_state.data
                     else:
-                        df = pd.read_csv(uploaded_file, sep=separator)
-                
-                st.session_state.data = df
-                st.success(f"Fichier chargé avec succès! {len(df)} lignes et {len(df.columns)} colonnes.")
-                st.write("Aperçu des données:")
-                st.dataframe(df.head())
-                
-                # Bouton pour continuer
-                if st.button("Continuer vers le mappage des colonnes", key="continue_to_mapping_file"):
-                    st.session_state.tab = "Mappage des Colonnes"
-                    st.rerun()
-                
+                        df = read_upload_cached(
+                            uploaded_file,
+                            {"format": "csv", "sep": separator},
+                            lambda: pd.read_csv(uploaded_file, sep=SEPARATORS[separator])
+                        )
+
+                if df is not None:
+                    st.session_state.data = df
+                    st.success(f"Fichier chargé avec succès! {len(df)} lignes et {len(df.columns)} colonnes.")
+                    st.write("Aperçu des données:")
+                    st.dataframe(df.head())
+
+                    # Bouton pour continuer
+                    if st.button("Continuer vers le mappage des colonnes", key="continue_to_mapping_file"):
+                        st.session_state.tab = "Mappage des Colonnes"
+                        st.rerun()
+
             except Exception as e:
                 st.error(f"Erreur lors du chargement du fichier: {e}")
+
+        # Statistiques du cache des fichiers importés
+        with st.expander("Cache des fichiers importés"):
+            cache_stats = get_upload_cache().stats()
+            st.markdown(f"**Succès:** {cache_stats['hits']} | **Échecs:** {cache_stats['misses']}")
+            st.markdown(f"**Entrées:** {cache_stats['entries']} | **Taille:** {cache_stats['size_bytes'] / 1024 / 1024:.1f} / {cache_stats['max_bytes'] / 1024 / 1024:.0f} Mo")
+            if st.button("Vider le cache", key="clear_upload_cache"):
+                get_upload_cache().clear()
+                st.rerun()
     
     elif import_method == "Copier-coller des données":
         pasted_data = st.text_area(
@@ -671,7 +880,10 @@ elif st.session_state.tab == "Importation des Données":
                     st.rerun()
         
         elif control_type == "Duplicatas (nuage de points et régression)":
-            example_data = get_duplicate_example_data()
+            if st.session_state.get('duplicate_rows_mode', False):
+                example_data = get_duplicate_rows_example_data()
+            else:
+                example_data = get_duplicate_example_data()
             st.code(example_data, language="text")
             
             if st.button("Utiliser ces données d'exemple", key="use_duplicate_example_import"):
@@ -708,42 +920,175 @@ elif st.session_state.tab == "Mappage des Colonnes":
         
         st.write("Associez les colonnes de vos données aux champs requis par l'application:")
         
-        # Création du formulaire de mappage
-        mapping_form = st.form("column_mapping_form")
+        multi_element = st.session_state.get('control_type') == "Standards CRM" and st.session_state.get('multi_element_mode', False)
         
-        with mapping_form:
-            mapping_dict = {}
+        if multi_element:
+            # Colonnes d'éléments et paramètres de référence par élément
+            previous_mapping = st.session_state.column_mapping if isinstance(st.session_state.get('column_mapping'), dict) else {}
+            default_elements = [c for c in previous_mapping.get('elements', []) if c in df.columns]
+            if not default_elements:
+                default_elements = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+            
+            elements = st.multiselect(
+                "Colonnes d'éléments à analyser:",
+                options=list(df.columns),
+                default=default_elements
+            )
+            
+            element_params = default_element_params(elements)
+            
+            # Valeurs certifiées du standard choisi dans le catalogue (une seule recherche pour tous les éléments)
+            catalog = get_crm_catalog()
+            catalog_standard = None
+            if catalog is not None and len(catalog):
+                catalog_options = ["-- Saisie manuelle --"] + catalog.standards()
+                previous_standard = st.session_state.get('element_params_standard')
+                catalog_standard = st.selectbox(
+                    "Standard du catalogue:",
+                    catalog_options,
+                    index=catalog_options.index(previous_standard) if previous_standard in catalog_options else 0
+                )
+                if catalog_standard == "-- Saisie manuelle --":
+                    catalog_standard = None
+                else:
+                    element_params, found = catalog.fill_params(element_params, catalog_standard, elements)
+                    st.caption(f"{found} élément(s) sur {len(elements)} trouvé(s) dans le catalogue pour {catalog_standard}.")
+            
+            # Reprendre les paramètres déjà saisis pour les éléments conservés (même standard)
+            if st.session_state.get('element_params_standard') == catalog_standard:
+                element_params = restore_params(element_params, st.session_state.get('element_params'))
             
-            for field_id, field_name in st.session_state.required_fields.items():
-                mapping_dict[field_id] = st.selectbox(
-                    f"Champ '{field_name}':",
+            with st.form("element_mapping_form"):
+                sample_column = st.selectbox(
+                    "Champ 'Identifiant de l'échantillon':",
                     options=["-- Sélectionner une colonne --"] + list(df.columns),
-                    key=f"mapping_{field_id}"
+                    key="mapping_sample_id"
                 )
+                
+                st.write("Valeurs de référence et tolérances par élément:")
+                edited_params = st.data_editor(
+                    element_params,
+                    hide_index=True,
+                    use_container_width=True,
+                    disabled=["element"],
+                    column_config=params_column_config("element", "Élément")
+                )
+                
+                submit_button = st.form_submit_button("Appliquer le mappage")
+            
+            if submit_button:
+                if sample_column == "-- Sélectionner une colonne --" or not elements:
+                    st.error("Veuillez sélectionner l'identifiant de l'échantillon et au moins un élément.")
+                elif sample_column in elements:
+                    st.error("La colonne d'identifiant ne peut pas être aussi une colonne d'élément.")
+                else:
+                    try:
+                        validate_element_params(edited_params)
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        mapped_data = df[[sample_column] + elements].rename(columns={sample_column: "sample_id"})
+                        
+                        st.session_state.mapped_data = mapped_data
+                        st.session_state.mapped_fingerprint = frame_fingerprint(mapped_data)
+                        st.session_state.column_mapping = {'sample_id': sample_column, 'elements': elements}
+                        st.session_state.element_params = edited_params.reset_index(drop=True)
+                        st.session_state.element_params_standard = catalog_standard
+                        st.session_state.mapping_done = True
+                        
+                        st.success("Mappage des colonnes effectué avec succès!")
+                        st.write("Aperçu des données mappées:")
+                        st.dataframe(mapped_data.head())
+        
+        else:
+            # Création du formulaire de mappage
+            mapping_form = st.form("column_mapping_form")
+        
+            with mapping_form:
+                mapping_dict = {}
             
-            submit_button = st.form_submit_button("Appliquer le mappage")
+                for field_id, field_name in st.session_state.required_fields.items():
+                    mapping_dict[field_id] = st.selectbox(
+                        f"Champ '{field_name}':",
+                        options=["-- Sélectionner une colonne --"] + list(df.columns),
+                        key=f"mapping_{field_id}"
+                    )
+            
+                submit_button = st.form_submit_button("Appliquer le mappage")
         
-        if submit_button:
-            # Vérifier que toutes les colonnes ont été mappées
-            if all(col != "-- Sélectionner une colonne --" for col in mapping_dict.values()):
-                # Créer un dictionnaire de mappage inversé
-                inverse_mapping = {v: k for k, v in mapping_dict.items()}
+            if submit_button:
+                # Vérifier que toutes les colonnes ont été mappées
+                if all(col != "-- Sélectionner une colonne --" for col in mapping_dict.values()):
+                    # Créer un dictionnaire de mappage inversé
+                    inverse_mapping = {v: k for k, v in mapping_dict.items()}
                 
-                # Créer un DataFrame mappé
-                mapped_data = pd.DataFrame()
+                    # Créer un DataFrame mappé
+                    mapped_data = pd.DataFrame()
                 
-                for source_col, target_field in inverse_mapping.items():
-                    mapped_data[target_field] = df[source_col]
+                    for source_col, target_field in inverse_mapping.items():
+                        mapped_data[target_field] = df[source_col]
                 
-                st.session_state.mapped_data = mapped_data
-                st.session_state.column_mapping = mapping_dict
-                st.session_state.mapping_done = True
+                    st.session_state.mapped_data = mapped_data
+                    st.session_state.mapped_fingerprint = frame_fingerprint(mapped_data)
+                    st.session_state.column_mapping = mapping_dict
+                    st.session_state.mapping_done = True
                 
-                st.success("Mappage des colonnes effectué avec succès!")
-                st.write("Aperçu des données mappées:")
-                st.dataframe(mapped_data.head())
-            else:
-                st.error("Veuillez associer toutes les colonnes requises.")
+                    st.success("Mappage des colonnes effectué avec succès!")
+                    st.write("Aperçu des données mappées:")
+                    st.dataframe(mapped_data.head())
+                else:
+                    st.error("Veuillez associer toutes les colonnes requises.")
+            
+            # Valeurs certifiées de chaque standard présent dans les données (mode multi-standards)
+            multi_standard = st.session_state.get('control_type') == "Standards CRM" and st.session_state.get('multi_standard_mode', False)
+            mapped_data = st.session_state.mapped_data
+            
+            if multi_standard and st.session_state.mapping_done and mapped_data is not None and 'standard_id' in mapped_data.columns:
+                st.subheader("Valeurs certifiées par standard")
+                
+                standards = sorted(mapped_data['standard_id'].dropna().astype(str).unique())
+                standard_params = default_standard_params(standards)
+                
+                # Valeurs certifiées de l'élément mesuré pour tous les standards (une seule jointure sur le catalogue)
+                catalog = get_crm_catalog()
+                catalog_element = None
+                if catalog is not None and len(catalog):
+                    catalog_element = st.text_input(
+                        "Élément dans le catalogue:",
+                        value=st.session_state.get('standard_params_element') or str(st.session_state.column_mapping.get('measured_value', ''))
+                    ).strip() or None
+                    if catalog_element:
+                        standard_params, found = catalog.fill_params(standard_params, standards, catalog_element)
+                        st.caption(f"{found} standard(s) sur {len(standards)} trouvé(s) dans le catalogue.")
+                
+                # Reprendre les valeurs déjà enregistrées (même élément)
+                if st.session_state.get('standard_params_element') == catalog_element:
+                    standard_params = restore_params(
+                        standard_params,
+                        st.session_state.get('standard_params'),
+                        label_column="standard_id"
+                    )
+                
+                with st.form("standard_params_form"):
+                    edited_standards = st.data_editor(
+                        standard_params,
+                        hide_index=True,
+                        use_container_width=True,
+                        disabled=["standard_id"],
+                        column_config=params_column_config("standard_id", "Standard")
+                    )
+                    
+                    save_standards = st.form_submit_button("Enregistrer les valeurs certifiées")
+                
+                if save_standards:
+                    try:
+                        validate_element_params(edited_standards, label_column="standard_id")
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        st.session_state.standard_params = edited_standards.reset_index(drop=True)
+                        st.session_state.standard_params_element = catalog_element
+                        st.success(f"Valeurs certifiées enregistrées pour {len(edited_standards)} standard(s).")
         
         # Afficher ces boutons seulement si le mappage a été effectué avec succès
         if st.session_state.mapping_done:
@@ -776,189 +1121,395 @@ elif st.session_state.tab == "Analyse":
         data = st.session_state.mapped_data
         control_type = st.session_state.control_type
         graph_title = st.session_state.graph_title
-        
+
+        # Résultats mémoïsés selon l'empreinte des données mappées et les paramètres
+        memo = st.session_state.analysis_memo
+        fingerprint = st.session_state.get('mapped_fingerprint') or frame_fingerprint(data)
+
         # Analyse selon le type de contrôle
-        if control_type == "Standards CRM":
-            if st.button("Générer la Carte de Contrôle", key="generate_crm"):
-                # Préparation des données
-                id_column = "sample_id"
-                value_column = "measured_value"
+        if control_type == "Standards CRM" and st.session_state.get('multi_standard_mode', False):
+            standard_params = st.session_state.get('standard_params')
+            original_id_column = st.session_state.column_mapping.get('sample_id', 'Identifiant')
+            original_standard_column = st.session_state.column_mapping.get('standard_id', 'Standard')
+            original_value_column = st.session_state.column_mapping.get('measured_value', 'Valeur')
+            
+            if standard_params is None or 'standard_id' not in data.columns:
+                st.warning("Veuillez mapper la colonne des standards et enregistrer leurs valeurs certifiées dans l'étape 'Mappage des Colonnes'.")
                 
-                analysis_data = data[[id_column, value_column]].copy()
-                analysis_data = analysis_data.dropna()
-                analysis_data[value_column] = pd.to_numeric(analysis_data[value_column], errors='coerce')
-                analysis_data = analysis_data.dropna()
+                if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_grouped_missing"):
+                    st.session_state.tab = "Mappage des Colonnes"
+                    st.rerun()
+            else:
+                memo_key = analysis_key(fingerprint, control_type, {
+                    "multi_standard": True,
+                    "standard_params": standard_params.to_dict("records"),
+                    "title": graph_title,
+                    "columns": [original_id_column, original_standard_column, original_value_column]
+                })
                 
-                if analysis_data.empty:
-                    st.error("Aucune donnée numérique valide trouvée pour l'analyse.")
-                else:
-                    # Récupération des paramètres
-                    reference_value = st.session_state.reference_value
-                    tolerance_type = st.session_state.tolerance_type
+                generate = st.button("Générer les Cartes de Contrôle", key="generate_crm_grouped")
+                analysis = memo.get(memo_key) if generate or memo_key in memo else None
+                
+                if analysis is None and generate:
+                    # Analyse de tous les standards en un seul passage (valeurs certifiées attribuées par ligne)
+                    try:
+                        results_df, stats_dict, metrics = analyze_crm_grouped(data, standard_params)
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        fig = build_crm_grouped_figure(
+                            results_df,
+                            metrics,
+                            f"{graph_title} - {original_value_column}",
+                            original_id_column,
+                            original_value_column
+                        )
+                        
+                        display_df = display_results(results_df, {
+                            'sample_id': original_id_column,
+                            'standard_id': original_standard_column,
+                            'measured_value': original_value_column
+                        })
+                        
+                        analysis = memo.put(memo_key, {
+                            "fig": fig,
+                            "stats": stats_dict,
+                            "metrics": metrics,
+                            "results": display_df,
+                            "styled": display_df.style.apply(
+                                lambda x: ['background-color: #ffcccc' if v == 'Hors limites' else '' for v in x],
+                                subset=['Statut']
+                            ).apply(
+                                lambda x: ['background-color: #ffe5cc' if v else '' for v in x],
+                                subset=[RULES_COLUMN]
+                            )
+                        })
+                
+                if analysis is not None:
+                    metrics = analysis["metrics"]
                     
-                    if tolerance_type == "Pourcentage (%)":
-                        tolerance_value = st.session_state.tolerance_percent
+                    # Stocker le graphique, les statistiques et les résultats pour l'exportation
+                    st.session_state.current_fig = analysis["fig"]
+                    st.session_state.current_stats = analysis["stats"]
+                    st.session_state.current_results = analysis["results"]
+                    
+                    # Afficher le graphique
+                    st.plotly_chart(analysis["fig"], use_container_width=True)
+                    
+                    # Statistiques par standard
+                    st.subheader("Statistiques")
+                    
+                    stats_col1, stats_col2, stats_col3 = st.columns(3)
+                    stats_col1.metric("Standards analysés", analysis["stats"]["Standards analysés"])
+                    stats_col2.metric("Échantillons", analysis["stats"]["Échantillons"])
+                    stats_col3.metric("Échantillons hors limites", analysis["stats"]["Échantillons hors limites"])
+                    
+                    st.dataframe(metrics["standard_stats"], hide_index=True, use_container_width=True)
+                    
+                    show_rule_summary(metrics)
+                    
+                    # Ajout des lignes de chaque standard à son historique persistant
+                    with st.expander("Historique des standards"):
+                        history_element = st.text_input(
+                            "Élément:",
+                            value=original_value_column,
+                            key="history_element_grouped"
+                        ).strip()
+                        
+                        if st.button("Ajouter ce lot à l'historique", key="append_history_grouped"):
+                            batch = analysis["results"].rename(columns={
+                                original_id_column: 'sample_id',
+                                original_standard_column: 'standard_id',
+                                original_value_column: 'measured_value'
+                            })
+                            added = get_crm_history().append_grouped(
+                                batch,
+                                history_element,
+                                dict(zip(standard_params['standard_id'].astype(str), standard_params['reference_stddev']))
+                            )
+                            if added:
+                                st.success(f"{added} valeur(s) ajoutée(s) à l'historique.")
+                            else:
+                                st.info("Ce lot figure déjà dans l'historique.")
+                        
+                        show_crm_history(None, history_element)
+                    
+                    # Tableau de données
+                    st.subheader("Résultats détaillés")
+                    
+                    # Afficher le tableau avec coloration conditionnelle
+                    st.dataframe(analysis["styled"])
+                    
+                    # Boutons de navigation
+                    col1, col2 = st.columns([1, 1])
+                    with col1:
+                        if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_from_grouped"):
+                            st.session_state.tab = "Mappage des Colonnes"
+                            st.rerun()
+                    with col2:
+                        if st.button("Continuer vers l'Exportation →", key="go_to_export_from_grouped"):
+                            st.session_state.tab = "Export"
+                            st.rerun()
+                else:
+                    if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_grouped"):
+                        st.session_state.tab = "Mappage des Colonnes"
+                        st.rerun()
+        
+        elif control_type == "Standards CRM" and st.session_state.get('multi_element_mode', False):
+            element_params = st.session_state.get('element_params')
+            original_id_column = st.session_state.column_mapping.get('sample_id', 'Identifiant')
+            
+            if element_params is None or 'elements' not in st.session_state.column_mapping:
+                st.warning("Le mappage actuel ne contient pas de colonnes d'éléments. Veuillez refaire le mappage en mode multi-éléments.")
+                
+                if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_multi_missing"):
+                    st.session_state.tab = "Mappage des Colonnes"
+                    st.rerun()
+            else:
+                memo_key = analysis_key(fingerprint, control_type, {
+                    "multi_element": True,
+                    "element_params": element_params.to_dict("records"),
+                    "title": graph_title,
+                    "columns": [original_id_column]
+                })
+                
+                generate = st.button("Générer les Cartes de Contrôle", key="generate_crm_multi")
+                analysis = memo.get(memo_key) if generate or memo_key in memo else None
+                
+                if analysis is None and generate:
+                    # Analyse de tous les éléments en un seul passage sur la matrice échantillons × éléments
+                    try:
+                        results_df, stats_dict, metrics = analyze_crm_multi(data, element_params)
+                    except ValueError as e:
+                        st.error(str(e))
                     else:
-                        tolerance_value = st.session_state.tolerance_stddev
+                        figures = build_crm_multi_figures(results_df, metrics, graph_title, original_id_column)
+                        
+                        display_df = display_results(results_df, {'sample_id': original_id_column})
+                        status_columns = [c for c in display_df.columns if c.endswith(" - Statut") or c == "Statut global"]
                         
-                    reference_stddev = st.session_state.reference_stddev if 'reference_stddev' in st.session_state else 0
+                        analysis = memo.put(memo_key, {
+                            # Graphique combiné (une rangée par élément) utilisé pour l'exportation
+                            "fig": build_crm_multi_figure(results_df, metrics, graph_title, original_id_column),
+                            "figures": figures,
+                            "stats": stats_dict,
+                            "metrics": metrics,
+                            "results": display_df,
+                            "styled": display_df.style.apply(
+                                lambda x: ['background-color: #ffcccc' if v == 'Hors limites' else '' for v in x],
+                                subset=status_columns
+                            )
+                        })
+                
+                if analysis is not None:
+                    metrics = analysis["metrics"]
+                    
+                    # Stocker le graphique, les statistiques et les résultats pour l'exportation
+                    st.session_state.current_fig = analysis["fig"]
+                    st.session_state.current_stats = analysis["stats"]
+                    st.session_state.current_results = analysis["results"]
+                    
+                    # Résumé global
+                    st.subheader("Statistiques")
                     
-                    # Calcul des limites
-                    lower_limit, upper_limit = calculate_crm_limits(
+                    stats_col1, stats_col2, stats_col3 = st.columns(3)
+                    stats_col1.metric("Éléments analysés", analysis["stats"]["Éléments analysés"])
+                    stats_col2.metric("Échantillons", analysis["stats"]["Échantillons"])
+                    stats_col3.metric("Échantillons hors limites", analysis["stats"]["Échantillons hors limites (tous éléments)"])
+                    
+                    st.dataframe(metrics["element_stats"], hide_index=True, use_container_width=True)
+                    
+                    # Un graphique par élément
+                    for element, fig in analysis["figures"].items():
+                        st.plotly_chart(fig, use_container_width=True)
+                    
+                    # Tableau de données
+                    st.subheader("Résultats détaillés")
+                    
+                    # Afficher le tableau avec coloration conditionnelle
+                    st.dataframe(analysis["styled"])
+                    
+                    # Boutons de navigation
+                    col1, col2 = st.columns([1, 1])
+                    with col1:
+                        if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_from_multi"):
+                            st.session_state.tab = "Mappage des Colonnes"
+                            st.rerun()
+                    with col2:
+                        if st.button("Continuer vers l'Exportation →", key="go_to_export_from_multi"):
+                            st.session_state.tab = "Export"
+                            st.rerun()
+                else:
+                    if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_multi"):
+                        st.session_state.tab = "Mappage des Colonnes"
+                        st.rerun()
+        
+        elif control_type == "Standards CRM":
+            # Récupération des paramètres
+            reference_value = st.session_state.reference_value
+            tolerance_type = st.session_state.tolerance_type
+
+            if tolerance_type == "Pourcentage (%)":
+                tolerance_value = st.session_state.tolerance_percent
+            else:
+                tolerance_value = st.session_state.tolerance_stddev
+
+            reference_stddev = st.session_state.reference_stddev if 'reference_stddev' in st.session_state else 0
+
+            # Récupérer le nom original de la colonne pour le titre
+            original_id_column = st.session_state.column_mapping.get('sample_id', 'Identifiant')
+            original_value_column = st.session_state.column_mapping.get('measured_value', 'Valeur')
+
+            bootstrap_resamples = get_bootstrap_resamples()
+
+            memo_key = analysis_key(fingerprint, control_type, {
+                "reference_value": reference_value,
+                "reference_stddev": reference_stddev,
+                "tolerance_type": tolerance_type,
+                "tolerance_value": tolerance_value,
+                "bootstrap_resamples": bootstrap_resamples,
+                "title": graph_title,
+                "columns": [original_id_column, original_value_column]
+            })
+
+            generate = st.button("Générer la Carte de Contrôle", key="generate_crm")
+            analysis = memo.get(memo_key) if generate or memo_key in memo else None
+
+            if analysis is None and generate:
+                # Analyse (limites, écarts, z-scores et statuts calculés sur tout le tableau)
+                try:
+                    results_df, stats_dict, metrics = analyze_crm(
+                        data,
                         reference_value,
                         tolerance_type,
                         tolerance_value,
                         reference_stddev
                     )
-                    
-                    if lower_limit is not None and upper_limit is not None:
-                        # Statistiques
-                        values = analysis_data[value_column].values
-                        mean = np.mean(values)
-                        std_dev = np.std(values)
-                        min_val = np.min(values)
-                        max_val = np.max(values)
-                        
-                        # Récupérer le nom original de la colonne pour le titre
-                        original_id_column = st.session_state.column_mapping.get('sample_id', 'Identifiant')
-                        original_value_column = st.session_state.column_mapping.get('measured_value', 'Valeur')
-                        
-                        # Création du graphique avec Plotly
-                        fig = go.Figure()
-                        
-                        # Données mesurées
-                        fig.add_trace(go.Scatter(
-                            x=analysis_data[id_column],
-                            y=analysis_data[value_column],
-                            mode='lines+markers',
-                            name='Valeur mesurée',
-                            line=dict(color='rgb(75, 192, 192)', width=2),
-                            marker=dict(size=8)
-                        ))
-                        
-                        # Valeur de référence
-                        fig.add_trace(go.Scatter(
-                            x=analysis_data[id_column],
-                            y=[reference_value] * len(analysis_data),
-                            mode='lines',
-                            name='Valeur référence',
-                            line=dict(color='rgb(54, 162, 235)', width=2, dash='dash')
-                        ))
-                        
-                        # Limites
-                        fig.add_trace(go.Scatter(
-                            x=analysis_data[id_column],
-                            y=[upper_limit] * len(analysis_data),
-                            mode='lines',
-                            name='Limite supérieure',
-                            line=dict(color='rgb(255, 99, 132)', width=2, dash='dash')
-                        ))
-                        
-                        fig.add_trace(go.Scatter(
-                            x=analysis_data[id_column],
-                            y=[lower_limit] * len(analysis_data),
-                            mode='lines',
-                            name='Limite inférieure',
-                            line=dict(color='rgb(255, 99, 132)', width=2, dash='dash')
-                        ))
-                        
-                        # Mise en forme
-                        fig.update_layout(
-                            title=f"{graph_title} - {original_value_column}",
-                            xaxis_title=original_id_column,
-                            yaxis_title=original_value_column,
-                            height=600,
-                            hovermode="closest"
+                    if bootstrap_resamples:
+                        add_crm_intervals(results_df, stats_dict, metrics, reference_value, bootstrap_resamples)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    # Création du graphique avec Plotly
+                    fig = build_crm_figure(
+                        results_df,
+                        metrics,
+                        f"{graph_title} - {original_value_column}",
+                        original_id_column,
+                        original_value_column
+                    )
+
+                    # Renommer les colonnes du tableau de résultats avec les noms originaux
+                    display_df = display_results(results_df, {
+                        'sample_id': original_id_column,
+                        'measured_value': original_value_column
+                    })
+
+                    analysis = memo.put(memo_key, {
+                        "fig": fig,
+                        "stats": stats_dict,
+                        "metrics": metrics,
+                        "results": display_df,
+                        "styled": display_df.style.apply(
+                            lambda x: ['background-color: #ffcccc' if v == 'Hors limites' else '' for v in x],
+                            subset=['Statut']
+                        ).apply(
+                            lambda x: ['background-color: #ffe5cc' if v else '' for v in x],
+                            subset=[RULES_COLUMN]
                         )
-                        
-                        # Stocker le graphique pour l'exportation
-                        st.session_state.current_fig = fig
-                        
-                        # Afficher le graphique
-                        st.plotly_chart(fig, use_container_width=True)
-                        
-                        # Tableau des statistiques
-                        st.subheader("Statistiques")
-                        
-                        stats_col1, stats_col2 = st.columns(2)
-                        
-                        # Créer un dictionnaire pour les statistiques
-                        stats_dict = {
-                            "Valeur de référence": f"{reference_value:.4f}",
-                            "Moyenne": f"{mean:.4f}",
-                            "Écart-type": f"{std_dev:.4f}",
-                            "Min": f"{min_val:.4f}",
-                            "Max": f"{max_val:.4f}"
-                        }
-                        
-                        if reference_stddev > 0:
-                            stats_dict["Écart-type de référence"] = f"{reference_stddev:.4f}"
-                        
-                        if tolerance_type == "Pourcentage (%)":
-                            stats_dict["Tolérance"] = f"{tolerance_value:.2f}%"
+                    })
+
+            if analysis is not None:
+                metrics = analysis["metrics"]
+
+                # Stocker le graphique, les statistiques et les résultats pour l'exportation
+                st.session_state.current_fig = analysis["fig"]
+                st.session_state.current_stats = analysis["stats"]
+                st.session_state.current_results = analysis["results"]
+
+                # Afficher le graphique
+                st.plotly_chart(analysis["fig"], use_container_width=True)
+
+                # Tableau des statistiques
+                st.subheader("Statistiques")
+
+                stats_col1, stats_col2 = st.columns(2)
+
+                with stats_col1:
+                    st.markdown(f"**Valeur de référence:** {reference_value:.4f}")
+
+                    if reference_stddev > 0:
+                        st.markdown(f"**Écart-type de référence:** {reference_stddev:.4f}")
+
+                    if tolerance_type == "Pourcentage (%)":
+                        st.markdown(f"**Tolérance:** {tolerance_value:.2f}%")
+                    else:
+                        st.markdown(f"**Tolérance:** {tolerance_value:.1f} × écart-type")
+
+                with stats_col2:
+                    st.markdown(f"**Moyenne:** {metrics['mean']:.4f}")
+                    st.markdown(f"**Écart-type:** {metrics['std']:.4f}")
+                    st.markdown(f"**Min:** {metrics['min']:.4f}")
+                    st.markdown(f"**Max:** {metrics['max']:.4f}")
+
+                show_bootstrap_intervals(analysis["stats"])
+                show_rule_summary(metrics)
+
+                # Ajout du lot à l'historique persistant du standard
+                with st.expander("Historique du standard"):
+                    catalog_standard = st.session_state.get('catalog_standard')
+                    hist_col1, hist_col2 = st.columns(2)
+                    with hist_col1:
+                        history_standard = st.text_input(
+                            "Identifiant du standard:",
+                            value=catalog_standard if catalog_standard and catalog_standard != "-- Saisie manuelle --" else "",
+                            key="history_standard"
+                        ).strip()
+                    with hist_col2:
+                        history_element = st.text_input(
+                            "Élément:",
+                            value=original_value_column,
+                            key="history_element"
+                        ).strip()
+
+                    if st.button("Ajouter ce lot à l'historique", key="append_history"):
+                        if not history_standard or not history_element:
+                            st.error("Veuillez indiquer l'identifiant du standard et l'élément.")
                         else:
-                            stats_dict["Tolérance"] = f"{tolerance_value:.1f} × écart-type"
-                        
-                        # Stocker les statistiques pour l'exportation
-                        st.session_state.current_stats = stats_dict
-                        
-                        with stats_col1:
-                            st.markdown(f"**Valeur de référence:** {reference_value:.4f}")
-                            
-                            if reference_stddev > 0:
-                                st.markdown(f"**Écart-type de référence:** {reference_stddev:.4f}")
-                            
-                            if tolerance_type == "Pourcentage (%)":
-                                st.markdown(f"**Tolérance:** {tolerance_value:.2f}%")
+                            batch = analysis["results"][[original_id_column, original_value_column]]
+                            batch = batch.set_axis(["sample_id", "measured_value"], axis=1)
+                            _, added = get_crm_history().append(
+                                history_standard,
+                                history_element,
+                                batch,
+                                reference_value,
+                                metrics["lower_limit"],
+                                metrics["upper_limit"],
+                                reference_stddev
+                            )
+                            if added:
+                                st.success(f"{added} valeur(s) ajoutée(s) à l'historique de {history_standard}.")
                             else:
-                                st.markdown(f"**Tolérance:** {tolerance_value:.1f} × écart-type")
-                        
-                        with stats_col2:
-                            st.markdown(f"**Moyenne:** {mean:.4f}")
-                            st.markdown(f"**Écart-type:** {std_dev:.4f}")
-                            st.markdown(f"**Min:** {min_val:.4f}")
-                            st.markdown(f"**Max:** {max_val:.4f}")
-                        
-                        # Tableau de données
-                        st.subheader("Résultats détaillés")
-                        
-                        # Création d'un DataFrame avec les résultats
-                        results_df = analysis_data.copy()
-                        results_df['Écart (%)'] = ((results_df[value_column] - reference_value) / reference_value) * 100
-                        
-                        if reference_stddev > 0:
-                            results_df['Z-score'] = (results_df[value_column] - reference_value) / reference_stddev
-                        
-                        results_df['Statut'] = results_df[value_column].apply(
-                            lambda x: 'OK' if lower_limit <= x <= upper_limit else 'Hors limites'
-                        )
-                        
-                        # Renommer les colonnes du tableau de résultats avec les noms originaux
-                        display_df = results_df.copy()
-                        display_df.rename(columns={
-                            'sample_id': original_id_column,
-                            'measured_value': original_value_column
-                        }, inplace=True)
-                        
-                        # Stocker les résultats pour l'exportation
-                        st.session_state.current_results = display_df
-                        
-                        # Afficher le tableau avec coloration conditionnelle
-                        st.dataframe(display_df.style.apply(
-                            lambda x: ['background-color: #ffcccc' if v == 'Hors limites' else '' for v in x],
-                            subset=['Statut']
-                        ))
-                        
-                        # Boutons de navigation
-                        col1, col2 = st.columns([1, 1])
-                        with col1:
-                            if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_from_analysis"):
-                                st.session_state.tab = "Mappage des Colonnes"
-                                st.rerun()
-                        with col2:
-                            if st.button("Continuer vers l'Exportation →", key="go_to_export_from_analysis"):
-                                st.session_state.tab = "Export"
-                                st.rerun()
+                                st.info("Ce lot figure déjà dans l'historique.")
+
+                    show_crm_history(history_standard, history_element)
+
+                # Tableau de données
+                st.subheader("Résultats détaillés")
+
+                # Afficher le tableau avec coloration conditionnelle
+                st.dataframe(analysis["styled"])
+
+                # Boutons de navigation
+                col1, col2 = st.columns([1, 1])
+                with col1:
+                    if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_from_analysis"):
+                        st.session_state.tab = "Mappage des Colonnes"
+                        st.rerun()
+                with col2:
+                    if st.button("Continuer vers l'Exportation →", key="go_to_export_from_analysis"):
+                        st.session_state.tab = "Export"
+                        st.rerun()
             
             # Si le graphique a déjà été généré, afficher aussi les boutons de navigation
             if st.session_state.current_fig is not None and 'current_results' in st.session_state and st.session_state.current_results is not None:
@@ -978,140 +1529,155 @@ elif st.session_state.tab == "Analyse":
                     st.rerun()
                 
         elif control_type == "Duplicatas (nuage de points et régression)":
-            if st.button("Générer la Carte de Contrôle", key="generate_duplicates"):
-                # Préparation des données
-                original_column = "original_value"
-                replicate_column = "duplicate_value"
-                
-                analysis_data = data[[original_column, replicate_column]].copy()
-                analysis_data = analysis_data.dropna()
-                analysis_data[original_column] = pd.to_numeric(analysis_data[original_column], errors='coerce')
-                analysis_data[replicate_column] = pd.to_numeric(analysis_data[replicate_column], errors='coerce')
-                analysis_data = analysis_data.dropna()
-                
-                if analysis_data.empty:
-                    st.error("Aucune donnée numérique valide trouvée pour l'analyse.")
+            rows_mode = st.session_state.get('duplicate_rows_mode', False)
+            
+            # Récupérer les noms originaux des colonnes pour le titre
+            if rows_mode:
+                value_name = st.session_state.column_mapping.get('measured_value', 'Valeur')
+                id_name = st.session_state.column_mapping.get('sample_id', 'Échantillon')
+                original_value_name = f"{value_name} (original)"
+                duplicate_value_name = f"{value_name} (duplicata)"
+            else:
+                original_value_name = st.session_state.column_mapping.get('original_value', 'Valeur originale')
+                duplicate_value_name = st.session_state.column_mapping.get('duplicate_value', 'Valeur dupliquée')
+
+            regression_method = st.session_state.get('regression_method', REGRESSION_METHODS[0])
+            scatter_mode = st.session_state.get('scatter_mode', SCATTER_MODES[0])
+            bootstrap_resamples = get_bootstrap_resamples()
+
+            memo_key = analysis_key(fingerprint, control_type, {
+                "rows_mode": rows_mode,
+                "regression_method": regression_method,
+                "scatter_mode": scatter_mode,
+                "bootstrap_resamples": bootstrap_resamples,
+                "title": graph_title,
+                "columns": [original_value_name, duplicate_value_name]
+            })
+
+            generate = st.button("Générer la Carte de Contrôle", key="generate_duplicates")
+            analysis = memo.get(memo_key) if generate or memo_key in memo else None
+
+            if analysis is None and generate:
+                # Analyse (régression et différences calculées sur tout le tableau)
+                try:
+                    if rows_mode:
+                        # Appariement des lignes des duplicatas avec celles des originaux, puis analyse des paires
+                        results_df, stats_dict, metrics = analyze_duplicate_rows(data, regression_method)
+                    else:
+                        results_df, stats_dict, metrics = analyze_duplicates(data, regression_method)
+                    if bootstrap_resamples:
+                        add_duplicate_intervals(results_df, stats_dict, metrics, bootstrap_resamples)
+                except ValueError as e:
+                    st.error(str(e))
                 else:
-                    # Calcul de la régression linéaire
-                    x = analysis_data[original_column].values
-                    y = analysis_data[replicate_column].values
-                    
-                    slope, intercept = np.polyfit(x, y, 1)
-                    r = np.corrcoef(x, y)[0, 1]
-                    
-                    # Calcul des statistiques
-                    differences = np.abs(y - x)
-                    mean_diff = np.mean(differences)
-                    
-                    relative_diff = np.abs(y - x) / ((x + y) / 2) * 100
-                    mean_relative_diff = np.nanmean(relative_diff)
-                    
-                    # Récupérer les noms originaux des colonnes pour le titre
-                    original_value_name = st.session_state.column_mapping.get('original_value', 'Valeur originale')
-                    duplicate_value_name = st.session_state.column_mapping.get('duplicate_value', 'Valeur dupliquée')
-                    
                     # Création du graphique avec Plotly
-                    fig = go.Figure()
-                    
-                    # Nuage de points
-                    fig.add_trace(go.Scatter(
-                        x=analysis_data[original_column],
-                        y=analysis_data[replicate_column],
-                        mode='markers',
-                        name='Duplicatas',
-                        marker=dict(
-                            color='rgb(75, 192, 192)',
-                            size=10,
-                            opacity=0.8
-                        )
-                    ))
-                    
-                    # Ligne de régression
-                    x_range = np.linspace(min(x), max(x), 100)
-                    y_pred = slope * x_range + intercept
-                    
-                    fig.add_trace(go.Scatter(
-                        x=x_range,
-                        y=y_pred,
-                        mode='lines',
-                        name=f'Régression linéaire (y = {slope:.4f}x + {intercept:.4f})',
-                        line=dict(color='rgb(255, 99, 132)', width=2)
-                    ))
-                    
-                    # Ligne d'égalité parfaite (y = x)
-                    fig.add_trace(go.Scatter(
-                        x=x_range,
-                        y=x_range,
-                        mode='lines',
-                        name='Ligne d\'égalité (y=x)',
-                        line=dict(color='rgb(54, 162, 235)', width=2, dash='dash')
-                    ))
-                    
-                    # Mise en forme
-                    fig.update_layout(
-                        title=f"{graph_title} - {original_value_name} vs {duplicate_value_name}",
-                        xaxis_title=original_value_name,
-                        yaxis_title=duplicate_value_name,
-                        height=600,
-                        hovermode="closest"
+                    fig = build_duplicate_figure(
+                        results_df,
+                        metrics,
+                        f"{graph_title} - {original_value_name} vs {duplicate_value_name}",
+                        original_value_name,
+                        duplicate_value_name,
+                        scatter_mode
                     )
-                    
-                    # Stocker le graphique pour l'exportation
-                    st.session_state.current_fig = fig
-                    
-                    # Afficher le graphique
-                    st.plotly_chart(fig, use_container_width=True)
-                    
-                    # Tableau des statistiques
-                    st.subheader("Statistiques")
-                    
-                    # Créer un dictionnaire pour les statistiques
-                    stats_dict = {
-                        "Équation de régression": f"y = {slope:.4f}x + {intercept:.4f}",
-                        "Coefficient de corrélation (R²)": f"{r*r:.4f}",
-                        "Différence absolue moyenne": f"{mean_diff:.4f}",
-                        "Différence relative moyenne": f"{mean_relative_diff:.2f}%"
-                    }
-                    
-                    # Stocker les statistiques pour l'exportation
-                    st.session_state.current_stats = stats_dict
-                    
-                    st.markdown(f"**Équation de régression:** y = {slope:.4f}x + {intercept:.4f}")
-                    st.markdown(f"**Coefficient de corrélation (R²):** {r*r:.4f}")
-                    st.markdown(f"**Différence absolue moyenne:** {mean_diff:.4f}")
-                    st.markdown(f"**Différence relative moyenne:** {mean_relative_diff:.2f}%")
-                    
-                    # Tableau de données
-                    st.subheader("Résultats détaillés")
-                    
-                    # Création d'un DataFrame avec les résultats
-                    results_df = analysis_data.copy()
-                    results_df['Diff. Abs.'] = np.abs(results_df[replicate_column] - results_df[original_column])
-                    results_df['Diff. Rel. (%)'] = np.abs(results_df[replicate_column] - results_df[original_column]) / ((results_df[original_column] + results_df[replicate_column]) / 2) * 100
-                    
+
                     # Renommer les colonnes pour affichage
-                    display_df = results_df.copy()
-                    display_df.rename(columns={
+                    display_df = display_results(results_df, {
+                        'original_id': f"{id_name} (original)" if rows_mode else 'Original',
+                        'duplicate_id': f"{id_name} (duplicata)" if rows_mode else 'Duplicata',
                         'original_value': original_value_name,
                         'duplicate_value': duplicate_value_name
-                    }, inplace=True)
-                    
-                    # Stocker les résultats pour l'exportation
-                    st.session_state.current_results = display_df
-                    
-                    # Afficher le tableau
-                    st.dataframe(display_df)
-                    
-                    # Boutons de navigation
-                    col1, col2 = st.columns([1, 1])
-                    with col1:
-                        if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_dup"):
-                            st.session_state.tab = "Mappage des Colonnes"
-                            st.rerun()
-                    with col2:
-                        if st.button("Continuer vers l'Exportation →", key="go_to_export_dup"):
-                            st.session_state.tab = "Export"
-                            st.rerun()
+                    })
+
+                    # Graphiques de précision (HARD et Thompson-Howarth)
+                    precision_figs = [build_hard_figure(results_df, f"{graph_title} - Classement HARD")]
+                    if metrics["precision"]["thompson_howarth"] is not None:
+                        precision_figs.append(build_thompson_howarth_figure(
+                            metrics["precision"],
+                            f"{graph_title} - Précision de Thompson-Howarth",
+                            f"Teneur moyenne ({original_value_name} / {duplicate_value_name})"
+                        ))
+
+                    analysis = memo.put(memo_key, {
+                        "fig": fig,
+                        "precision_figs": precision_figs,
+                        "stats": stats_dict,
+                        "metrics": metrics,
+                        "results": display_df
+                    })
+
+            if analysis is not None:
+                metrics = analysis["metrics"]
+
+                # Stocker le graphique, les statistiques et les résultats pour l'exportation
+                st.session_state.current_fig = analysis["fig"]
+                st.session_state.current_stats = analysis["stats"]
+                st.session_state.current_results = analysis["results"]
+
+                # Afficher le graphique
+                st.plotly_chart(analysis["fig"], use_container_width=True)
+
+                # Tableau des statistiques
+                st.subheader("Statistiques")
+
+                st.markdown(f"**Méthode de régression:** {metrics['regression_method']}")
+                st.markdown(f"**Équation de régression:** y = {metrics['slope']:.4f}x + {metrics['intercept']:.4f}")
+                st.markdown(f"**Coefficient de corrélation (R²):** {metrics['r_squared']:.4f}")
+                st.markdown(f"**Différence absolue moyenne:** {metrics['mean_diff']:.4f}")
+                st.markdown(f"**Différence relative moyenne:** {metrics['mean_relative_diff']:.2f}%")
+                show_bootstrap_intervals(analysis["stats"])
+
+                # Appariement des lignes séparées: paires formées, orphelins et duplicatas multiples
+                if "pairing" in metrics:
+                    pairing = metrics["pairing"]
+                    pair_col1, pair_col2, pair_col3 = st.columns(3)
+                    pair_col1.metric("Paires formées", pairing["pairs"])
+                    pair_col2.metric("Duplicatas orphelins", pairing["orphans"])
+                    pair_col3.metric("Originaux avec plusieurs duplicatas", pairing["multi_duplicates"])
+                    if pairing["repeated_originals"]:
+                        st.warning(f"{pairing['repeated_originals']} identifiant(s) d'original en double: "
+                                   "la première ligne a été retenue.")
+                    if pairing["orphans"]:
+                        with st.expander("Duplicatas dont l'original est introuvable"):
+                            st.dataframe(renamed_view(pairing["orphan_ids"], {
+                                'duplicate_id': 'Duplicata',
+                                'parent_id': 'Original indiqué'
+                            }), hide_index=True, use_container_width=True)
+
+                # Précision des duplicatas
+                st.subheader("Précision")
+
+                precision = metrics["precision"]
+                prec_col1, prec_col2, prec_col3 = st.columns(3)
+                prec_col1.metric("HARD médian", f"{precision['hard_median']:.2f}%")
+                prec_col2.metric("Paires avec HARD ≤ 10%", f"{precision['hard_pass_rates'][10.0]:.1f}%")
+                prec_col3.metric("CV moyen", f"{precision['average_cv']:.2f}%")
+
+                if precision["thompson_howarth"] is not None:
+                    fit = precision["thompson_howarth"]
+                    st.markdown(f"**Thompson-Howarth:** s = {fit['s0']:.4f} + {fit['k']:.4f} × teneur")
+
+                for precision_fig in analysis["precision_figs"]:
+                    st.plotly_chart(precision_fig, use_container_width=True)
+
+                st.markdown("**Précision par classe de teneur:**")
+                st.dataframe(precision["binned"], hide_index=True, use_container_width=True)
+
+                # Tableau de données
+                st.subheader("Résultats détaillés")
+
+                # Afficher le tableau
+                st.dataframe(analysis["results"])
+
+                # Boutons de navigation
+                col1, col2 = st.columns([1, 1])
+                with col1:
+                    if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_dup"):
+                        st.session_state.tab = "Mappage des Colonnes"
+                        st.rerun()
+                with col2:
+                    if st.button("Continuer vers l'Exportation →", key="go_to_export_dup"):
+                        st.session_state.tab = "Export"
+                        st.rerun()
             
             # Si le graphique a déjà été généré, afficher aussi les boutons de navigation
             if st.session_state.current_fig is not None and 'current_results' in st.session_state and st.session_state.current_results is not None:
@@ -1130,136 +1696,227 @@ elif st.session_state.tab == "Analyse":
                     st.session_state.tab = "Mappage des Colonnes"
                     st.rerun()
                 
-        elif control_type == "Blancs":
-            if st.button("Générer la Carte de Contrôle", key="generate_blanks"):
-                # Préparation des données
-                id_column = "sample_id"
-                value_column = "measured_value"
+        elif control_type == "Blancs" and st.session_state.get('carryover_mode', False):
+            original_id_column = st.session_state.column_mapping.get('sample_id', 'Identifiant')
+            original_type_column = st.session_state.column_mapping.get('sample_type', 'Type')
+            original_sequence_column = st.session_state.column_mapping.get('sequence', 'Séquence')
+            original_value_column = st.session_state.column_mapping.get('measured_value', 'Valeur')
+            blank_label = st.session_state.get('blank_label', "BLANK")
+            
+            if 'sample_type' not in data.columns or 'sequence' not in data.columns:
+                st.warning("Veuillez mapper le type d'échantillon et l'ordre d'analyse dans l'étape 'Mappage des Colonnes'.")
                 
-                analysis_data = data[[id_column, value_column]].copy()
-                analysis_data = analysis_data.dropna()
-                analysis_data[value_column] = pd.to_numeric(analysis_data[value_column], errors='coerce')
-                analysis_data = analysis_data.dropna()
+                if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_carryover_missing"):
+                    st.session_state.tab = "Mappage des Colonnes"
+                    st.rerun()
+            else:
+                bootstrap_resamples = get_bootstrap_resamples()
                 
-                if analysis_data.empty:
-                    st.error("Aucune donnée numérique valide trouvée pour l'analyse.")
-                else:
-                    # Récupérer les noms originaux des colonnes pour le titre
-                    original_id_column = st.session_state.column_mapping.get('sample_id', 'Identifiant')
-                    original_value_column = st.session_state.column_mapping.get('measured_value', 'Valeur')
+                memo_key = analysis_key(fingerprint, control_type, {
+                    "carryover": True,
+                    "blank_label": blank_label,
+                    "bootstrap_resamples": bootstrap_resamples,
+                    "title": graph_title,
+                    "columns": [original_id_column, original_type_column, original_sequence_column, original_value_column]
+                })
                 
-                    # Calcul des statistiques
-                    values = analysis_data[value_column].values
-                    mean = np.mean(values)
-                    std_dev = np.std(values)
-                    min_val = np.min(values)
-                    max_val = np.max(values)
-                    
-                    # Limites de détection estimées
-                    lod = mean + 3 * std_dev
-                    
-                    # Création du graphique avec Plotly
-                    fig = go.Figure()
-                    
-                    # Données mesurées
-                    fig.add_trace(go.Scatter(
-                        x=analysis_data[id_column],
-                        y=analysis_data[value_column],
-                        mode='lines+markers',
-                        name='Valeur mesurée',
-                        line=dict(color='rgb(75, 192, 192)', width=2),
-                        marker=dict(size=8)
-                    ))
-                    
-                    # Moyenne
-                    fig.add_trace(go.Scatter(
-                        x=analysis_data[id_column],
-                        y=[mean] * len(analysis_data),
-                        mode='lines',
-                        name='Moyenne',
-                        line=dict(color='rgb(54, 162, 235)', width=2, dash='dash')
-                    ))
-                    
-                    # Limite de détection
-                    fig.add_trace(go.Scatter(
-                        x=analysis_data[id_column],
-                        y=[lod] * len(analysis_data),
-                        mode='lines',
-                        name='Limite de détection (LOD)',
-                        line=dict(color='rgb(255, 99, 132)', width=2, dash='dash')
-                    ))
-                    
-                    # Mise en forme
-                    fig.update_layout(
-                        title=f"{graph_title} - {original_value_column}",
-                        xaxis_title=original_id_column,
-                        yaxis_title=original_value_column,
-                        height=600,
-                        hovermode="closest"
-                    )
+                generate = st.button("Générer la Carte de Contrôle", key="generate_carryover")
+                analysis = memo.get(memo_key) if generate or memo_key in memo else None
+                
+                if analysis is None and generate:
+                    # Analyse du flux complet: jointure « as-of » de chaque blanc avec l'échantillon précédent
+                    try:
+                        results_df, stats_dict, metrics = analyze_blank_carryover(data, blank_label)
+                        if bootstrap_resamples:
+                            add_blank_intervals(results_df, stats_dict, metrics, bootstrap_resamples)
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        # Graphique de contrôle des blancs et nuage blanc / teneur précédente
+                        fig = build_blank_figure(
+                            results_df,
+                            metrics,
+                            f"{graph_title} - {original_value_column}",
+                            original_id_column,
+                            original_value_column
+                        )
+                        carryover_fig = build_carryover_figure(
+                            results_df,
+                            metrics,
+                            f"{graph_title} - Contamination par l'échantillon précédent",
+                            f"Teneur de l'échantillon précédent ({original_value_column})",
+                            f"Teneur du blanc ({original_value_column})"
+                        )
+                        
+                        # Renommer les colonnes pour affichage
+                        display_df = display_results(results_df, {
+                            'sample_id': original_id_column,
+                            'sample_type': original_type_column,
+                            'sequence': original_sequence_column,
+                            'measured_value': original_value_column
+                        })
+                        
+                        analysis = memo.put(memo_key, {
+                            "fig": fig,
+                            "carryover_fig": carryover_fig,
+                            "stats": stats_dict,
+                            "metrics": metrics,
+                            "results": display_df
+                        })
+                
+                if analysis is not None:
+                    metrics = analysis["metrics"]
                     
-                    # Stocker le graphique pour l'exportation
-                    st.session_state.current_fig = fig
+                    # Stocker le graphique, les statistiques et les résultats pour l'exportation
+                    st.session_state.current_fig = analysis["fig"]
+                    st.session_state.current_stats = analysis["stats"]
+                    st.session_state.current_results = analysis["results"]
                     
-                    # Afficher le graphique
-                    st.plotly_chart(fig, use_container_width=True)
+                    # Afficher les graphiques
+                    st.plotly_chart(analysis["fig"], use_container_width=True)
+                    st.plotly_chart(analysis["carryover_fig"], use_container_width=True)
                     
                     # Tableau des statistiques
                     st.subheader("Statistiques")
                     
-                    # Créer un dictionnaire pour les statistiques
-                    stats_dict = {
-                        "Moyenne": f"{mean:.4f}",
-                        "Écart-type": f"{std_dev:.4f}",
-                        "Min": f"{min_val:.4f}",
-                        "Max": f"{max_val:.4f}",
-                        "Limite de détection estimée (LOD)": f"{lod:.4f}"
-                    }
+                    stats_col1, stats_col2, stats_col3 = st.columns(3)
+                    stats_col1.metric("Blancs", metrics["blanks"])
+                    stats_col2.metric("Ratio de contamination médian", f"{metrics['median_ratio']:.3f}%")
+                    stats_col3.metric("Contaminations probables", metrics["carryover"])
                     
-                    # Stocker les statistiques pour l'exportation
-                    st.session_state.current_stats = stats_dict
-                    
-                    st.markdown(f"**Moyenne:** {mean:.4f}")
-                    st.markdown(f"**Écart-type:** {std_dev:.4f}")
-                    st.markdown(f"**Min:** {min_val:.4f}")
-                    st.markdown(f"**Max:** {max_val:.4f}")
-                    st.markdown(f"**Limite de détection estimée (LOD):** {lod:.4f}")
+                    st.markdown(f"**Limite de détection estimée (LOD):** {metrics['lod']:.4f}")
+                    st.markdown(f"**Seuil de forte teneur:** {metrics['high_grade']:.4f}")
+                    st.markdown(f"**Ratio de contamination médian après forte teneur:** {metrics['high_grade_ratio']:.3f}%")
+                    st.markdown(f"**Corrélation blanc / teneur précédente (r):** {metrics['r']:.3f}")
+                    show_bootstrap_intervals(analysis["stats"])
                     
                     # Tableau de données
                     st.subheader("Résultats détaillés")
                     
-                    # Création d'un DataFrame avec les résultats
-                    results_df = analysis_data.copy()
-                    results_df['Statut'] = results_df[value_column].apply(
-                        lambda x: 'OK' if x <= lod else 'Élevé'
-                    )
-                    
-                    # Renommer les colonnes pour affichage
-                    display_df = results_df.copy()
-                    display_df.rename(columns={
-                        'sample_id': original_id_column,
-                        'measured_value': original_value_column
-                    }, inplace=True)
-                    
-                    # Stocker les résultats pour l'exportation
-                    st.session_state.current_results = display_df
-                    
-                    # Afficher le tableau avec coloration conditionnelle
-                    st.dataframe(display_df.style.apply(
-                        lambda x: ['background-color: #ffcccc' if v == 'Élevé' else '' for v in x],
-                        subset=['Statut']
-                    ))
+                    st.dataframe(analysis["results"])
                     
                     # Boutons de navigation
                     col1, col2 = st.columns([1, 1])
                     with col1:
-                        if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_blank"):
+                        if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_from_carryover"):
                             st.session_state.tab = "Mappage des Colonnes"
                             st.rerun()
                     with col2:
-                        if st.button("Continuer vers l'Exportation →", key="go_to_export_blank"):
+                        if st.button("Continuer vers l'Exportation →", key="go_to_export_from_carryover"):
                             st.session_state.tab = "Export"
                             st.rerun()
+                else:
+                    if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_carryover"):
+                        st.session_state.tab = "Mappage des Colonnes"
+                        st.rerun()
+        
+        elif control_type == "Blancs":
+            # Récupérer les noms originaux des colonnes pour le titre
+            original_id_column = st.session_state.column_mapping.get('sample_id', 'Identifiant')
+            original_value_column = st.session_state.column_mapping.get('measured_value', 'Valeur')
+
+            bootstrap_resamples = get_bootstrap_resamples()
+            lod_method = st.session_state.get('lod_method', LOD_METHODS[0])
+            lod_grouping = st.session_state.get('lod_grouping', LOD_GROUP_NONE)
+            lod_period = LOD_PERIODS[st.session_state.get('lod_period', "Semaine")]
+            
+            # Mappage antérieur au choix du regroupement: LOD calculée sur l'ensemble des blancs
+            group_column = {LOD_GROUP_BATCH: 'batch_id', LOD_GROUP_PERIOD: 'analysis_date'}.get(lod_grouping)
+            if group_column and group_column not in data.columns:
+                st.info("La colonne de regroupement n'est pas mappée: la LOD est calculée sur l'ensemble des blancs.")
+                lod_grouping = LOD_GROUP_NONE
+
+            memo_key = analysis_key(fingerprint, control_type, {
+                "bootstrap_resamples": bootstrap_resamples,
+                "lod_method": lod_method,
+                "lod_grouping": lod_grouping,
+                "lod_period": lod_period,
+                "title": graph_title,
+                "columns": [original_id_column, original_value_column]
+            })
+
+            generate = st.button("Générer la Carte de Contrôle", key="generate_blanks")
+            analysis = memo.get(memo_key) if generate or memo_key in memo else None
+
+            if analysis is None and generate:
+                # Analyse (statistiques, LOD et statuts calculés sur tout le tableau)
+                try:
+                    results_df, stats_dict, metrics = analyze_blanks(data, lod_method, lod_grouping, lod_period)
+                    if bootstrap_resamples:
+                        add_blank_intervals(results_df, stats_dict, metrics, bootstrap_resamples)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    # Création du graphique avec Plotly
+                    fig = build_blank_figure(
+                        results_df,
+                        metrics,
+                        f"{graph_title} - {original_value_column}",
+                        original_id_column,
+                        original_value_column
+                    )
+
+                    # Renommer les colonnes pour affichage
+                    display_df = display_results(results_df, {
+                        'sample_id': original_id_column,
+                        'measured_value': original_value_column,
+                        'batch_id': st.session_state.column_mapping.get('batch_id', 'Lot'),
+                        'analysis_date': st.session_state.column_mapping.get('analysis_date', 'Date')
+                    })
+
+                    analysis = memo.put(memo_key, {
+                        "fig": fig,
+                        "stats": stats_dict,
+                        "metrics": metrics,
+                        "results": display_df,
+                        "styled": display_df.style.apply(
+                            lambda x: ['background-color: #ffcccc' if v == 'Élevé' else '' for v in x],
+                            subset=['Statut']
+                        )
+                    })
+
+            if analysis is not None:
+                metrics = analysis["metrics"]
+
+                # Stocker le graphique, les statistiques et les résultats pour l'exportation
+                st.session_state.current_fig = analysis["fig"]
+                st.session_state.current_stats = analysis["stats"]
+                st.session_state.current_results = analysis["results"]
+
+                # Afficher le graphique
+                st.plotly_chart(analysis["fig"], use_container_width=True)
+
+                # Tableau des statistiques
+                st.subheader("Statistiques")
+
+                st.markdown(f"**Moyenne:** {metrics['mean']:.4f}")
+                st.markdown(f"**Écart-type:** {metrics['std']:.4f}")
+                st.markdown(f"**Min:** {metrics['min']:.4f}")
+                st.markdown(f"**Max:** {metrics['max']:.4f}")
+                st.markdown(f"**Limite de détection estimée (LOD):** {metrics['lod']:.4f} ({metrics['lod_method']})")
+                show_bootstrap_intervals(analysis["stats"])
+
+                # LOD de chaque lot ou période
+                if "lod_groups" in metrics:
+                    st.markdown(f"**LOD {metrics['grouping'].lower()}:**")
+                    st.dataframe(metrics["lod_groups"], hide_index=True, use_container_width=True)
+
+                # Tableau de données
+                st.subheader("Résultats détaillés")
+
+                # Afficher le tableau avec coloration conditionnelle
+                st.dataframe(analysis["styled"])
+
+                # Boutons de navigation
+                col1, col2 = st.columns([1, 1])
+                with col1:
+                    if st.button("← Revenir au Mappage des Colonnes", key="back_to_mapping_blank"):
+                        st.session_state.tab = "Mappage des Colonnes"
+                        st.rerun()
+                with col2:
+                    if st.button("Continuer vers l'Exportation →", key="go_to_export_blank"):
+                        st.session_state.tab = "Export"
+                        st.rerun()
             
             # Si le graphique a déjà été généré, afficher aussi les boutons de navigation
             if st.session_state.current_fig is not None and 'current_results' in st.session_state and st.session_state.current_results is not None:
@@ -1281,6 +1938,13 @@ elif st.session_state.tab == "Analyse":
 elif st.session_state.tab == "Export":
     # ONGLET 5: EXPORT
     st.header("Exportation des Résultats")
+
+    # Dépendances d'exportation (reportlab, kaleido) chargées seulement dans cet onglet
+    from geoqaqc_report import (
+        CAMPAIGN_MAX_SECTIONS, export_plotly_to_png, export_to_pdf, export_campaign_to_pdf, campaign_section,
+        keep_failed_rows
+    )
+    from geoqaqc_render import get_renderer
     
     if 'current_fig' not in st.session_state or st.session_state.current_fig is None:
         st.warning("Aucun résultat à exporter. Veuillez d'abord générer une analyse dans l'étape 'Analyse'.")
@@ -1310,6 +1974,16 @@ elif st.session_state.tab == "Export":
             key="export_format"
         )
         
+        # Les rapports de gros lots peuvent se limiter aux lignes non conformes (résumé conservé)
+        if export_format == "PDF":
+            export_failures_only = st.checkbox(
+                "Rapport PDF: non-conformités seulement",
+                value=False,
+                key="export_failures_only"
+            )
+        else:
+            export_failures_only = False
+        
         # Aperçu du graphique
         st.subheader("Aperçu du graphique")
         st.plotly_chart(st.session_state.current_fig, use_container_width=True)
@@ -1335,7 +2009,8 @@ elif st.session_state.tab == "Export":
                         st.session_state.current_fig,
                         st.session_state.current_stats,
                         st.session_state.current_results,
-                        export_author
+                        export_author,
+                        failures_only=export_failures_only
                     )
                     
                     # Créer un lien de téléchargement
@@ -1359,6 +2034,73 @@ elif st.session_state.tab == "Export":
                 else:
                     st.error("Aucun résultat à exporter.")
         
+        # Statistiques du cache des images rendues (un graphique inchangé n'est pas rendu de nouveau)
+        with st.expander("Cache des images exportées"):
+            image_stats = get_renderer().stats()
+            st.markdown(f"**Succès:** {image_stats['hits']} | **Échecs:** {image_stats['misses']}")
+            st.markdown(f"**Images:** {image_stats['entries']} | **Taille:** {image_stats['size_bytes'] / 1024 / 1024:.1f} / {image_stats['max_bytes'] / 1024 / 1024:.0f} Mo")
+            if st.button("Vider le cache", key="clear_image_cache"):
+                get_renderer().clear()
+                st.rerun()
+        
+        # Rapport de campagne: plusieurs analyses réunies dans un seul PDF avec table des matières
+        st.subheader("Rapport de campagne")
+        campaign_sections = st.session_state.campaign_sections
+        
+        # Non-conformités seulement: chaque section ne garde que ses lignes non conformes (mémoire réduite)
+        campaign_failures_only = st.checkbox(
+            "Rapport de campagne: non-conformités seulement",
+            value=True,
+            key="campaign_failures_only"
+        )
+        
+        if st.button("Ajouter l'analyse courante au rapport de campagne", key="campaign_add"):
+            if len(campaign_sections) >= CAMPAIGN_MAX_SECTIONS:
+                st.warning(f"Le rapport de campagne est limité à {CAMPAIGN_MAX_SECTIONS} analyses. Générez-le ou videz-le avant d'en ajouter d'autres.")
+            else:
+                section = campaign_section(
+                    export_title,
+                    st.session_state.current_fig,
+                    dict(st.session_state.current_stats),
+                    st.session_state.current_results
+                )
+                campaign_sections.append(keep_failed_rows(section) if campaign_failures_only else section)
+        
+        st.markdown(f"**Analyses dans le rapport:** {len(campaign_sections)} / {CAMPAIGN_MAX_SECTIONS}")
+        for i, section in enumerate(campaign_sections, start=1):
+            st.markdown(f"{i}. {section['title']}")
+        
+        if campaign_sections:
+            campaign_title = st.text_input(
+                "Titre du rapport de campagne:",
+                value="Rapport de campagne QAQC",
+                key="campaign_title_input"
+            )
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("Générer le rapport de campagne (PDF)", key="campaign_export"):
+                    # Graphiques rendus en parallèle (plusieurs processus), puis assemblage du PDF
+                    try:
+                        pdf_bytes = export_campaign_to_pdf(
+                            campaign_title,
+                            campaign_sections,
+                            export_author,
+                            failures_only=campaign_failures_only
+                        )
+                        
+                        b64 = base64.b64encode(pdf_bytes).decode()
+                        href = f'<a href="data:application/pdf;base64,{b64}" download="geoqaqc_campagne.pdf">Télécharger le rapport de campagne (PDF)</a>'
+                        st.markdown(href, unsafe_allow_html=True)
+                        
+                        st.success(f"Rapport de campagne exporté ({len(campaign_sections)} analyses)!")
+                    except Exception as e:
+                        st.error(f"Erreur lors de l'exportation du rapport de campagne: {e}")
+            with col2:
+                if st.button("Vider le rapport de campagne", key="campaign_clear"):
+                    st.session_state.campaign_sections = []
+                    st.rerun()
+        
         # Bouton de retour
         if st.button("← Revenir à l'Analyse"):
             st.session_state.tab = "Analyse"
@@ -0,0 +1,53 @@
+"""Mesure du temps des intervalles de confiance par bootstrap.
+
+Exemple:
+    python bench_bootstrap.py --pairs 100000 --resamples 10000 --workers 8 --budget 10
+
+Génère des paires de duplicatas synthétiques (graine fixe) et chronomètre
+duplicate_intervals pour la méthode de régression choisie. Le nombre de
+processus est plafonné par le nombre de cœurs de la machine; le calcul reste
+dans le processus courant en dessous de PARALLEL_MIN_ELEMENTS.
+
+Le script se termine avec le code 1 si la durée dépasse le budget (s'il est
+donné), afin de détecter les régressions.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from geoqaqc_bootstrap import DEFAULT_WORKERS, duplicate_intervals, format_interval
+from geoqaqc_engine import REGRESSION_METHODS, REGRESSION_OLS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesure du temps du bootstrap des duplicatas.")
+    parser.add_argument("--pairs", type=int, default=100_000, help="Nombre de paires de duplicatas")
+    parser.add_argument("--resamples", type=int, default=10_000, help="Nombre de rééchantillonnages")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus (défaut: nombre de cœurs)")
+    parser.add_argument("--method", default=REGRESSION_OLS, choices=REGRESSION_METHODS, help="Méthode de régression")
+    parser.add_argument("--budget", type=float, default=None, help="Durée maximale, en secondes")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    x = rng.lognormal(0.0, 1.0, args.pairs)
+    y = x * 1.02 + rng.normal(0.0, 0.05, args.pairs)
+
+    start = time.perf_counter()
+    intervals = duplicate_intervals(x, y, args.method, args.resamples, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    workers = min(args.workers or DEFAULT_WORKERS, DEFAULT_WORKERS)
+    print(f"{args.resamples} rééchantillonnages de {args.pairs} paires ({args.method}, {workers} processus): "
+          f"{elapsed:.2f} s")
+    print(f"IC pente: {format_interval(intervals['slope'])}")
+
+    if args.budget is not None and elapsed > args.budget:
+        print(f"ÉCHEC: budget de {args.budget:.2f} s dépassé.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Mesure du temps de démarrage de GeoQAQC.
+
+Exemple:
+    python bench_startup.py --runs 5 --budget 1.5
+
+Chaque mesure est faite dans un nouvel interpréteur Python (démarrage à froid).
+Streamlit est déjà chargé dans le processus du serveur; il est donc importé
+avant le début des mesures:
+- le temps d'importation des modules chargés au démarrage de l'application;
+- le temps jusqu'au premier affichage, c'est-à-dire la première exécution
+  complète du script Streamlit (onglet « Type de Contrôle »).
+
+Le script se termine avec le code 1 si la médiane du premier affichage
+dépasse le budget, afin de détecter les régressions.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, "GeoQAQC9.py")
+
+# Modules qui ne doivent pas être chargés au démarrage
+EXPORT_ONLY_MODULES = ["reportlab", "matplotlib", "seaborn", "plotly.express", "kaleido"]
+
+IMPORT_SNIPPET = """
+import json, sys, time
+sys.path.insert(0, {app_dir!r})
+import streamlit
+start = time.perf_counter()
+import pandas, geoqaqc_io, geoqaqc_cache, geoqaqc_engine, geoqaqc_charts, geoqaqc_logo
+elapsed = time.perf_counter() - start
+print(json.dumps({{"import_s": elapsed}}))
+"""
+
+FIRST_PAINT_SNIPPET = """
+import json, sys, time
+sys.path.insert(0, {app_dir!r})
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app_path!r}, default_timeout=60)
+start = time.perf_counter()
+at.run()
+elapsed = time.perf_counter() - start
+loaded = [m for m in {export_only!r} if m in sys.modules]
+print(json.dumps({{"first_paint_s": elapsed, "exception": bool(at.exception), "export_modules_loaded": loaded}}))
+"""
+
+
+# Exécuter un extrait de code dans un nouvel interpréteur et lire son résultat JSON
+def run_snippet(snippet):
+    completed = subprocess.run(
+        [sys.executable, "-c", snippet],
+        capture_output=True,
+        text=True,
+        cwd=APP_DIR,
+        check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesure du temps de démarrage de GeoQAQC.")
+    parser.add_argument("--runs", type=int, default=5, help="Nombre de démarrages à froid")
+    parser.add_argument("--budget", type=float, default=1.5, help="Budget du premier affichage, en secondes")
+    args = parser.parse_args(argv)
+
+    import_times = []
+    paint_times = []
+    loaded_modules = set()
+    failed = False
+
+    for _ in range(args.runs):
+        import_times.append(run_snippet(IMPORT_SNIPPET.format(app_dir=APP_DIR))["import_s"])
+
+        result = run_snippet(FIRST_PAINT_SNIPPET.format(
+            app_dir=APP_DIR,
+            app_path=APP_PATH,
+            export_only=EXPORT_ONLY_MODULES
+        ))
+        paint_times.append(result["first_paint_s"])
+        loaded_modules.update(result["export_modules_loaded"])
+        failed = failed or result["exception"]
+
+    import_median = statistics.median(import_times)
+    paint_median = statistics.median(paint_times)
+
+    print(f"Importation des modules: médiane {import_median:.3f} s (min {min(import_times):.3f} s)")
+    print(f"Premier affichage:       médiane {paint_median:.3f} s (min {min(paint_times):.3f} s)")
+    if loaded_modules:
+        print(f"Modules d'exportation chargés au démarrage: {', '.join(sorted(loaded_modules))}")
+    if failed:
+        print("Le script de l'application a levé une exception au démarrage.")
+
+    if failed or loaded_modules or paint_median > args.budget:
+        print(f"ÉCHEC: budget de {args.budget:.2f} s non respecté ou dépendances chargées trop tôt.")
+        return 1
+
+    print(f"OK: dans le budget de {args.budget:.2f} s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
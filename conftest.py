@@ -0,0 +1 @@
+# Racine du dépôt ajoutée au chemin d'importation des tests (modules geoqaqc_* à plat)
@@ -0,0 +1,515 @@
+"""Traitement par lots GeoQAQC sans interface.
+
+Exemple:
+    python geoqaqc_batch.py certificats/ --config config.json --output resultats/ --workers 8
+
+Le fichier de configuration JSON décrit le type de contrôle, le mappage des
+colonnes et les paramètres de l'analyse:
+
+    {
+        "control_type": "Standards CRM",
+        "mapping": {"sample_id": "Échantillon", "measured_value": "Au_ppm"},
+        "parameters": {
+            "reference_value": 1.25,
+            "reference_stddev": 0.05,
+            "tolerance_type": "Pourcentage (%)",
+            "tolerance_value": 10.0
+        },
+        "separator": ","
+    }
+
+Pour les duplicatas, "regression" choisit la méthode ("ols", "rma" ou
+"theil-sen"; "ols" par défaut). Si les originaux et les duplicatas sont sur
+des lignes séparées, mapper "sample_id", "parent_id" (identifiant de
+l'original, vide sur les lignes des originaux) et "measured_value" au lieu de
+"original_value" et "duplicate_value": les paires sont formées avant l'analyse.
+
+Pour rechercher la contamination des blancs, le fichier contient le flux
+complet des échantillons: mapper aussi "sample_type" et "sequence" (ordre
+d'analyse); "blank_label" donne la valeur identifiant les blancs ("BLANK" par
+défaut).
+
+Pour les blancs, "lod_method" choisit l'estimateur de la LOD ("mean", "mad",
+"percentile" ou "trimmed"; "mean" par défaut). La LOD est calculée par lot si
+"batch_id" est mappé, ou par période de "analysis_date" ("lod_period": "D",
+"W" ou "M"; "W" par défaut).
+
+"bootstrap" (nombre de rééchantillonnages, 0 par défaut) ajoute au rapport les
+intervalles de confiance à 95% de la pente (duplicatas), du biais (CRM) ou de
+la LOD (blancs); "bootstrap_seed" fixe la graine.
+
+Avec --stream, chaque fichier CSV est lu par blocs en un seul passage sans
+être chargé en mémoire (fichiers plus grands que la mémoire vive): seul le
+rapport JSON est écrit, sans tableau de résultats par ligne. Les moyennes,
+écarts-types, régressions OLS / RMA et règles de Westgard (écart-type de
+référence requis) sont identiques à l'analyse en mémoire; les quantiles (LOD
+robustes, HARD) sont estimés à 0.5% près et la pente de Theil-Sen sur un
+échantillon de paires. Non disponible pour l'analyse multi-standards, la LOD
+par groupe, la contamination des blancs, les duplicatas sur lignes séparées
+ni le bootstrap.
+
+Avec --report campagne.pdf, un rapport de campagne réunit toutes les analyses
+du lot dans un seul PDF avec table des matières (une section par fichier).
+Chaque processus construit et rend le graphique de son fichier; le PDF est
+assemblé à la fin. --report-failures-only limite les tableaux aux lignes non
+conformes; "report_title" et "report_author" dans la configuration donnent le
+titre et l'auteur du rapport.
+
+Pour un lot contenant plusieurs CRM intercalés, mapper aussi "standard_id" et
+donner les valeurs certifiées de chaque standard:
+
+    "parameters": {
+        "standards": [
+            {"standard_id": "OREAS-501", "reference_value": 0.5, "reference_stddev": 0.02},
+            {"standard_id": "OREAS-235", "reference_value": 1.6, "tolerance_value": 5.0}
+        ]
+    }
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from geoqaqc_engine import (
+    CONTROL_CRM, CONTROL_BLANKS, CONTROL_DUPLICATES, REQUIRED_FIELDS,
+    TOLERANCE_PERCENT, TOLERANCE_STDDEV, STANDARD_PARAM_COLUMNS,
+    REGRESSION_OLS, REGRESSION_RMA, REGRESSION_THEIL_SEN, REGRESSION_METHODS,
+    LOD_MEAN_STDDEV, LOD_MEDIAN_MAD, LOD_PERCENTILE, LOD_TRIMMED, LOD_METHODS,
+    LOD_GROUP_NONE, LOD_GROUP_BATCH, LOD_GROUP_PERIOD, DUPLICATE_ROW_FIELDS,
+    map_columns, renamed_view, analyze_crm, analyze_crm_grouped, analyze_blanks, analyze_blank_carryover, analyze_duplicates,
+    analyze_duplicate_rows
+)
+from geoqaqc_charts import build_crm_figure, build_crm_grouped_figure, build_blank_figure, build_duplicate_figure
+from geoqaqc_bootstrap import DEFAULT_SEED, add_crm_intervals, add_blank_intervals, add_duplicate_intervals
+from geoqaqc_io import SEPARATORS, iter_csv_chunks, read_csv_chunked, list_excel_sheets, read_excel_sheets
+from geoqaqc_stream import stream_crm, stream_blanks, stream_duplicates
+
+# Extensions de fichiers traitées par défaut
+DEFAULT_EXTENSIONS = (".csv", ".txt", ".xlsx", ".xls")
+
+# Alias acceptés dans le fichier de configuration
+CONTROL_TYPE_ALIASES = {
+    "crm": CONTROL_CRM,
+    "blanks": CONTROL_BLANKS,
+    "blancs": CONTROL_BLANKS,
+    "duplicates": CONTROL_DUPLICATES,
+    "duplicatas": CONTROL_DUPLICATES
+}
+TOLERANCE_TYPE_ALIASES = {
+    "percent": TOLERANCE_PERCENT,
+    "stddev": TOLERANCE_STDDEV
+}
+REGRESSION_ALIASES = {
+    "ols": REGRESSION_OLS,
+    "rma": REGRESSION_RMA,
+    "theil-sen": REGRESSION_THEIL_SEN,
+    "theil_sen": REGRESSION_THEIL_SEN
+}
+LOD_METHOD_ALIASES = {
+    "mean": LOD_MEAN_STDDEV,
+    "mad": LOD_MEDIAN_MAD,
+    "percentile": LOD_PERCENTILE,
+    "trimmed": LOD_TRIMMED
+}
+
+# Champs contenant des valeurs numériques
+NUMERIC_FIELDS = {"measured_value", "original_value", "duplicate_value", "sequence"}
+
+
+# Fonction pour lire et valider le fichier de configuration
+def load_config(path):
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+
+    control_type = config.get("control_type", CONTROL_CRM)
+    control_type = CONTROL_TYPE_ALIASES.get(str(control_type).lower(), control_type)
+    if control_type not in REQUIRED_FIELDS:
+        raise ValueError(f"Type de contrôle inconnu: {control_type}")
+    config["control_type"] = control_type
+
+    mapping = config.get("mapping", {})
+    required_fields = REQUIRED_FIELDS[control_type]
+    if control_type == CONTROL_DUPLICATES and "parent_id" in mapping:
+        # Originaux et duplicatas sur des lignes séparées, reliés par l'identifiant de l'original
+        required_fields = DUPLICATE_ROW_FIELDS
+    missing = [field for field in required_fields if field not in mapping]
+    if missing:
+        raise ValueError(f"Champs non mappés dans la configuration: {', '.join(missing)}")
+
+    parameters = config.setdefault("parameters", {})
+    if control_type == CONTROL_CRM and "standards" in parameters:
+        # Plusieurs standards intercalés: valeurs certifiées par identifiant de standard
+        if "standard_id" not in mapping:
+            raise ValueError("Le champ 'standard_id' doit être mappé pour l'analyse multi-standards.")
+        for standard in parameters["standards"]:
+            tolerance_type = standard.get("tolerance_type", TOLERANCE_PERCENT)
+            standard["tolerance_type"] = TOLERANCE_TYPE_ALIASES.get(tolerance_type, tolerance_type)
+            standard.setdefault("tolerance_value", 10.0)
+            standard.setdefault("reference_stddev", 0.0)
+    elif control_type == CONTROL_CRM:
+        if "reference_value" not in parameters:
+            raise ValueError("La valeur de référence est requise pour l'analyse des CRM.")
+        tolerance_type = parameters.get("tolerance_type", TOLERANCE_PERCENT)
+        parameters["tolerance_type"] = TOLERANCE_TYPE_ALIASES.get(tolerance_type, tolerance_type)
+        parameters.setdefault("tolerance_value", 10.0)
+        parameters.setdefault("reference_stddev", 0.0)
+    elif control_type == CONTROL_BLANKS and "sample_type" in mapping:
+        # Flux complet: contamination des blancs par l'échantillon précédent
+        if "sequence" not in mapping:
+            raise ValueError("Le champ 'sequence' doit être mappé pour l'analyse de la contamination des blancs.")
+        parameters.setdefault("blank_label", "BLANK")
+    elif control_type == CONTROL_BLANKS:
+        lod_method = parameters.get("lod_method", LOD_MEAN_STDDEV)
+        parameters["lod_method"] = LOD_METHOD_ALIASES.get(str(lod_method).lower(), lod_method)
+        if parameters["lod_method"] not in LOD_METHODS:
+            raise ValueError(f"Estimateur de la LOD inconnu: {lod_method}")
+        # LOD par lot si le lot analytique est mappé, sinon par période si la date d'analyse l'est
+        if "batch_id" in mapping:
+            parameters["lod_grouping"] = LOD_GROUP_BATCH
+        elif "analysis_date" in mapping:
+            parameters["lod_grouping"] = LOD_GROUP_PERIOD
+        else:
+            parameters["lod_grouping"] = LOD_GROUP_NONE
+        parameters.setdefault("lod_period", "W")
+    elif control_type == CONTROL_DUPLICATES:
+        regression = parameters.get("regression", REGRESSION_OLS)
+        parameters["regression"] = REGRESSION_ALIASES.get(str(regression).lower(), regression)
+        if parameters["regression"] not in REGRESSION_METHODS:
+            raise ValueError(f"Méthode de régression inconnue: {regression}")
+
+    parameters["bootstrap"] = int(parameters.get("bootstrap", 0) or 0)
+    parameters.setdefault("bootstrap_seed", DEFAULT_SEED)
+
+    return config
+
+
+# Fonction pour vérifier qu'une configuration peut être analysée en continu (un seul passage)
+def check_stream_config(config):
+    parameters = config["parameters"]
+    if "standards" in parameters:
+        raise ValueError("L'analyse multi-standards n'est pas disponible en continu.")
+    if "blank_label" in parameters:
+        raise ValueError("La contamination des blancs n'est pas disponible en continu.")
+    if parameters.get("lod_grouping", LOD_GROUP_NONE) != LOD_GROUP_NONE:
+        raise ValueError("La LOD par lot ou par période n'est pas disponible en continu.")
+    if "parent_id" in config["mapping"]:
+        raise ValueError("L'appariement des duplicatas sur lignes séparées n'est pas disponible en continu.")
+    if parameters["bootstrap"]:
+        raise ValueError("Le bootstrap n'est pas disponible en continu.")
+
+
+# Fonction pour lire un fichier de laboratoire en ne gardant que les colonnes mappées
+def read_lab_file(path, config):
+    mapping = config["mapping"]
+    file_extension = os.path.splitext(path)[1].lower().lstrip(".")
+
+    if file_extension in ("xlsx", "xls"):
+        sheets = config.get("sheets") or list_excel_sheets(path, file_extension)[:1]
+        return read_excel_sheets(path, sheets, file_extension)
+
+    separator = SEPARATORS.get(config.get("separator", ","), config.get("separator", ","))
+    source_columns = list(dict.fromkeys(mapping.values()))
+    numeric_columns = [mapping[field] for field in mapping if field in NUMERIC_FIELDS]
+    return read_csv_chunked(path, separator, usecols=source_columns, numeric_columns=numeric_columns)
+
+
+# Générateur des blocs mappés d'un fichier de laboratoire (un seul bloc pour un classeur Excel)
+def iter_lab_chunks(path, config):
+    mapping = config["mapping"]
+    file_extension = os.path.splitext(path)[1].lower().lstrip(".")
+
+    if file_extension in ("xlsx", "xls"):
+        yield map_columns(read_lab_file(path, config), mapping)
+        return
+
+    separator = SEPARATORS.get(config.get("separator", ","), config.get("separator", ","))
+    source_columns = list(dict.fromkeys(mapping.values()))
+    numeric_columns = [mapping[field] for field in mapping if field in NUMERIC_FIELDS]
+    with open(path, "rb") as f:
+        for chunk in iter_csv_chunks(f, separator, usecols=source_columns, numeric_columns=numeric_columns):
+            yield map_columns(chunk, mapping)
+
+
+# Fonction pour exécuter l'analyse configurée sur un DataFrame mappé
+def run_analysis(mapped_data, config):
+    control_type = config["control_type"]
+    parameters = config["parameters"]
+
+    if control_type == CONTROL_CRM and "standards" in parameters:
+        standard_params = pd.DataFrame(parameters["standards"], columns=STANDARD_PARAM_COLUMNS)
+        return analyze_crm_grouped(mapped_data, standard_params)
+
+    # Les fichiers sont déjà répartis entre les processus: le bootstrap reste dans le processus du fichier
+    resamples = parameters["bootstrap"]
+    seed = parameters["bootstrap_seed"]
+    if control_type == CONTROL_CRM:
+        results_df, stats_dict, metrics = analyze_crm(
+            mapped_data,
+            parameters["reference_value"],
+            parameters["tolerance_type"],
+            parameters["tolerance_value"],
+            parameters["reference_stddev"]
+        )
+        if resamples:
+            add_crm_intervals(results_df, stats_dict, metrics, parameters["reference_value"], resamples, seed, workers=1)
+    elif control_type == CONTROL_BLANKS:
+        if "blank_label" in parameters:
+            results_df, stats_dict, metrics = analyze_blank_carryover(mapped_data, parameters["blank_label"])
+        else:
+            results_df, stats_dict, metrics = analyze_blanks(
+                mapped_data,
+                parameters["lod_method"],
+                parameters["lod_grouping"],
+                parameters["lod_period"]
+            )
+        if resamples:
+            add_blank_intervals(results_df, stats_dict, metrics, resamples, seed, workers=1)
+    else:
+        if "parent_id" in config["mapping"]:
+            results_df, stats_dict, metrics = analyze_duplicate_rows(mapped_data, parameters["regression"])
+        else:
+            results_df, stats_dict, metrics = analyze_duplicates(mapped_data, parameters["regression"])
+        if resamples:
+            add_duplicate_intervals(results_df, stats_dict, metrics, resamples, seed, workers=1)
+    return results_df, stats_dict, metrics
+
+
+# Fonction pour exécuter l'analyse configurée en continu sur les blocs mappés d'un fichier
+def run_stream_analysis(chunks, config):
+    control_type = config["control_type"]
+    parameters = config["parameters"]
+
+    if control_type == CONTROL_CRM:
+        return stream_crm(
+            chunks,
+            parameters["reference_value"],
+            parameters["tolerance_type"],
+            parameters["tolerance_value"],
+            parameters["reference_stddev"]
+        )
+    if control_type == CONTROL_BLANKS:
+        return stream_blanks(chunks, parameters["lod_method"])
+    return stream_duplicates(chunks, parameters["regression"])
+
+
+# Conversion des valeurs NumPy / pandas pour l'écriture du rapport JSON
+def json_default(value):
+    if isinstance(value, pd.DataFrame):
+        return value.to_dict("records")
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+# Fonction pour renommer les colonnes des résultats avec les noms d'origine
+def rename_to_source(results_df, mapping):
+    return renamed_view(results_df, {field: source for field, source in mapping.items()})
+
+
+# Graphique du rapport de campagne pour l'analyse d'un fichier (axes nommés d'après les colonnes d'origine)
+def build_report_figure(results_df, metrics, config, title):
+    control_type = config["control_type"]
+    mapping = config["mapping"]
+
+    if control_type == CONTROL_DUPLICATES:
+        value_name = mapping.get("measured_value")
+        original_name = mapping.get("original_value", f"{value_name} (original)")
+        duplicate_name = mapping.get("duplicate_value", f"{value_name} (duplicata)")
+        return build_duplicate_figure(
+            results_df, metrics, f"{title} - {original_name} vs {duplicate_name}", original_name, duplicate_name
+        )
+
+    id_name = mapping["sample_id"]
+    value_name = mapping["measured_value"]
+    if control_type == CONTROL_CRM and "standards" in config["parameters"]:
+        return build_crm_grouped_figure(results_df, metrics, f"{title} - {value_name}", id_name, value_name)
+    if control_type == CONTROL_CRM:
+        return build_crm_figure(results_df, metrics, f"{title} - {value_name}", id_name, value_name)
+    return build_blank_figure(results_df, metrics, f"{title} - {value_name}", id_name, value_name)
+
+
+# Traitement complet d'un fichier (exécuté dans un processus du pool)
+def process_file(path, config, output_dir):
+    start = time.perf_counter()
+    stem = os.path.splitext(os.path.basename(path))[0]
+    summary = {"fichier": os.path.basename(path), "statut": "OK", "lignes": 0, "hors_limites": 0, "erreur": ""}
+
+    try:
+        if config.get("stream"):
+            process_stream(path, config, output_dir, stem, summary)
+        else:
+            process_in_memory(path, config, output_dir, stem, summary)
+    except Exception as e:
+        summary["statut"] = "Erreur"
+        summary["erreur"] = str(e)
+
+    summary["duree_s"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+# Traitement d'un fichier chargé en mémoire: tableau de résultats et rapport JSON
+def process_in_memory(path, config, output_dir, stem, summary):
+    data = read_lab_file(path, config)
+    mapped_data = map_columns(data, config["mapping"])
+    results_df, stats_dict, metrics = run_analysis(mapped_data, config)
+
+    results_path = os.path.join(output_dir, f"{stem}_resultats.csv")
+    rename_to_source(results_df, config["mapping"]).to_csv(results_path, index=False)
+
+    summary["lignes"] = len(results_df)
+    if 'Statut' in results_df.columns:
+        summary["hors_limites"] = int((results_df['Statut'] != 'OK').sum())
+
+    report = {
+        "fichier": os.path.basename(path),
+        "type_de_controle": config["control_type"],
+        "parametres": config["parameters"],
+        "statistiques": stats_dict,
+        "valeurs": metrics,
+        "lignes": summary["lignes"],
+        "hors_limites": summary["hors_limites"]
+    }
+    with open(os.path.join(output_dir, f"{stem}_rapport.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=json_default)
+
+    # Section du rapport de campagne: le graphique est rendu dans ce processus, en parallèle des autres fichiers
+    if config.get("report"):
+        summary["section"] = report_section(results_df, stats_dict, metrics, config, stem)
+
+
+# Section du rapport de campagne d'un fichier; un échec du rendu (kaleido absent, plantage de Chromium) laisse
+# la section sans graphique au lieu de mettre le fichier en erreur, ses résultats étant déjà écrits
+def report_section(results_df, stats_dict, metrics, config, stem):
+    from geoqaqc_report import campaign_section, export_plotly_to_png, keep_failed_rows
+
+    image = None
+    note = None
+    try:
+        image = export_plotly_to_png(build_report_figure(results_df, metrics, config, stem))
+    except Exception as e:
+        note = f"Graphique non disponible: {e}"
+
+    # Seules les lignes non conformes sont renvoyées au processus principal si le rapport s'y limite
+    section = campaign_section(
+        stem, None, stats_dict, rename_to_source(results_df, config["mapping"]), image=image, note=note
+    )
+    if config.get("report_failures_only"):
+        section = keep_failed_rows(section)
+    return section
+
+
+# Traitement d'un fichier en continu: rapport JSON seulement (pas de tableau par ligne)
+def process_stream(path, config, output_dir, stem, summary):
+    stats_dict, metrics = run_stream_analysis(iter_lab_chunks(path, config), config)
+    summary["lignes"] = metrics["count"]
+    summary["hors_limites"] = metrics.get("failures", 0)
+
+    report = {
+        "fichier": os.path.basename(path),
+        "type_de_controle": config["control_type"],
+        "parametres": config["parameters"],
+        "statistiques": stats_dict,
+        "valeurs": metrics,
+        "lignes": summary["lignes"],
+        "hors_limites": summary["hors_limites"],
+        "continu": True
+    }
+    with open(os.path.join(output_dir, f"{stem}_rapport.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=json_default)
+
+    # Pas de tableau par ligne en continu: la section du rapport ne contient que les statistiques
+    if config.get("report"):
+        from geoqaqc_report import campaign_section
+        summary["section"] = campaign_section(stem, None, stats_dict, None)
+
+
+# Fonction pour lister les fichiers de laboratoire d'un répertoire
+def find_lab_files(input_dir, extensions=DEFAULT_EXTENSIONS):
+    return sorted(
+        os.path.join(input_dir, name)
+        for name in os.listdir(input_dir)
+        if name.lower().endswith(extensions) and os.path.isfile(os.path.join(input_dir, name))
+    )
+
+
+# Traitement de tous les fichiers d'un répertoire en parallèle
+def run_batch(input_dir, config, output_dir, workers=None):
+    os.makedirs(output_dir, exist_ok=True)
+    files = find_lab_files(input_dir)
+
+    summaries = []
+    if workers == 1:
+        summaries = [process_file(path, config, output_dir) for path in files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_file, path, config, output_dir) for path in files]
+            for future in as_completed(futures):
+                summaries.append(future.result())
+
+    summary_df = pd.DataFrame(summaries, columns=["fichier", "statut", "lignes", "hors_limites", "erreur", "duree_s"])
+    summary_df = summary_df.sort_values("fichier").reset_index(drop=True)
+    summary_df.to_csv(os.path.join(output_dir, "sommaire_lot.csv"), index=False)
+
+    if config.get("report"):
+        write_campaign_report(summaries, config)
+    return summary_df
+
+
+# Rapport de campagne: sections des fichiers analysés, dans l'ordre des noms de fichiers
+def write_campaign_report(summaries, config):
+    from geoqaqc_report import export_campaign_to_pdf
+
+    ordered = sorted(summaries, key=lambda summary: summary["fichier"])
+    sections = [summary["section"] for summary in ordered if "section" in summary]
+    pdf_bytes = export_campaign_to_pdf(
+        config.get("report_title", "Rapport de campagne"),
+        sections,
+        config.get("report_author", "Didier Ouedraogo, P.Geo"),
+        failures_only=config.get("report_failures_only", False)
+    )
+    with open(config["report"], "wb") as f:
+        f.write(pdf_bytes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Contrôle qualité GeoQAQC par lots (CRM, blancs, duplicatas).")
+    parser.add_argument("input_dir", help="Répertoire contenant les fichiers de laboratoire")
+    parser.add_argument("--config", required=True, help="Fichier JSON de mappage et de paramètres")
+    parser.add_argument("--output", default="resultats_geoqaqc", help="Répertoire de sortie")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus (défaut: nombre de cœurs)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Analyse en continu par blocs (fichiers plus grands que la mémoire, rapport seulement)")
+    parser.add_argument("--report", default=None,
+                        help="Rapport de campagne PDF réunissant tous les fichiers (table des matières)")
+    parser.add_argument("--report-failures-only", action="store_true",
+                        help="Rapport de campagne limité aux lignes non conformes")
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_config(args.config)
+        if args.stream:
+            check_stream_config(config)
+            config["stream"] = True
+        if args.report:
+            config["report"] = args.report
+            config["report_failures_only"] = args.report_failures_only
+    except (OSError, ValueError) as e:
+        print(f"Erreur de configuration: {e}", file=sys.stderr)
+        return 2
+
+    summary_df = run_batch(args.input_dir, config, args.output, args.workers)
+    failed = int((summary_df["statut"] != "OK").sum())
+
+    print(f"{len(summary_df)} fichier(s) traité(s), {failed} en erreur. Résultats dans {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+import numpy as np
+
+from geoqaqc_engine import (
+    REGRESSION_OLS, REGRESSION_RMA, REGRESSION_THEIL_SEN, LOD_MEAN_STDDEV,
+    theil_sen_regression
+)
+
+# Nombre de rééchantillonnages et graine par défaut (résultats reproductibles)
+DEFAULT_RESAMPLES = 1000
+DEFAULT_SEED = 12345
+DEFAULT_CONFIDENCE = 95.0
+
+# Taille maximale d'un bloc d'indices (rééchantillonnages × observations) générés en une fois
+CHUNK_ELEMENTS = 4_000_000
+
+# En dessous de ce volume (rééchantillonnages × observations), le calcul reste dans le processus courant
+PARALLEL_MIN_ELEMENTS = 50_000_000
+
+# Nombre de processus du pool de calcul
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Statistiques des duplicatas pour chaque ligne (rééchantillonnage) des tableaux 2-D; la pente est celle de
+# l'estimateur rapporté (OLS, RMA, ou Theil-Sen exact / sur échantillon de paires comme theil_sen_regression)
+def duplicate_statistics(x, y, method=REGRESSION_OLS):
+    x_mean = x.mean(axis=1)
+    y_mean = y.mean(axis=1)
+    dx = x - x_mean[:, None]
+    dy = y - y_mean[:, None]
+    sxx = np.einsum("ij,ij->i", dx, dx)
+    syy = np.einsum("ij,ij->i", dy, dy)
+    sxy = np.einsum("ij,ij->i", dx, dy)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = sxy / np.sqrt(sxx * syy)
+        if method == REGRESSION_OLS:
+            slope = sxy / sxx
+        elif method == REGRESSION_RMA:
+            slope = np.sign(r) * np.sqrt(syy / sxx)
+        elif method == REGRESSION_THEIL_SEN:
+            # Médiane des pentes: pas de forme vectorisée, un ajustement par rééchantillonnage
+            fits = np.array([theil_sen_regression(x_row, y_row) for x_row, y_row in zip(x, y)], dtype=float)
+            return {"slope": fits[:, 0], "intercept": fits[:, 1], "r_squared": r * r}
+        else:
+            raise ValueError(f"Méthode de régression inconnue: {method}")
+    intercept = y_mean - slope * x_mean
+
+    return {"slope": slope, "intercept": intercept, "r_squared": r * r}
+
+
+# Moyenne et écart-type de chaque rééchantillonnage (CRM et blancs)
+def mean_statistics(values):
+    return {"mean": values.mean(axis=1), "std": values.std(axis=1)}
+
+
+# Calcul d'un bloc de rééchantillonnages (exécuté dans un processus du pool)
+def _bootstrap_block(statistic, arrays, seed, n_resamples):
+    rng = np.random.default_rng(seed)
+    n = len(arrays[0])
+    rows = max(1, CHUNK_ELEMENTS // max(n, 1))
+
+    parts = []
+    for start in range(0, n_resamples, rows):
+        # Indices des rééchantillonnages générés d'un seul coup sous forme de tableau 2-D
+        indices = rng.integers(0, n, size=(min(rows, n_resamples - start), n), dtype=np.int32)
+        parts.append(statistic(*(array[indices] for array in arrays)))
+
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# Pool de processus gardé entre les appels; processus lancés par « spawn » pour ne pas copier les fils
+# du serveur Streamlit ni ceux du moteur de rendu
+def get_bootstrap_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=DEFAULT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_pool.shutdown, cancel_futures=True)
+        return _pool
+
+
+# Abandon d'un pool dont un processus s'est arrêté; recréé au prochain calcul
+def _discard_bootstrap_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Bootstrap d'une statistique vectorisée; retourne un tableau de valeurs par statistique
+def bootstrap(statistic, arrays, n_resamples=DEFAULT_RESAMPLES, seed=DEFAULT_SEED, workers=None):
+    arrays = [np.asarray(array, dtype=float) for array in arrays]
+    n = len(arrays[0])
+    if n < 2:
+        raise ValueError("Au moins deux observations sont nécessaires pour le bootstrap.")
+
+    # Découpage fixe en blocs (indépendant du nombre de processus) pour des résultats reproductibles
+    block_size = max(1, CHUNK_ELEMENTS // n)
+    blocks = [min(block_size, n_resamples - start) for start in range(0, n_resamples, block_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(blocks))
+
+    workers = min(workers or DEFAULT_WORKERS, DEFAULT_WORKERS)
+    if workers > 1 and len(blocks) > 1 and n_resamples * n >= PARALLEL_MIN_ELEMENTS:
+        pool = get_bootstrap_pool()
+        futures = [
+            pool.submit(_bootstrap_block, statistic, arrays, block_seed, size)
+            for block_seed, size in zip(seeds, blocks)
+        ]
+        try:
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            _discard_bootstrap_pool(pool)
+            raise
+    else:
+        results = [_bootstrap_block(statistic, arrays, block_seed, size) for block_seed, size in zip(seeds, blocks)]
+
+    return {name: np.concatenate([result[name] for result in results]) for name in results[0]}
+
+
+# Intervalle de confiance par percentiles
+def percentile_interval(values, confidence=DEFAULT_CONFIDENCE):
+    alpha = (100 - confidence) / 2
+    low, high = np.nanpercentile(values, [alpha, 100 - alpha])
+    return float(low), float(high)
+
+
+# Intervalles de confiance de la régression des duplicatas (pente, ordonnée à l'origine, R²)
+def duplicate_intervals(x, y, method=REGRESSION_OLS, n_resamples=DEFAULT_RESAMPLES, seed=DEFAULT_SEED, workers=None):
+    samples = bootstrap(partial(duplicate_statistics, method=method), [x, y], n_resamples, seed, workers)
+    return {
+        "slope": percentile_interval(samples["slope"]),
+        "intercept": percentile_interval(samples["intercept"]),
+        "r_squared": percentile_interval(samples["r_squared"])
+    }
+
+
+# Intervalles de confiance de la moyenne et du biais des CRM (%)
+def crm_intervals(values, reference_value, n_resamples=DEFAULT_RESAMPLES, seed=DEFAULT_SEED, workers=None):
+    samples = bootstrap(mean_statistics, [values], n_resamples, seed, workers)
+    intervals = {"mean": percentile_interval(samples["mean"])}
+    # Le biais relatif n'est pas défini pour une valeur de référence nulle
+    if reference_value:
+        intervals["bias"] = percentile_interval((samples["mean"] - reference_value) / reference_value * 100)
+    return intervals
+
+
+# Intervalles de confiance de la moyenne et de la limite de détection des blancs (moyenne + k écarts-types)
+def blank_intervals(values, k=3, n_resamples=DEFAULT_RESAMPLES, seed=DEFAULT_SEED, workers=None):
+    samples = bootstrap(mean_statistics, [values], n_resamples, seed, workers)
+    return {
+        "mean": percentile_interval(samples["mean"]),
+        "lod": percentile_interval(samples["mean"] + k * samples["std"])
+    }
+
+
+# Fonction pour formater un intervalle de confiance
+def format_interval(interval, digits=4, suffix=""):
+    return f"[{interval[0]:.{digits}f}{suffix} ; {interval[1]:.{digits}f}{suffix}]"
+
+
+# Fonction pour retirer les valeurs non numériques ou manquantes (paires complètes seulement)
+def finite_values(*arrays):
+    arrays = [np.asarray(array, dtype=float) for array in arrays]
+    valid = np.logical_and.reduce([np.isfinite(array) for array in arrays])
+    return [array[valid] for array in arrays]
+
+
+# Ajouter les intervalles de confiance de la régression des duplicatas aux statistiques et aux métriques
+def add_duplicate_intervals(results_df, stats_dict, metrics, n_resamples=DEFAULT_RESAMPLES, seed=DEFAULT_SEED,
+                            workers=None):
+    x, y = finite_values(results_df["original_value"], results_df["duplicate_value"])
+    intervals = duplicate_intervals(x, y, metrics.get("regression_method", REGRESSION_OLS), n_resamples, seed, workers)
+    metrics["bootstrap"] = dict(intervals, resamples=n_resamples, seed=seed)
+
+    stats_dict[f"IC {DEFAULT_CONFIDENCE:.0f}% pente (bootstrap)"] = format_interval(intervals["slope"])
+    stats_dict[f"IC {DEFAULT_CONFIDENCE:.0f}% ordonnée à l'origine (bootstrap)"] = format_interval(intervals["intercept"])
+    stats_dict[f"IC {DEFAULT_CONFIDENCE:.0f}% R² (bootstrap)"] = format_interval(intervals["r_squared"])
+
+
+# Ajouter les intervalles de confiance de la moyenne et du biais d'un CRM
+def add_crm_intervals(results_df, stats_dict, metrics, reference_value, n_resamples=DEFAULT_RESAMPLES, seed=DEFAULT_SEED,
+                      workers=None):
+    values, = finite_values(results_df["measured_value"])
+    intervals = crm_intervals(values, reference_value, n_resamples, seed, workers)
+    metrics["bootstrap"] = dict(intervals, resamples=n_resamples, seed=seed)
+
+    stats_dict[f"IC {DEFAULT_CONFIDENCE:.0f}% moyenne (bootstrap)"] = format_interval(intervals["mean"])
+    if "bias" in intervals:
+        stats_dict[f"IC {DEFAULT_CONFIDENCE:.0f}% biais (bootstrap)"] = format_interval(intervals["bias"], 2, "%")
+
+
+# Ajouter les intervalles de confiance de la moyenne et de la LOD des blancs
+def add_blank_intervals(results_df, stats_dict, metrics, n_resamples=DEFAULT_RESAMPLES, seed=DEFAULT_SEED, workers=None):
+    values, = finite_values(results_df["measured_value"])
+    intervals = blank_intervals(values, n_resamples=n_resamples, seed=seed, workers=workers)
+    metrics["bootstrap"] = dict(intervals, resamples=n_resamples, seed=seed)
+
+    stats_dict[f"IC {DEFAULT_CONFIDENCE:.0f}% moyenne (bootstrap)"] = format_interval(intervals["mean"])
+    # L'intervalle de la LOD correspond à l'estimateur moyenne + 3 écarts-types sur l'ensemble des blancs
+    if metrics.get("lod_method", LOD_MEAN_STDDEV) == LOD_MEAN_STDDEV:
+        stats_dict[f"IC {DEFAULT_CONFIDENCE:.0f}% LOD (bootstrap)"] = format_interval(intervals["lod"])
@@ -0,0 +1,302 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+# Répertoire et taille maximale par défaut du cache des fichiers importés
+DEFAULT_CACHE_DIR = os.environ.get(
+    "GEOQAQC_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "geoqaqc", "uploads")
+)
+DEFAULT_CACHE_MAX_BYTES = int(os.environ.get("GEOQAQC_CACHE_MAX_MB", "1024")) * 1024 * 1024
+
+# Taille des blocs lus pour calculer l'empreinte d'un fichier
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+
+CACHE_EXTENSION = ".arrow"
+
+# Bornes par défaut du cache mémoire des résultats d'analyse
+DEFAULT_MEMO_MAX_ENTRIES = 16
+DEFAULT_MEMO_MAX_BYTES = 256 * 1024 * 1024
+
+
+# Fonction pour calculer l'empreinte du contenu d'un fichier (chemin, octets ou fichier téléchargé)
+def content_hash(source):
+    digest = hashlib.blake2b(digest_size=20)
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    elif isinstance(source, str) or hasattr(source, "__fspath__"):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+    elif hasattr(source, "getbuffer"):
+        digest.update(source.getbuffer())
+    else:
+        position = source.tell()
+        source.seek(0)
+        for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+        source.seek(position)
+
+    return digest.hexdigest()
+
+
+# Cache disque des fichiers importés déjà analysés, au format Arrow IPC
+class UploadCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError:
+            # Répertoire impossible à créer: chaque lecture sera un échec et chaque écriture ignorée
+            pass
+
+    # Construire la clé à partir de l'empreinte du contenu et des paramètres de lecture
+    def make_key(self, digest, params=None):
+        params_json = json.dumps(params or {}, sort_keys=True, default=str)
+        params_digest = hashlib.blake2b(params_json.encode("utf-8"), digest_size=8).hexdigest()
+        return f"{digest}-{params_digest}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_EXTENSION)
+
+    # Relire un DataFrame depuis le cache (fichier projeté en mémoire), ou None
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with pa.memory_map(path, "r") as source:
+                table = ipc.open_file(source).read_all()
+            df = table.to_pandas()
+        except (FileNotFoundError, pa.ArrowInvalid, OSError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Mettre à jour la date d'accès pour l'éviction LRU
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return df
+
+    # Enregistrer un DataFrame dans le cache; retourne False si le format n'est pas supporté ou si l'écriture
+    # échoue (répertoire en lecture seule, disque plein): l'import continue sans cache
+    def put(self, key, df):
+        try:
+            table = pa.Table.from_pandas(
+                df.rename(columns=str),
+                preserve_index=False
+            )
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            return False
+
+        if table.nbytes > self.max_bytes:
+            return False
+
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with pa.OSFile(temp_path, "wb") as sink:
+                with ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(temp_path, path)
+        except OSError:
+            # Supprimer le fichier temporaire partiellement écrit
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return False
+
+        self.evict()
+        return True
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(CACHE_EXTENSION):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    # Supprimer les entrées les moins récemment utilisées jusqu'à respecter la taille maximale
+    def evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "size_bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes
+        }
+
+
+# Fonction pour calculer l'empreinte d'un DataFrame (contenu, colonnes et types)
+def frame_fingerprint(df):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((df.shape, list(map(str, df.columns)), list(map(str, df.dtypes)))).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+# Fonction pour construire une clé de mémoïsation à partir de l'empreinte et des paramètres
+def analysis_key(fingerprint, control_type, params=None):
+    params_json = json.dumps(params or {}, sort_keys=True, default=str)
+    return f"{control_type}|{fingerprint}|{params_json}"
+
+
+# Fonction pour lister les tampons mémoire d'une colonne (adresse, taille), afin de repérer les vues partagées
+def _column_buffers(series):
+    values = series.array
+    if hasattr(values, "_pa_array"):
+        return [
+            (buf.address, buf.size)
+            for chunk in values._pa_array.chunks for buf in chunk.buffers() if buf is not None
+        ]
+    if isinstance(series.dtype, np.dtype):
+        array = series.to_numpy(copy=False)
+        base = array if array.base is None or not isinstance(array.base, np.ndarray) else array.base
+        return [(base.__array_interface__["data"][0], array.nbytes)]
+    return [(id(values), int(series.memory_usage(index=False, deep=False)))]
+
+
+# Fonction pour estimer la taille des données d'un graphique Plotly (tableaux des traces et mise en page)
+def _payload_nbytes(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(_payload_nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(_payload_nbytes(v) for v in obj)
+    if isinstance(obj, (str, bytes)):
+        return sys.getsizeof(obj)
+    return 0
+
+
+# Fonction pour estimer la mémoire occupée par une entrée mémoïsée: DataFrames (chaque tampon compté une
+# seule fois, les vues partagées entre tableaux ne sont donc pas recomptées), Styler (son tableau), graphiques
+# Plotly (données des traces) et conteneurs de ces objets
+def estimate_nbytes(*objects):
+    seen = set()
+
+    def visit(obj):
+        if obj is None:
+            return 0
+        if isinstance(obj, pd.DataFrame):
+            total = 0
+            for _, series in obj.items():
+                for address, size in _column_buffers(series):
+                    if address not in seen:
+                        seen.add(address)
+                        total += size
+            return total
+        if isinstance(getattr(obj, "data", None), pd.DataFrame):
+            return visit(obj.data)
+        if hasattr(obj, "to_plotly_json"):
+            if id(obj) in seen:
+                return 0
+            seen.add(id(obj))
+            return _payload_nbytes(obj.to_plotly_json())
+        if isinstance(obj, dict):
+            return sum(visit(v) for v in obj.values())
+        if isinstance(obj, (list, tuple)):
+            return sum(visit(v) for v in obj)
+        return 0
+
+    return int(sum(visit(obj) for obj in objects))
+
+
+# Cache mémoire LRU des résultats d'analyse, borné en nombre d'entrées et en taille
+class AnalysisMemo:
+    def __init__(self, max_entries=DEFAULT_MEMO_MAX_ENTRIES, max_bytes=DEFAULT_MEMO_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._entries[key]
+
+    def put(self, key, value, nbytes=None):
+        if nbytes is None:
+            nbytes = estimate_nbytes(value)
+        self._entries[key] = value
+        self._sizes[key] = nbytes
+        self._entries.move_to_end(key)
+
+        # Éviction des entrées les moins récemment utilisées (l'entrée ajoutée est conservée)
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or sum(self._sizes.values()) > self.max_bytes
+        ):
+            oldest, _ = self._entries.popitem(last=False)
+            del self._sizes[oldest]
+
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self._sizes.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "size_bytes": sum(self._sizes.values()),
+            "max_bytes": self.max_bytes
+        }
@@ -0,0 +1,140 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Fichier du catalogue local des matériaux de référence certifiés (CRM)
+DEFAULT_CATALOG_PATH = os.environ.get(
+    "GEOQAQC_CRM_CATALOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "crm_catalogue.csv")
+)
+
+# Colonnes du catalogue
+CATALOG_COLUMNS = ["standard_id", "element", "certified_value", "stddev", "units"]
+
+
+# Fonction pour normaliser les identifiants (standards et éléments) avant la recherche
+def normalize_keys(values):
+    return pd.Series(values, dtype="object").astype(str).str.strip().str.upper().to_numpy()
+
+
+# Fonction pour extraire le symbole de l'élément d'un nom de colonne (Au_ppm -> AU)
+def element_symbol(values):
+    return pd.Series(normalize_keys(values)).str.split(r"[_\s(\[]", n=1, regex=True).str[0].to_numpy()
+
+
+# Catalogue des CRM indexé par (standard, élément)
+class CRMCatalog:
+    def __init__(self, table):
+        missing = [column for column in CATALOG_COLUMNS[:3] if column not in table.columns]
+        if missing:
+            raise ValueError(f"Colonnes manquantes dans le catalogue des CRM: {', '.join(missing)}")
+
+        table = table.reindex(columns=CATALOG_COLUMNS).copy()
+        table["certified_value"] = pd.to_numeric(table["certified_value"], errors="coerce")
+        table["stddev"] = pd.to_numeric(table["stddev"], errors="coerce").fillna(0.0)
+        table["units"] = table["units"].fillna("")
+        table = table.dropna(subset=["standard_id", "element", "certified_value"])
+
+        # Index trié sur les clés normalisées; la dernière ligne l'emporte en cas de doublon
+        table.index = pd.MultiIndex.from_arrays(
+            [normalize_keys(table["standard_id"]), normalize_keys(table["element"])],
+            names=["standard_key", "element_key"]
+        )
+        table = table[~table.index.duplicated(keep="last")].sort_index()
+
+        self.table = table
+        # Valeur sentinelle en dernière position: l'indice -1 (paire introuvable) donne NaN
+        self._certified = np.append(table["certified_value"].to_numpy(dtype=float), np.nan)
+        self._stddev = np.append(table["stddev"].to_numpy(dtype=float), np.nan)
+        self._units = np.append(table["units"].astype(str).to_numpy(dtype=object), "")
+
+    # Lire le catalogue depuis un fichier CSV ou Excel
+    @classmethod
+    def from_file(cls, path):
+        extension = os.path.splitext(path)[1].lower()
+        if extension in (".xlsx", ".xls"):
+            table = pd.read_excel(path)
+        else:
+            table = pd.read_csv(path, sep=None, engine="python")
+        table.columns = [str(column).strip().lower() for column in table.columns]
+        return cls(table)
+
+    def __len__(self):
+        return len(self.table)
+
+    def standards(self):
+        return sorted(self.table["standard_id"].astype(str).unique())
+
+    def elements(self, standard_id):
+        key = normalize_keys([standard_id])[0]
+        if key not in self.table.index.get_level_values(0):
+            return []
+        return self.table.loc[key, "element"].astype(str).tolist()
+
+    # Recherche vectorisée de paires (standard, élément): une seule jointure sur l'index
+    def lookup(self, standard_ids, elements):
+        standard_ids, elements = np.broadcast_arrays(
+            np.asarray(standard_ids, dtype=object),
+            np.asarray(elements, dtype=object)
+        )
+        standard_keys = normalize_keys(standard_ids.ravel())
+
+        positions = self.table.index.get_indexer(
+            pd.MultiIndex.from_arrays([standard_keys, normalize_keys(elements.ravel())])
+        )
+        # Noms de colonnes du type « Au_ppm »: recherche sur le symbole de l'élément
+        unmatched = positions < 0
+        if unmatched.any():
+            positions[unmatched] = self.table.index.get_indexer(
+                pd.MultiIndex.from_arrays([standard_keys[unmatched], element_symbol(elements.ravel()[unmatched])])
+            )
+
+        return pd.DataFrame({
+            "standard_id": standard_ids.ravel(),
+            "element": elements.ravel(),
+            "certified_value": self._certified[positions],
+            "stddev": self._stddev[positions],
+            "units": self._units[positions]
+        })
+
+    # Compléter un tableau de paramètres (par élément ou par standard) avec les valeurs certifiées
+    def fill_params(self, params, standard_ids, elements):
+        found = self.lookup(standard_ids, elements)
+        known = found["certified_value"].notna().to_numpy()
+        params = params.copy()
+        params.loc[known, "reference_value"] = found.loc[known, "certified_value"].to_numpy()
+        params.loc[known, "reference_stddev"] = found.loc[known, "stddev"].to_numpy()
+        return params, int(known.sum())
+
+
+# Catalogues déjà chargés, rechargés seulement si le fichier a changé
+_catalog_cache = {}
+_catalog_lock = threading.Lock()
+
+
+# Fonction pour obtenir la signature d'un fichier (date de modification et taille), ou None
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Fonction pour charger le catalogue des CRM (None si le fichier n'existe pas)
+def load_catalog(path=DEFAULT_CATALOG_PATH):
+    signature = file_signature(path)
+    if signature is None:
+        return None
+
+    with _catalog_lock:
+        cached = _catalog_cache.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+    catalog = CRMCatalog.from_file(path)
+    with _catalog_lock:
+        _catalog_cache[path] = (signature, catalog)
+    return catalog
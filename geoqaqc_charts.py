@@ -0,0 +1,689 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from geoqaqc_precision import hard_ranking
+from geoqaqc_rules import RULES_COLUMN
+
+# Au-delà de ce nombre de points, les cartes de contrôle passent en rendu WebGL avec décimation côté serveur
+LARGE_CHART_POINTS = 5000
+
+# Nombre de points conservés par la décimation LTTB (en plus des points hors limites)
+DECIMATION_POINTS = 4000
+
+# Rendu du nuage de points des duplicatas (automatique: densité au-delà de DENSITY_MIN_PAIRS paires)
+SCATTER_AUTO = "Automatique"
+SCATTER_POINTS = "Points"
+SCATTER_DENSITY = "Densité (histogramme 2-D)"
+SCATTER_MODES = [SCATTER_AUTO, SCATTER_POINTS, SCATTER_DENSITY]
+DENSITY_MIN_PAIRS = 100_000
+
+# Nombre de classes par axe de l'histogramme 2-D, seuil HARD (%) des paires tracées individuellement et nombre
+# maximal de ces paires (les plus éloignées)
+DENSITY_BINS = 200
+DENSITY_OUTLIER_HARD = 10.0
+DENSITY_MAX_OUTLIERS = 5000
+
+
+# Décimation « largest triangle three buckets »: indices des points conservés (premier et dernier inclus)
+def lttb_indices(x, y, n_out=DECIMATION_POINTS):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 classes entre le premier et le dernier point; moyenne de chaque classe par sommes cumulées
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    sum_x = np.concatenate(([0.0], np.cumsum(x)))
+    sum_y = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = edges[1:] - edges[:-1]
+    mean_x = np.append((sum_x[edges[1:]] - sum_x[edges[:-1]]) / sizes, x[-1])
+    mean_y = np.append((sum_y[edges[1:]] - sum_y[edges[:-1]]) / sizes, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        # Point de la classe formant le plus grand triangle avec le point retenu précédent et la classe suivante
+        area = np.abs(
+            (x[previous] - mean_x[i + 1]) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (mean_y[i + 1] - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+# Indices affichés d'une grande série: décimation LTTB des valeurs finies (les valeurs manquantes fausseraient
+# les moyennes des classes) plus tous les points à conserver (hors limites, règles)
+def decimated_indices(values, keep=None, n_out=DECIMATION_POINTS):
+    values = np.asarray(values, dtype=float)
+    finite = np.flatnonzero(np.isfinite(values))
+    indices = finite[lttb_indices(finite, values[finite], n_out)]
+    if keep is not None:
+        indices = np.union1d(indices, np.flatnonzero(keep))
+    return indices
+
+
+# Trace WebGL d'une grande série décimée: position dans la série en abscisse, identifiant au survol
+def add_decimated_series(fig, results_df, id_column, value_column, keep, showlegend=True, **position):
+    values = results_df[value_column].to_numpy(dtype=float)
+    shown = decimated_indices(values, keep)
+    fig.add_trace(go.Scattergl(
+        x=shown,
+        y=values[shown],
+        mode='lines+markers',
+        name=f'Valeur mesurée ({len(shown):,} / {len(values):,} points)'.replace(",", " "),
+        text=results_df[id_column].to_numpy()[shown],
+        hovertemplate="%{text}<br>%{y}<extra></extra>",
+        line=dict(color='rgb(75, 192, 192)', width=1),
+        marker=dict(size=4),
+        showlegend=showlegend
+    ), **position)
+    return shown
+
+
+# Masque des points hors limites d'une série (statut si présent, sinon limites de la série); un statut
+# manquant (valeur non mesurée) n'est pas un échec
+def failed_points(results_df, value_column, lower_limit, upper_limit, status_column='Statut'):
+    if status_column in results_df.columns:
+        return results_df[status_column].isin(['Hors limites']).to_numpy()
+    values = results_df[value_column].to_numpy(dtype=float)
+    return (values < lower_limit) | (values > upper_limit)
+
+
+# Masque des points toujours affichés après décimation: hors limites ou signalés par une règle de Westgard
+def kept_points(results_df, value_column, lower_limit, upper_limit):
+    keep = failed_points(results_df, value_column, lower_limit, upper_limit)
+    if RULES_COLUMN in results_df.columns:
+        keep = keep | (results_df[RULES_COLUMN] != "").to_numpy()
+    return keep
+
+
+# Ligne constante dessinée comme une forme (aucun point envoyé au navigateur)
+def add_constant_line(fig, value, name, color, **position):
+    fig.add_hline(y=value, line=dict(color=color, width=2, dash='dash'), annotation_text=name,
+                  annotation_position="top left", **position)
+
+
+# Points signalés par les règles de Westgard (survol: liste des règles violées); pour une grande série
+# décimée, seuls les points affichés sont marqués, à leur position dans la série (webgl: rendu WebGL seul)
+def add_rule_markers(fig, results_df, id_column, value_column, showlegend=True, shown=None, webgl=False, **position):
+    if RULES_COLUMN not in results_df.columns:
+        return
+    flagged = (results_df[RULES_COLUMN] != "").to_numpy()
+    if shown is not None:
+        displayed = np.zeros(len(flagged), dtype=bool)
+        displayed[shown] = True
+        flagged = flagged & displayed
+    if not flagged.any():
+        return
+
+    large = webgl or shown is not None
+    trace = go.Scattergl if large else go.Scatter
+    fig.add_trace(trace(
+        x=results_df[id_column].to_numpy()[flagged] if shown is None else np.flatnonzero(flagged),
+        y=results_df[value_column].to_numpy()[flagged],
+        mode='markers',
+        name='Règles de Westgard',
+        text=results_df[RULES_COLUMN].to_numpy()[flagged],
+        hovertemplate="%{x}<br>%{y}<br>%{text}<extra></extra>",
+        marker=dict(color='rgb(255, 159, 64)', size=8 if large else 12, symbol='x'),
+        showlegend=showlegend
+    ), **position)
+
+
+# Graphique de contrôle des standards CRM
+def build_crm_figure(results_df, metrics, title, x_title, y_title):
+    id_column = "sample_id"
+    value_column = "measured_value"
+
+    fig = go.Figure()
+
+    # Grande série: rendu WebGL, points décimés (hors limites et règles toujours affichés) et limites en formes
+    # constantes
+    if len(results_df) > LARGE_CHART_POINTS:
+        keep = kept_points(results_df, value_column, metrics["lower_limit"], metrics["upper_limit"])
+        shown = add_decimated_series(fig, results_df, id_column, value_column, keep)
+        add_constant_line(fig, metrics["reference_value"], 'Valeur référence', 'rgb(54, 162, 235)')
+        add_constant_line(fig, metrics["upper_limit"], 'Limite supérieure', 'rgb(255, 99, 132)')
+        add_constant_line(fig, metrics["lower_limit"], 'Limite inférieure', 'rgb(255, 99, 132)')
+        add_rule_markers(fig, results_df, id_column, value_column, shown=shown)
+        return layout_control_chart(fig, title, f"{x_title} (ordre d'analyse)", y_title)
+
+    # Données mesurées
+    fig.add_trace(go.Scatter(
+        x=results_df[id_column],
+        y=results_df[value_column],
+        mode='lines+markers',
+        name='Valeur mesurée',
+        line=dict(color='rgb(75, 192, 192)', width=2),
+        marker=dict(size=8)
+    ))
+
+    # Valeur de référence
+    fig.add_trace(go.Scatter(
+        x=results_df[id_column],
+        y=[metrics["reference_value"]] * len(results_df),
+        mode='lines',
+        name='Valeur référence',
+        line=dict(color='rgb(54, 162, 235)', width=2, dash='dash')
+    ))
+
+    # Limites
+    fig.add_trace(go.Scatter(
+        x=results_df[id_column],
+        y=[metrics["upper_limit"]] * len(results_df),
+        mode='lines',
+        name='Limite supérieure',
+        line=dict(color='rgb(255, 99, 132)', width=2, dash='dash')
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=results_df[id_column],
+        y=[metrics["lower_limit"]] * len(results_df),
+        mode='lines',
+        name='Limite inférieure',
+        line=dict(color='rgb(255, 99, 132)', width=2, dash='dash')
+    ))
+
+    add_rule_markers(fig, results_df, id_column, value_column)
+
+    return layout_control_chart(fig, title, x_title, y_title)
+
+
+# Mise en forme commune des cartes de contrôle
+def layout_control_chart(fig, title, x_title, y_title):
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_title,
+        yaxis_title=y_title,
+        height=600,
+        hovermode="closest"
+    )
+
+    return fig
+
+
+# Graphique de contrôle des blancs
+def build_blank_figure(results_df, metrics, title, x_title, y_title):
+    id_column = "sample_id"
+    value_column = "measured_value"
+
+    fig = go.Figure()
+    grouped = "LOD" in results_df.columns
+
+    # Grande série: rendu WebGL, points décimés (blancs élevés toujours affichés) et lignes constantes en formes
+    if len(results_df) > LARGE_CHART_POINTS:
+        elevated = (results_df['Statut'] != 'OK').to_numpy() if 'Statut' in results_df.columns else None
+        add_decimated_series(fig, results_df, id_column, value_column, elevated)
+        add_constant_line(fig, metrics["mean"], 'Moyenne', 'rgb(54, 162, 235)')
+        if grouped:
+            # Paliers de la LOD par groupe: un point à chaque changement de valeur seulement
+            row_lod = results_df["LOD"].to_numpy(dtype=float)
+            steps = np.flatnonzero(np.concatenate(([True], row_lod[1:] != row_lod[:-1], [True])))
+            steps[-1] = len(row_lod) - 1
+            fig.add_trace(go.Scattergl(
+                x=steps,
+                y=row_lod[steps],
+                mode='lines',
+                name='Limite de détection (LOD)',
+                line=dict(color='rgb(255, 99, 132)', width=2, dash='dash', shape='hv')
+            ))
+        else:
+            add_constant_line(fig, metrics["lod"], 'Limite de détection (LOD)', 'rgb(255, 99, 132)')
+        return layout_control_chart(fig, title, f"{x_title} (ordre d'analyse)", y_title)
+
+    # Données mesurées
+    fig.add_trace(go.Scatter(
+        x=results_df[id_column],
+        y=results_df[value_column],
+        mode='lines+markers',
+        name='Valeur mesurée',
+        line=dict(color='rgb(75, 192, 192)', width=2),
+        marker=dict(size=8)
+    ))
+
+    # Moyenne
+    fig.add_trace(go.Scatter(
+        x=results_df[id_column],
+        y=[metrics["mean"]] * len(results_df),
+        mode='lines',
+        name='Moyenne',
+        line=dict(color='rgb(54, 162, 235)', width=2, dash='dash')
+    ))
+
+    # Limite de détection (par lot ou par période: palier propre à chaque groupe)
+    fig.add_trace(go.Scatter(
+        x=results_df[id_column],
+        y=results_df["LOD"] if grouped else [metrics["lod"]] * len(results_df),
+        mode='lines',
+        name='Limite de détection (LOD)',
+        line=dict(color='rgb(255, 99, 132)', width=2, dash='dash', shape='hv' if grouped else 'linear')
+    ))
+
+    return layout_control_chart(fig, title, x_title, y_title)
+
+
+# Contamination des blancs: teneur du blanc en fonction de la teneur de l'échantillon précédent
+def build_carryover_figure(results_df, metrics, title, x_title, y_title):
+    probable = (results_df["Contamination"] == 'Probable').to_numpy()
+
+    fig = go.Figure()
+    for mask, name, color in (
+        (~probable, 'Blanc', 'rgb(75, 192, 192)'),
+        (probable, 'Contamination probable', 'rgb(255, 99, 132)')
+    ):
+        if not mask.any():
+            continue
+        points = results_df[mask]
+        # Rendu WebGL: un flux complet peut contenir des centaines de milliers de blancs
+        fig.add_trace(go.Scattergl(
+            x=points["Teneur précédente"],
+            y=points["measured_value"],
+            mode='markers',
+            name=name,
+            text=points["sample_id"],
+            customdata=points["Échantillon précédent"],
+            hovertemplate="%{text} (après %{customdata})<br>Précédent: %{x}<br>Blanc: %{y}<extra></extra>",
+            marker=dict(color=color, size=6, opacity=0.7)
+        ))
+
+    # Limite de détection et seuil de forte teneur
+    fig.add_hline(y=metrics["lod"], line=dict(color='rgb(255, 99, 132)', width=2, dash='dash'),
+                  annotation_text="LOD")
+    if np.isfinite(metrics["high_grade"]) and metrics["high_grade"] > 0:
+        # Axe logarithmique: la position d'une forme est donnée en valeur de données (pas en log10)
+        fig.add_vline(x=metrics["high_grade"], line=dict(color='rgb(255, 159, 64)', width=2, dash='dot'),
+                      annotation_text="Forte teneur")
+
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_title,
+        yaxis_title=y_title,
+        xaxis_type="log",
+        height=600,
+        hovermode="closest"
+    )
+
+    return fig
+
+
+# Histogramme 2-D vectorisé (un seul bincount): bornes communes aux deux axes et effectifs [classe x, classe y]
+def density_histogram(x, y, bins=DENSITY_BINS, log_scale=False):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = np.isfinite(x) & np.isfinite(y)
+    if log_scale:
+        valid &= (x > 0) & (y > 0)
+    x, y = x[valid], y[valid]
+    if log_scale:
+        x, y = np.log10(x), np.log10(y)
+
+    low = min(x.min(), y.min()) if len(x) else 0.0
+    high = max(x.max(), y.max()) if len(x) else 1.0
+    if high <= low:
+        high = low + 1.0
+    scale = bins / (high - low)
+    ix = np.minimum(((x - low) * scale).astype(np.int64), bins - 1)
+    iy = np.minimum(((y - low) * scale).astype(np.int64), bins - 1)
+    counts = np.bincount(ix * bins + iy, minlength=bins * bins).reshape(bins, bins)
+
+    edges = np.linspace(low, high, bins + 1)
+    if log_scale:
+        edges = 10 ** edges
+    return edges, counts
+
+
+# Échelle logarithmique par défaut: valeurs toutes positives s'étendant sur plus de deux ordres de grandeur
+def use_log_scale(x, y):
+    values = np.concatenate((np.asarray(x, dtype=float), np.asarray(y, dtype=float)))
+    values = values[np.isfinite(values)]
+    return len(values) > 0 and values.min() > 0 and values.max() / values.min() > 100
+
+
+# Nuage de densité des duplicatas: carte de chaleur des effectifs (coût fonction du nombre de classes) et paires
+# au-delà du seuil de précision tracées individuellement
+def add_density_traces(fig, results_df, x, y, log_scale, bins=DENSITY_BINS):
+    edges, counts = density_histogram(x, y, bins, log_scale)
+    with np.errstate(divide="ignore"):
+        z = np.where(counts > 0, np.log10(counts), np.nan).T
+    fig.add_trace(go.Heatmap(
+        x=edges,
+        y=edges,
+        z=z,
+        customdata=counts.T,
+        colorscale='Viridis',
+        colorbar=dict(title="Paires", tickvals=[0, 1, 2, 3, 4, 5, 6], ticktext=["1", "10", "100", "1k", "10k", "100k", "1M"]),
+        hovertemplate="Original: %{x}<br>Duplicata: %{y}<br>%{customdata} paire(s)<extra></extra>",
+        name='Densité des paires'
+    ))
+
+    if "HARD (%)" in results_df.columns:
+        pair_hard = results_df["HARD (%)"].to_numpy(dtype=float)
+        outliers = np.flatnonzero(pair_hard > DENSITY_OUTLIER_HARD)
+        total = len(outliers)
+        if total > DENSITY_MAX_OUTLIERS:
+            outliers = outliers[np.argpartition(pair_hard[outliers], -DENSITY_MAX_OUTLIERS)[-DENSITY_MAX_OUTLIERS:]]
+        # Légende: nombre réel de paires au-delà du seuil; au-delà du plafond, seules les plus éloignées sont tracées
+        if len(outliers) < total:
+            name = f'HARD > {DENSITY_OUTLIER_HARD:.0f}% ({len(outliers):,} plus éloignées affichées / {total:,} paires)'
+        else:
+            name = f'HARD > {DENSITY_OUTLIER_HARD:.0f}% ({total:,} paires)'
+        if len(outliers):
+            fig.add_trace(go.Scattergl(
+                x=x[outliers],
+                y=y[outliers],
+                mode='markers',
+                name=name.replace(",", " "),
+                text=pair_hard[outliers],
+                hovertemplate="%{x}<br>%{y}<br>HARD: %{text:.1f}%<extra></extra>",
+                marker=dict(color='rgb(255, 159, 64)', size=5, opacity=0.8)
+            ))
+
+
+# Nuage de points et régression des duplicatas (densité pour un grand nombre de paires)
+def build_duplicate_figure(results_df, metrics, title, x_title, y_title, mode=SCATTER_AUTO):
+    original_column = "original_value"
+    replicate_column = "duplicate_value"
+    slope = metrics["slope"]
+    intercept = metrics["intercept"]
+
+    fig = go.Figure()
+
+    x = results_df[original_column].to_numpy(dtype=float)
+    y = results_df[replicate_column].to_numpy(dtype=float)
+    density = mode == SCATTER_DENSITY or (mode == SCATTER_AUTO and len(results_df) > DENSITY_MIN_PAIRS)
+    log_scale = density and use_log_scale(x, y)
+
+    if density:
+        add_density_traces(fig, results_df, x, y, log_scale)
+    else:
+        # Nuage de points
+        fig.add_trace(go.Scatter(
+            x=results_df[original_column],
+            y=results_df[replicate_column],
+            mode='markers',
+            name='Duplicatas',
+            marker=dict(
+                color='rgb(75, 192, 192)',
+                size=10,
+                opacity=0.8
+            )
+        ))
+
+    # Ligne de régression
+    if log_scale:
+        x_low = metrics["x_min"] if metrics["x_min"] > 0 else x[x > 0].min()
+        x_range = np.geomspace(x_low, metrics["x_max"], 100)
+    else:
+        x_range = np.linspace(metrics["x_min"], metrics["x_max"], 100)
+    y_pred = slope * x_range + intercept
+
+    fig.add_trace(go.Scatter(
+        x=x_range,
+        y=y_pred,
+        mode='lines',
+        name=f'Régression {metrics.get("regression_method", "linéaire")} (y = {slope:.4f}x + {intercept:.4f})',
+        line=dict(color='rgb(255, 99, 132)', width=2)
+    ))
+
+    # Ligne d'égalité parfaite (y = x)
+    fig.add_trace(go.Scatter(
+        x=x_range,
+        y=x_range,
+        mode='lines',
+        name='Ligne d\'égalité (y=x)',
+        line=dict(color='rgb(54, 162, 235)', width=2, dash='dash')
+    ))
+
+    # Mise en forme
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_title,
+        yaxis_title=y_title,
+        height=600,
+        hovermode="closest"
+    )
+    if log_scale:
+        fig.update_xaxes(type="log")
+        fig.update_yaxes(type="log")
+    if density:
+        fig.update_layout(legend=dict(orientation="h", yanchor="bottom", y=1.02))
+
+    return fig
+
+
+# Graphiques de contrôle multi-éléments: un graphique par élément
+def build_crm_multi_figures(results_df, metrics, title, x_title):
+    figures = {}
+    for j, element in enumerate(metrics["elements"]):
+        element_df = pd.DataFrame({
+            "sample_id": results_df["sample_id"].to_numpy(),
+            "measured_value": results_df[element].to_numpy()
+        })
+        # Statut de l'élément: les points hors limites restent affichés après décimation
+        element_df["Statut"] = np.where(
+            failed_points(results_df, element, metrics["lower_limits"][j], metrics["upper_limits"][j],
+                          f"{element} - Statut"),
+            'Hors limites',
+            'OK'
+        )
+        figures[element] = build_crm_figure(
+            element_df,
+            {
+                "reference_value": metrics["reference_values"][j],
+                "lower_limit": metrics["lower_limits"][j],
+                "upper_limit": metrics["upper_limits"][j]
+            },
+            f"{title} - {element}",
+            x_title,
+            element
+        )
+    return figures
+
+
+# Graphique multi-éléments combiné (une rangée par élément) pour l'exportation
+def build_crm_multi_figure(results_df, metrics, title, x_title, row_height=300):
+    elements = metrics["elements"]
+    fig = make_subplots(
+        rows=len(elements),
+        cols=1,
+        shared_xaxes=True,
+        subplot_titles=elements,
+        vertical_spacing=min(0.08, 0.3 / max(len(elements), 1))
+    )
+
+    # Grandes séries: rendu WebGL et décimation (points hors limites de chaque élément conservés)
+    large = len(results_df) > LARGE_CHART_POINTS
+    x = results_df["sample_id"]
+    for j, element in enumerate(elements):
+        row = j + 1
+        if large:
+            failed = failed_points(results_df, element, metrics["lower_limits"][j], metrics["upper_limits"][j],
+                                   f"{element} - Statut")
+            add_decimated_series(fig, results_df, "sample_id", element, failed, showlegend=False, row=row, col=1)
+        else:
+            fig.add_trace(go.Scatter(
+                x=x,
+                y=results_df[element],
+                mode='lines+markers',
+                name=element,
+                line=dict(color='rgb(75, 192, 192)', width=2),
+                marker=dict(size=6),
+                showlegend=False
+            ), row=row, col=1)
+
+        # Valeur de référence et limites
+        add_constant_line(fig, metrics["reference_values"][j], 'Valeur référence', 'rgb(54, 162, 235)', row=row, col=1)
+        add_constant_line(fig, metrics["upper_limits"][j], 'Limite supérieure', 'rgb(255, 99, 132)', row=row, col=1)
+        add_constant_line(fig, metrics["lower_limits"][j], 'Limite inférieure', 'rgb(255, 99, 132)', row=row, col=1)
+
+    fig.update_xaxes(title_text=f"{x_title} (ordre d'analyse)" if large else x_title, row=len(elements), col=1)
+    fig.update_layout(
+        title=title,
+        height=max(600, row_height * len(elements)),
+        hovermode="closest"
+    )
+
+    return fig
+
+
+# Graphique multi-standards: une rangée par standard avec ses propres limites
+def build_crm_grouped_figure(results_df, metrics, title, x_title, y_title, row_height=300):
+    standards = metrics["standards"]
+    fig = make_subplots(
+        rows=len(standards),
+        cols=1,
+        subplot_titles=[str(standard) for standard in standards],
+        vertical_spacing=min(0.08, 0.3 / max(len(standards), 1))
+    )
+
+    # Un seul partitionnement du tableau pour tous les standards
+    groups = {str(key): group for key, group in results_df.groupby("standard_id", sort=False)}
+    for j, standard in enumerate(standards):
+        row = j + 1
+        group = groups[str(standard)]
+        if len(group) > LARGE_CHART_POINTS:
+            # Grande série du standard: rendu WebGL, décimation (points hors limites et règles conservés), position
+            # en abscisse
+            keep = kept_points(group, "measured_value", metrics["lower_limits"][j], metrics["upper_limits"][j])
+            shown = add_decimated_series(fig, group, "sample_id", "measured_value", keep, showlegend=False,
+                                         row=row, col=1)
+            add_rule_markers(fig, group, "sample_id", "measured_value", showlegend=j == 0, shown=shown, row=row, col=1)
+            fig.update_xaxes(title_text=f"{x_title} (ordre d'analyse)", row=row, col=1)
+        else:
+            fig.add_trace(go.Scatter(
+                x=group["sample_id"],
+                y=group["measured_value"],
+                mode='lines+markers',
+                name=str(standard),
+                line=dict(color='rgb(75, 192, 192)', width=2),
+                marker=dict(size=6),
+                showlegend=False
+            ), row=row, col=1)
+            add_rule_markers(fig, group, "sample_id", "measured_value", showlegend=j == 0, row=row, col=1)
+
+        # Valeur certifiée et limites du standard
+        add_constant_line(fig, metrics["reference_values"][j], 'Valeur référence', 'rgb(54, 162, 235)', row=row, col=1)
+        add_constant_line(fig, metrics["upper_limits"][j], 'Limite supérieure', 'rgb(255, 99, 132)', row=row, col=1)
+        add_constant_line(fig, metrics["lower_limits"][j], 'Limite inférieure', 'rgb(255, 99, 132)', row=row, col=1)
+        fig.update_yaxes(title_text=y_title, row=row, col=1)
+
+    if len(groups[str(standards[-1])]) <= LARGE_CHART_POINTS:
+        fig.update_xaxes(title_text=x_title, row=len(standards), col=1)
+    fig.update_layout(
+        title=title,
+        height=max(600, row_height * len(standards)),
+        hovermode="closest"
+    )
+
+    return fig
+
+
+# Graphique de l'historique d'un standard (tous les lots ajoutés, dans l'ordre d'ajout)
+def build_crm_history_figure(history_df, state, title, y_title):
+    fig = go.Figure()
+
+    # Long historique: décimation LTTB, les points hors limites ou signalés par une règle restent affichés
+    name = 'Valeur mesurée'
+    large = len(history_df) > LARGE_CHART_POINTS
+    if large:
+        keep = (history_df["Statut"] != 'OK').to_numpy() | (history_df[RULES_COLUMN] != "").to_numpy()
+        shown = decimated_indices(history_df["measured_value"].to_numpy(dtype=float), keep)
+        name = f'Valeur mesurée ({len(shown):,} / {len(history_df):,} points)'.replace(",", " ")
+        history_df = history_df.iloc[shown]
+
+    # Données mesurées (rendu WebGL: l'historique peut contenir des millions de points)
+    fig.add_trace(go.Scattergl(
+        x=history_df["sequence"],
+        y=history_df["measured_value"],
+        mode='lines+markers',
+        name=name,
+        text=history_df["sample_id"],
+        customdata=history_df["batch"],
+        hovertemplate="%{text}<br>Lot %{customdata}<br>%{y}<extra></extra>",
+        line=dict(color='rgb(75, 192, 192)', width=1),
+        marker=dict(size=4)
+    ))
+
+    # Valeur de référence et limites courantes
+    fig.add_hline(y=state["reference_value"], line=dict(color='rgb(54, 162, 235)', width=2, dash='dash'))
+    fig.add_hline(y=state["upper_limit"], line=dict(color='rgb(255, 99, 132)', width=2, dash='dash'))
+    fig.add_hline(y=state["lower_limit"], line=dict(color='rgb(255, 99, 132)', width=2, dash='dash'))
+
+    add_rule_markers(fig, history_df, "sequence", "measured_value", webgl=large)
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="Ordre d'analyse",
+        yaxis_title=y_title,
+        height=600,
+        hovermode="closest"
+    )
+
+    return fig
+
+
+# Graphique de classement HARD (demi-différence relative absolue triée en fonction du rang centile)
+def build_hard_figure(results_df, title):
+    sorted_hard, ranks = hard_ranking(results_df["HARD (%)"].to_numpy(dtype=float))
+
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(
+        x=ranks,
+        y=sorted_hard,
+        mode='lines',
+        name='HARD',
+        line=dict(color='rgb(75, 192, 192)', width=2)
+    ))
+
+    # Seuil de 10% usuel pour les duplicatas
+    fig.add_hline(y=10, line=dict(color='rgb(255, 99, 132)', width=2, dash='dash'), annotation_text="HARD = 10%")
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="Rang centile (%)",
+        yaxis_title="HARD (%)",
+        height=500,
+        hovermode="closest"
+    )
+
+    return fig
+
+
+# Graphique de Thompson-Howarth: médiane des différences par groupe en fonction de la teneur
+def build_thompson_howarth_figure(precision, title, x_title):
+    fit = precision["thompson_howarth"]
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=fit["group_means"],
+        y=fit["group_medians"],
+        mode='markers',
+        name=f'Médiane |x - y| (groupes de {fit["group_size"]})',
+        marker=dict(color='rgb(75, 192, 192)', size=7, opacity=0.8)
+    ))
+
+    x_range = np.linspace(0, float(np.max(fit["group_means"])), 100)
+    fig.add_trace(go.Scatter(
+        x=x_range,
+        y=fit["intercept"] + fit["slope"] * x_range,
+        mode='lines',
+        name=f'Régression (s = {fit["s0"]:.4f} + {fit["k"]:.4f} × teneur)',
+        line=dict(color='rgb(255, 99, 132)', width=2)
+    ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_title,
+        yaxis_title="Médiane des différences absolues",
+        height=500,
+        hovermode="closest"
+    )
+
+    return fig
@@ -0,0 +1,1040 @@
+import numpy as np
+import pandas as pd
+
+from geoqaqc_precision import duplicate_precision
+from geoqaqc_rules import RULES_COLUMN, evaluate_rules, rules_codes, rules_summary
+
+# Types de contrôle (mêmes libellés que dans l'interface)
+CONTROL_CRM = "Standards CRM"
+CONTROL_BLANKS = "Blancs"
+CONTROL_DUPLICATES = "Duplicatas (nuage de points et régression)"
+
+# Méthodes de régression pour les duplicatas
+REGRESSION_OLS = "Moindres carrés (OLS)"
+REGRESSION_RMA = "Axe majeur réduit (RMA)"
+REGRESSION_THEIL_SEN = "Theil-Sen"
+REGRESSION_METHODS = [REGRESSION_OLS, REGRESSION_RMA, REGRESSION_THEIL_SEN]
+
+# Au-delà de ce nombre de paires, la pente de Theil-Sen est estimée sur un échantillon aléatoire de paires
+THEIL_SEN_EXACT_MAX = 1500
+THEIL_SEN_SAMPLE_PAIRS = 1_000_000
+
+# Centile des échantillons de routine au-delà duquel une teneur est considérée forte (contamination des blancs)
+CARRYOVER_HIGH_GRADE_QUANTILE = 0.9
+
+# Estimateurs de la limite de détection des blancs
+LOD_MEAN_STDDEV = "Moyenne + 3 écarts-types"
+LOD_MEDIAN_MAD = "Médiane + 3 MAD"
+LOD_PERCENTILE = "Centile 99"
+LOD_TRIMMED = "Moyenne tronquée (10%) + 3 écarts-types"
+LOD_METHODS = [LOD_MEAN_STDDEV, LOD_MEDIAN_MAD, LOD_PERCENTILE, LOD_TRIMMED]
+
+# Facteur de conversion de la MAD en écart-type (loi normale), centile et fraction tronquée de chaque côté
+MAD_TO_STDDEV = 1.4826
+LOD_QUANTILE = 0.99
+LOD_TRIM_FRACTION = 0.1
+
+# Regroupement des blancs pour la LOD: tous ensemble, par lot analytique ou par période
+LOD_GROUP_NONE = "Aucun (tous les blancs)"
+LOD_GROUP_BATCH = "Par lot analytique"
+LOD_GROUP_PERIOD = "Par période"
+LOD_GROUPINGS = [LOD_GROUP_NONE, LOD_GROUP_BATCH, LOD_GROUP_PERIOD]
+
+# Périodes proposées (fréquences pandas)
+LOD_PERIODS = {"Jour": "D", "Semaine": "W", "Mois": "M"}
+
+# Statuts stockés en type catégoriel (un octet par ligne au lieu d'une chaîne Python)
+CRM_STATUS_CATEGORIES = ['OK', 'Hors limites']
+BLANK_STATUS_CATEGORIES = ['OK', 'Élevé']
+
+# Indicateurs QC regroupés dans une colonne d'entiers (un bit par condition)
+QC_FLAGS_COLUMN = "Indicateurs QC"
+QC_FLAG_FAILED = 1             # CRM hors limites ou blanc élevé
+QC_FLAG_AFTER_HIGH_GRADE = 2   # blanc analysé après une forte teneur
+QC_FLAG_CARRYOVER = 4          # contamination probable
+QC_RULES_SHIFT = 1             # CRM: règles de Westgard à partir du bit 1, dans l'ordre de DEFAULT_RULES
+
+# Au-delà de ce nombre de lignes, les résultats conservés en session sont stockés en float32
+COMPACT_FLOAT32_MIN_ROWS = 1_000_000
+
+# Types de tolérance pour les CRM
+TOLERANCE_PERCENT = "Pourcentage (%)"
+TOLERANCE_STDDEV = "Multiple de l'écart-type"
+
+# Champs requis pour chaque type de contrôle
+REQUIRED_FIELDS = {
+    CONTROL_CRM: {
+        "sample_id": "Identifiant de l'échantillon",
+        "measured_value": "Valeur mesurée"
+    },
+    CONTROL_BLANKS: {
+        "sample_id": "Identifiant du blanc",
+        "measured_value": "Valeur mesurée"
+    },
+    CONTROL_DUPLICATES: {
+        "original_value": "Valeur originale",
+        "duplicate_value": "Valeur dupliquée"
+    }
+}
+
+# Champs requis pour des duplicatas listés sur des lignes séparées (reliés à l'original par son identifiant)
+DUPLICATE_ROW_FIELDS = {
+    "sample_id": "Identifiant de l'échantillon",
+    "parent_id": "Identifiant de l'original (lignes des duplicatas)",
+    "measured_value": "Valeur mesurée"
+}
+
+
+# Fonction pour renommer les colonnes sans copier les données (vue pour l'affichage)
+def renamed_view(df, columns):
+    view = pd.DataFrame(df, copy=False)
+    view.columns = [columns.get(column, column) for column in df.columns]
+    return view
+
+
+# Fonction pour réduire la mémoire d'un tableau de résultats (valeurs décimales en float32)
+def compact_results(df, float32=False):
+    if not float32:
+        return df
+    downcast = {column: np.float32 for column, dtype in df.dtypes.items() if dtype == np.float64}
+    return df.astype(downcast) if downcast else df
+
+
+# Fonction pour mapper les colonnes
+def map_columns(df, mapping_dict):
+    # Créer un nouveau DataFrame avec les colonnes mappées
+    mapped_df = pd.DataFrame()
+
+    for target_col, source_col in mapping_dict.items():
+        if source_col in df.columns:
+            mapped_df[target_col] = df[source_col]
+
+    return mapped_df
+
+
+# Fonction pour calculer les limites pour les CRM (scalaires ou tableaux NumPy)
+def calculate_crm_limits(reference_value, tolerance_type, tolerance_value, reference_stddev=None):
+    if tolerance_type == TOLERANCE_PERCENT:
+        tolerance = np.divide(tolerance_value, 100)
+        upper_limit = np.multiply(reference_value, 1 + tolerance)
+        lower_limit = np.multiply(reference_value, 1 - tolerance)
+    else:  # Multiple de l'écart-type
+        if reference_stddev is None or np.any(np.asarray(reference_stddev) == 0):
+            raise ValueError("L'écart-type de référence doit être défini et supérieur à zéro pour utiliser ce type de tolérance.")
+        upper_limit = np.add(reference_value, np.multiply(tolerance_value, reference_stddev))
+        lower_limit = np.subtract(reference_value, np.multiply(tolerance_value, reference_stddev))
+
+    return lower_limit, upper_limit
+
+
+# ----------------------------------------
+# FONCTIONS VECTORISÉES (tableaux en entrée, tableaux en sortie)
+# ----------------------------------------
+
+# Statistiques descriptives d'un tableau (par colonne pour un tableau 2-D)
+def describe(values, axis=0):
+    values = np.asarray(values, dtype=float)
+    return {
+        "count": np.sum(~np.isnan(values), axis=axis),
+        "mean": np.nanmean(values, axis=axis),
+        "std": np.nanstd(values, axis=axis),
+        "min": np.nanmin(values, axis=axis),
+        "max": np.nanmax(values, axis=axis)
+    }
+
+
+# Écart relatif à la valeur de référence, en pourcentage
+def deviation_percent(values, reference_value):
+    values = np.asarray(values, dtype=float)
+    return (values - reference_value) / reference_value * 100
+
+
+# Écart à la valeur de référence exprimé en nombre d'écarts-types
+def z_scores(values, reference_value, reference_stddev):
+    values = np.asarray(values, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (values - reference_value) / reference_stddev
+
+
+# Masque des valeurs comprises entre les limites (bornes incluses)
+def within_limits(values, lower_limit, upper_limit):
+    values = np.asarray(values, dtype=float)
+    return (values >= lower_limit) & (values <= upper_limit)
+
+
+# Limite de détection estimée: moyenne + k écarts-types
+def blank_lod(values, k=3, axis=None):
+    values = np.asarray(values, dtype=float)
+    return np.nanmean(values, axis=axis) + k * np.nanstd(values, axis=axis)
+
+
+# Régression linéaire par moindres carrés (pente, ordonnée à l'origine, coefficient r)
+def linear_regression(x, y, axis=-1):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    x_mean = x.mean(axis=axis, keepdims=True)
+    y_mean = y.mean(axis=axis, keepdims=True)
+    dx = x - x_mean
+    dy = y - y_mean
+
+    sxx = np.sum(dx * dx, axis=axis)
+    syy = np.sum(dy * dy, axis=axis)
+    sxy = np.sum(dx * dy, axis=axis)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = sxy / sxx
+        r = sxy / np.sqrt(sxx * syy)
+    intercept = np.squeeze(y_mean, axis=axis) - slope * np.squeeze(x_mean, axis=axis)
+
+    return slope, intercept, r
+
+
+# Régression de l'axe majeur réduit (RMA): erreurs sur les deux axes
+def rma_regression(x, y):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    r = np.corrcoef(x, y)[0, 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.sign(r) * np.std(y) / np.std(x)
+    intercept = y.mean() - slope * x.mean()
+    return slope, intercept
+
+
+# Régression de Theil-Sen: médiane des pentes entre paires de points (exacte ou sur un échantillon de paires)
+def theil_sen_regression(x, y, max_exact=THEIL_SEN_EXACT_MAX, sample_pairs=THEIL_SEN_SAMPLE_PAIRS, seed=0):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+
+    if n <= max_exact:
+        i, j = np.triu_indices(n, k=1)
+    else:
+        # Échantillon aléatoire de paires: O(m) au lieu des n² pentes, erreur négligeable sur la médiane
+        rng = np.random.default_rng(seed)
+        i = rng.integers(0, n, sample_pairs)
+        j = rng.integers(0, n - 1, sample_pairs)
+        j = j + (j >= i)
+
+    dx = x[j] - x[i]
+    valid = dx != 0
+    if not valid.any():
+        return np.nan, np.nan
+    slope = np.median((y[j][valid] - y[i][valid]) / dx[valid])
+    intercept = np.median(y - slope * x)
+    return slope, intercept
+
+
+# Fonction pour calculer la pente et l'ordonnée à l'origine avec la méthode choisie
+def fit_regression(x, y, method=REGRESSION_OLS):
+    if method == REGRESSION_RMA:
+        return rma_regression(x, y)
+    if method == REGRESSION_THEIL_SEN:
+        return theil_sen_regression(x, y)
+    if method == REGRESSION_OLS:
+        slope, intercept, _ = linear_regression(x, y)
+        return slope, intercept
+    raise ValueError(f"Méthode de régression inconnue: {method}")
+
+
+# Différences absolues entre valeurs originales et dupliquées
+def absolute_differences(x, y):
+    return np.abs(np.asarray(y, dtype=float) - np.asarray(x, dtype=float))
+
+
+# Différences relatives (en % de la moyenne de la paire)
+def relative_differences(x, y):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.abs(y - x) / ((x + y) / 2) * 100
+
+
+# Valeurs triées par groupe: ordre, début et effectif de chaque groupe (codes 0 à n_groups - 1)
+def sort_by_group(values, codes, n_groups):
+    order = np.lexsort((values, codes))
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return values[order], codes[order], starts, counts
+
+
+# Quantile de chaque groupe (interpolation linéaire, comme np.quantile) sur des valeurs triées par groupe
+def group_quantile(sorted_values, starts, counts, q):
+    position = starts + q * np.maximum(counts - 1, 0)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, starts + np.maximum(counts - 1, 0))
+    lower = np.minimum(lower, len(sorted_values) - 1)
+    upper = np.minimum(upper, len(sorted_values) - 1)
+    quantile = sorted_values[lower] + (position - lower) * (sorted_values[upper] - sorted_values[lower])
+    return np.where(counts > 0, quantile, np.nan)
+
+
+# Moyenne et écart-type de chaque groupe (bincount), pour les valeurs sélectionnées par un masque
+def group_mean_std(values, codes, n_groups, mask=None):
+    weights = np.ones(len(values)) if mask is None else mask.astype(float)
+    counts = np.bincount(codes, weights=weights, minlength=n_groups)
+    safe_counts = np.where(counts > 0, counts, np.nan)
+    mean = np.bincount(codes, weights=values * weights, minlength=n_groups) / safe_counts
+    m2 = np.bincount(codes, weights=(values - mean[codes]) ** 2 * weights, minlength=n_groups)
+    return mean, np.sqrt(m2 / safe_counts)
+
+
+# Limite de détection de chaque groupe de blancs selon l'estimateur choisi (agrégation vectorisée)
+def grouped_lod(values, codes, n_groups, method=LOD_MEAN_STDDEV, k=3):
+    values = np.asarray(values, dtype=float)
+    codes = np.asarray(codes, dtype=np.int64)
+
+    if method == LOD_MEAN_STDDEV:
+        mean, std = group_mean_std(values, codes, n_groups)
+        return mean + k * std
+
+    sorted_values, sorted_codes, starts, counts = sort_by_group(values, codes, n_groups)
+
+    if method == LOD_MEDIAN_MAD:
+        median = group_quantile(sorted_values, starts, counts, 0.5)
+        # Médiane des écarts absolus: un second tri par groupe des écarts à la médiane du groupe
+        deviations, _, _, _ = sort_by_group(np.abs(values - median[codes]), codes, n_groups)
+        mad = group_quantile(deviations, starts, counts, 0.5)
+        return median + k * MAD_TO_STDDEV * mad
+    if method == LOD_PERCENTILE:
+        return group_quantile(sorted_values, starts, counts, LOD_QUANTILE)
+    if method == LOD_TRIMMED:
+        # Rang de chaque valeur dans son groupe: les fractions extrêmes de chaque côté sont écartées
+        ranks = np.arange(len(sorted_values)) - starts[sorted_codes]
+        trimmed = np.floor(LOD_TRIM_FRACTION * counts).astype(np.int64)[sorted_codes]
+        keep = (ranks >= trimmed) & (ranks < counts[sorted_codes] - trimmed)
+        mean, std = group_mean_std(sorted_values, sorted_codes, n_groups, keep)
+        return mean + k * std
+    raise ValueError(f"Estimateur de la limite de détection inconnu: {method}")
+
+
+# Statut catégoriel à partir d'un masque d'échec (valeurs absentes: statut vide)
+def status_categorical(failed, categories, measured=None):
+    codes = np.asarray(failed, dtype=np.int8)
+    if measured is not None:
+        codes = np.where(measured, codes, -1).astype(np.int8)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+# Statut des CRM selon les limites
+def crm_status(values, lower_limit, upper_limit):
+    return status_categorical(~within_limits(values, lower_limit, upper_limit), CRM_STATUS_CATEGORIES)
+
+
+# Statut des blancs selon la limite de détection
+def blank_status(values, lod):
+    return status_categorical(~(np.asarray(values, dtype=float) <= lod), BLANK_STATUS_CATEGORIES)
+
+
+# Indicateurs QC des CRM: échec en bit 0, règles de Westgard dans les bits suivants
+def crm_qc_flags(failed, rule_flags):
+    return np.asarray(failed, dtype=np.uint16) * QC_FLAG_FAILED | rules_codes(rule_flags) << QC_RULES_SHIFT
+
+
+# ----------------------------------------
+# ANALYSES COMPLÈTES (DataFrame mappé en entrée)
+# ----------------------------------------
+
+# Fonction pour ne garder que les lignes dont les valeurs sont numériques
+def prepare_analysis_data(data, columns, numeric_columns):
+    # Colonnes reprises sans copie; seules les lignes incomplètes sont retirées
+    analysis_data = pd.DataFrame({
+        column: pd.to_numeric(data[column], errors='coerce') if column in numeric_columns else data[column]
+        for column in columns
+    }, copy=False)
+    valid = analysis_data.notna().all(axis=1).to_numpy()
+    return analysis_data if valid.all() else analysis_data[valid]
+
+
+# Analyse des standards CRM: retourne le tableau de résultats, les statistiques formatées et les valeurs numériques
+def analyze_crm(data, reference_value, tolerance_type, tolerance_value, reference_stddev=0):
+    id_column = "sample_id"
+    value_column = "measured_value"
+
+    analysis_data = prepare_analysis_data(data, [id_column, value_column], [value_column])
+    if analysis_data.empty:
+        raise ValueError("Aucune donnée numérique valide trouvée pour l'analyse.")
+
+    reference_stddev = reference_stddev or 0
+    lower_limit, upper_limit = calculate_crm_limits(
+        reference_value,
+        tolerance_type,
+        tolerance_value,
+        reference_stddev
+    )
+
+    values = analysis_data[value_column].to_numpy(dtype=float)
+    summary = describe(values)
+
+    metrics = {
+        "reference_value": reference_value,
+        "reference_stddev": reference_stddev,
+        "tolerance_type": tolerance_type,
+        "tolerance_value": tolerance_value,
+        "lower_limit": float(lower_limit),
+        "upper_limit": float(upper_limit),
+        "mean": float(summary["mean"]),
+        "std": float(summary["std"]),
+        "min": float(summary["min"]),
+        "max": float(summary["max"])
+    }
+
+    stats_dict = {
+        "Valeur de référence": f"{reference_value:.4f}",
+        "Moyenne": f"{metrics['mean']:.4f}",
+        "Écart-type": f"{metrics['std']:.4f}",
+        "Min": f"{metrics['min']:.4f}",
+        "Max": f"{metrics['max']:.4f}"
+    }
+
+    if reference_stddev > 0:
+        stats_dict["Écart-type de référence"] = f"{reference_stddev:.4f}"
+
+    if tolerance_type == TOLERANCE_PERCENT:
+        stats_dict["Tolérance"] = f"{tolerance_value:.2f}%"
+    else:
+        stats_dict["Tolérance"] = f"{tolerance_value:.1f} × écart-type"
+
+    results_df = analysis_data
+    results_df['Écart (%)'] = deviation_percent(values, reference_value)
+
+    if reference_stddev > 0:
+        results_df['Z-score'] = z_scores(values, reference_value, reference_stddev)
+
+    results_df['Statut'] = crm_status(values, lower_limit, upper_limit)
+
+    # Règles de Westgard sur la série (écart-type certifié, sinon écart-type observé)
+    rule_stddev = reference_stddev if reference_stddev > 0 else metrics["std"]
+    rule_flags = evaluate_rules(values, reference_value, rule_stddev)
+    results_df[RULES_COLUMN] = rules_summary(rule_flags, categorical=True)
+    results_df[QC_FLAGS_COLUMN] = crm_qc_flags(results_df['Statut'].cat.codes.to_numpy(), rule_flags)
+    add_rule_metrics(rule_flags, stats_dict, metrics)
+
+    return results_df, stats_dict, metrics
+
+
+# Fonction pour ajouter le nombre de points signalés par règle aux statistiques
+def add_rule_metrics(rule_flags, stats_dict, metrics):
+    rule_counts = {rule: int(count) for rule, count in rule_flags.sum().items()}
+    add_rule_counts(rule_counts, int(rule_flags.any(axis=1).sum()), stats_dict, metrics)
+
+
+# Fonction pour ajouter des nombres de points par règle déjà calculés (analyse en continu)
+def add_rule_counts(rule_counts, rule_flagged, stats_dict, metrics):
+    metrics["rule_counts"] = rule_counts
+    metrics["rule_flagged"] = rule_flagged
+
+    stats_dict["Points signalés (règles de Westgard)"] = str(metrics["rule_flagged"])
+    for rule, count in rule_counts.items():
+        if count:
+            stats_dict[f"Règle {rule}"] = str(count)
+
+
+# Fonction pour attribuer chaque blanc à son groupe de LOD (codes et libellés des groupes)
+def blank_groups(analysis_data, grouping=LOD_GROUP_NONE, period="W"):
+    if grouping == LOD_GROUP_BATCH:
+        codes, labels = pd.factorize(analysis_data["batch_id"].astype(str), sort=True)
+        return codes, np.asarray(labels, dtype=object)
+    if grouping == LOD_GROUP_PERIOD:
+        periods = pd.to_datetime(analysis_data["analysis_date"], errors="coerce").dt.to_period(period)
+        codes, labels = pd.factorize(periods, sort=True)
+        return codes, np.asarray(labels.astype(str), dtype=object)
+    return np.zeros(len(analysis_data), dtype=np.int64), np.array(["Tous"], dtype=object)
+
+
+# Analyse des blancs: retourne le tableau de résultats, les statistiques formatées et les valeurs numériques
+def analyze_blanks(data, lod_method=LOD_MEAN_STDDEV, grouping=LOD_GROUP_NONE, period="W"):
+    id_column = "sample_id"
+    value_column = "measured_value"
+    group_column = {LOD_GROUP_BATCH: "batch_id", LOD_GROUP_PERIOD: "analysis_date"}.get(grouping)
+    columns = [id_column, value_column] + ([group_column] if group_column else [])
+
+    analysis_data = prepare_analysis_data(data, columns, [value_column])
+    codes, labels = blank_groups(analysis_data, grouping, period)
+    # Dates illisibles: ces blancs ne peuvent être rattachés à aucune période
+    if (codes < 0).any():
+        analysis_data = analysis_data[codes >= 0]
+        codes = codes[codes >= 0]
+    if analysis_data.empty:
+        raise ValueError("Aucune donnée numérique valide trouvée pour l'analyse.")
+
+    values = analysis_data[value_column].to_numpy(dtype=float)
+    summary = describe(values)
+
+    metrics = {
+        "mean": float(summary["mean"]),
+        "std": float(summary["std"]),
+        "min": float(summary["min"]),
+        "max": float(summary["max"]),
+        # Limite de détection estimée sur l'ensemble des blancs
+        "lod": float(grouped_lod(values, np.zeros(len(values), dtype=np.int64), 1, lod_method)[0]),
+        "lod_method": lod_method,
+        "grouping": grouping
+    }
+
+    stats_dict = {
+        "Moyenne": f"{metrics['mean']:.4f}",
+        "Écart-type": f"{metrics['std']:.4f}",
+        "Min": f"{metrics['min']:.4f}",
+        "Max": f"{metrics['max']:.4f}",
+        "Limite de détection estimée (LOD)": f"{metrics['lod']:.4f}"
+    }
+    if lod_method != LOD_MEAN_STDDEV:
+        stats_dict["Estimateur de la LOD"] = lod_method
+
+    results_df = analysis_data
+
+    if grouping == LOD_GROUP_NONE:
+        results_df['Statut'] = blank_status(values, metrics["lod"])
+        results_df[QC_FLAGS_COLUMN] = results_df['Statut'].cat.codes.to_numpy().astype(np.uint16) * QC_FLAG_FAILED
+        return results_df, stats_dict, metrics
+
+    # LOD propre à chaque groupe (une agrégation vectorisée), attribuée à chaque ligne par ses codes
+    group_lod = grouped_lod(values, codes, len(labels), lod_method)
+    row_lod = group_lod[codes]
+    status = blank_status(values, row_lod)
+    elevated = np.bincount(codes, weights=status.codes == 1, minlength=len(labels)).astype(int)
+    counts = np.bincount(codes, minlength=len(labels))
+    group_mean, _ = group_mean_std(values, codes, len(labels))
+
+    results_df['Groupe LOD'] = pd.Categorical.from_codes(codes, categories=labels)
+    results_df['LOD'] = row_lod
+    results_df['Statut'] = status
+    results_df[QC_FLAGS_COLUMN] = status.codes.astype(np.uint16) * QC_FLAG_FAILED
+
+    metrics["lod_groups"] = pd.DataFrame({
+        "Groupe": labels,
+        "N": counts,
+        "Moyenne": group_mean,
+        "LOD": group_lod,
+        "Élevés": elevated
+    })
+
+    stats_dict["Regroupement de la LOD"] = grouping
+    stats_dict["Groupes"] = str(len(labels))
+    stats_dict["LOD min / max par groupe"] = f"{np.nanmin(group_lod):.4f} / {np.nanmax(group_lod):.4f}"
+    stats_dict["Blancs élevés"] = str(int(elevated.sum()))
+
+    return results_df, stats_dict, metrics
+
+
+# Analyse de la contamination des blancs: chaque blanc est associé à l'échantillon de routine qui le précède
+def analyze_blank_carryover(data, blank_label, high_grade_quantile=CARRYOVER_HIGH_GRADE_QUANTILE):
+    id_column = "sample_id"
+    type_column = "sample_type"
+    value_column = "measured_value"
+    sequence_column = "sequence"
+
+    analysis_data = prepare_analysis_data(
+        data,
+        [id_column, type_column, value_column, sequence_column],
+        [value_column, sequence_column]
+    )
+    if analysis_data.empty:
+        raise ValueError("Aucune donnée numérique valide trouvée pour l'analyse.")
+
+    # Blancs repérés par catégorie (une seule comparaison par type d'échantillon)
+    sample_types = pd.Categorical(analysis_data[type_column])
+    blank_categories = pd.Index(sample_types.categories.astype(str).str.strip().str.upper()) == str(blank_label).strip().upper()
+    is_blank = blank_categories[sample_types.codes] & (sample_types.codes >= 0)
+    if not is_blank.any():
+        found = ", ".join(map(str, sample_types.categories[:10]))
+        raise ValueError(f"Aucun blanc identifié par « {blank_label} » (types trouvés: {found}).")
+
+    # Blancs et échantillons de routine triés par ordre d'analyse (positions seulement, sans copier le flux)
+    sequence = analysis_data[sequence_column].to_numpy(dtype=float)
+    blank_rows = np.flatnonzero(is_blank)
+    blank_rows = blank_rows[np.argsort(sequence[blank_rows], kind="stable")]
+    routine_rows = np.flatnonzero(~is_blank)
+    routine_rows = routine_rows[np.argsort(sequence[routine_rows], kind="stable")]
+
+    # Jointure « as-of » sur la séquence triée: dernier échantillon de routine strictement avant chaque blanc
+    joined = pd.merge_asof(
+        pd.DataFrame({sequence_column: sequence[blank_rows]}),
+        pd.DataFrame({sequence_column: sequence[routine_rows], "row": routine_rows}),
+        on=sequence_column,
+        direction="backward",
+        allow_exact_matches=False
+    )
+    matched = joined["row"].notna().to_numpy()
+    preceding_rows = joined["row"].fillna(0).to_numpy(dtype=np.int64)
+
+    results_df = analysis_data.iloc[blank_rows].reset_index(drop=True)
+    results_df["Échantillon précédent"] = analysis_data[id_column].iloc[preceding_rows].to_numpy()
+    results_df["Teneur précédente"] = np.where(
+        matched, analysis_data[value_column].to_numpy(dtype=float)[preceding_rows], np.nan
+    )
+    results_df.loc[~matched, "Échantillon précédent"] = None
+
+    values = results_df[value_column].to_numpy(dtype=float)
+    preceding = results_df["Teneur précédente"].to_numpy(dtype=float)
+    routine_values = analysis_data[value_column].to_numpy(dtype=float)[routine_rows]
+    summary = describe(values)
+
+    metrics = {
+        "mean": float(summary["mean"]),
+        "std": float(summary["std"]),
+        "min": float(summary["min"]),
+        "max": float(summary["max"]),
+        "lod": float(blank_lod(values)),
+        "blanks": int(len(values)),
+        "routine": int(len(routine_values)),
+        "high_grade": float(np.quantile(routine_values, high_grade_quantile)) if len(routine_values) else np.nan
+    }
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = np.where(preceding > 0, values / preceding * 100, np.nan)
+    status = blank_status(values, metrics["lod"])
+    after_high_grade = preceding >= metrics["high_grade"]
+    carryover = (status.codes == 1) & after_high_grade
+
+    results_df['Ratio de contamination (%)'] = ratios
+    results_df['Statut'] = status
+    results_df['Contamination'] = status_categorical(carryover, ['', 'Probable'])
+    results_df[QC_FLAGS_COLUMN] = (
+        status.codes.astype(np.uint16) * QC_FLAG_FAILED
+        | after_high_grade.astype(np.uint16) * QC_FLAG_AFTER_HIGH_GRADE
+        | carryover.astype(np.uint16) * QC_FLAG_CARRYOVER
+    )
+
+    paired = np.isfinite(preceding)
+    metrics.update(
+        paired=int(paired.sum()),
+        median_ratio=float(np.nanmedian(ratios)) if np.isfinite(ratios).any() else np.nan,
+        max_ratio=float(np.nanmax(ratios)) if np.isfinite(ratios).any() else np.nan,
+        high_grade_ratio=float(np.nanmedian(ratios[after_high_grade])) if np.isfinite(ratios[after_high_grade]).any() else np.nan,
+        carryover=int(carryover.sum()),
+        # Corrélation entre la teneur du blanc et celle de l'échantillon précédent
+        r=float(linear_regression(preceding[paired], values[paired])[2]) if paired.sum() > 2 else np.nan
+    )
+
+    stats_dict = {
+        "Blancs": str(metrics["blanks"]),
+        "Échantillons de routine": str(metrics["routine"]),
+        "Moyenne": f"{metrics['mean']:.4f}",
+        "Écart-type": f"{metrics['std']:.4f}",
+        "Min": f"{metrics['min']:.4f}",
+        "Max": f"{metrics['max']:.4f}",
+        "Limite de détection estimée (LOD)": f"{metrics['lod']:.4f}",
+        f"Seuil de forte teneur (centile {high_grade_quantile * 100:.0f})": f"{metrics['high_grade']:.4f}",
+        "Ratio de contamination médian": f"{metrics['median_ratio']:.3f}%",
+        "Ratio de contamination médian après forte teneur": f"{metrics['high_grade_ratio']:.3f}%",
+        "Ratio de contamination maximal": f"{metrics['max_ratio']:.3f}%",
+        "Corrélation blanc / teneur précédente (r)": f"{metrics['r']:.3f}",
+        "Contaminations probables": str(metrics["carryover"])
+    }
+
+    return results_df, stats_dict, metrics
+
+
+# Analyse des duplicatas: retourne le tableau de résultats, les statistiques formatées et les valeurs numériques
+def analyze_duplicates(data, regression_method=REGRESSION_OLS):
+    original_column = "original_value"
+    replicate_column = "duplicate_value"
+
+    # Identifiants des paires formées à partir de lignes séparées (pair_duplicates), conservés devant les valeurs
+    id_columns = [column for column in ("original_id", "duplicate_id") if column in data.columns]
+
+    analysis_data = prepare_analysis_data(
+        data,
+        id_columns + [original_column, replicate_column],
+        [original_column, replicate_column]
+    )
+    if analysis_data.empty:
+        raise ValueError("Aucune donnée numérique valide trouvée pour l'analyse.")
+
+    x = analysis_data[original_column].to_numpy(dtype=float)
+    y = analysis_data[replicate_column].to_numpy(dtype=float)
+
+    _, _, r = linear_regression(x, y)
+    slope, intercept = fit_regression(x, y, regression_method)
+    differences = absolute_differences(x, y)
+    relative_diff = relative_differences(x, y)
+
+    metrics = {
+        "regression_method": regression_method,
+        "slope": float(slope),
+        "intercept": float(intercept),
+        "r": float(r),
+        "r_squared": float(r * r),
+        "mean_diff": float(np.mean(differences)),
+        "mean_relative_diff": float(np.nanmean(relative_diff)),
+        "x_min": float(np.min(x)),
+        "x_max": float(np.max(x))
+    }
+
+    stats_dict = {
+        "Méthode de régression": regression_method,
+        "Équation de régression": f"y = {slope:.4f}x + {intercept:.4f}",
+        "Coefficient de corrélation (R²)": f"{metrics['r_squared']:.4f}",
+        "Différence absolue moyenne": f"{metrics['mean_diff']:.4f}",
+        "Différence relative moyenne": f"{metrics['mean_relative_diff']:.2f}%"
+    }
+
+    # Précision: HARD, Thompson-Howarth et tableau par classes de teneur
+    pair_hard, precision = duplicate_precision(x, y)
+    metrics["precision"] = precision
+    stats_dict["HARD médian"] = f"{precision['hard_median']:.2f}%"
+    stats_dict["Paires avec HARD ≤ 10%"] = f"{precision['hard_pass_rates'][10.0]:.1f}%"
+    stats_dict["CV moyen"] = f"{precision['average_cv']:.2f}%"
+    fit = precision["thompson_howarth"]
+    if fit is not None:
+        stats_dict["Thompson-Howarth"] = f"s = {fit['s0']:.4f} + {fit['k']:.4f} × teneur"
+
+    results_df = analysis_data
+    results_df['Diff. Abs.'] = differences
+    results_df['Diff. Rel. (%)'] = relative_diff
+    results_df['HARD (%)'] = pair_hard
+
+    return results_df, stats_dict, metrics
+
+
+# Identifiants normalisés (texte sans espaces); identifiants absents ou vides: valeur manquante
+def normalize_ids(ids):
+    ids = pd.Series(ids, copy=False)
+    text = ids.astype("string").str.strip()
+    return text.mask(text == "")
+
+
+# Appariement des duplicatas listés sur des lignes séparées: identifiants et identifiants parents codés par une
+# seule table de hachage, puis recherche de l'original de chaque duplicata par indexation vectorisée
+def pair_duplicates(data, id_column="sample_id", parent_column="parent_id", value_column="measured_value"):
+    ids = normalize_ids(data[id_column])
+    parents = normalize_ids(data[parent_column])
+    values = pd.to_numeric(data[value_column], errors='coerce').to_numpy(dtype=float)
+    n = len(ids)
+
+    codes, uniques = pd.concat([ids, parents], ignore_index=True).factorize()
+    id_codes = codes[:n]
+    parent_codes = codes[n:]
+
+    is_duplicate = parent_codes >= 0
+    original_rows = np.flatnonzero(~is_duplicate & (id_codes >= 0))
+    duplicate_rows = np.flatnonzero(is_duplicate)
+
+    # Ligne de l'original de chaque identifiant (identifiant répété: la première ligne est retenue)
+    original_row = np.full(len(uniques), -1, dtype=np.int64)
+    original_row[id_codes[original_rows[::-1]]] = original_rows[::-1]
+    repeated = len(original_rows) - int((original_row >= 0).sum())
+
+    positions = original_row[parent_codes[duplicate_rows]]
+    matched = positions >= 0
+    pair_originals = positions[matched]
+    pair_duplicates = duplicate_rows[matched]
+
+    # Plusieurs duplicatas d'un même original donnent plusieurs paires
+    duplicates_per_original = np.bincount(pair_originals, minlength=n)
+
+    id_values = ids.to_numpy(dtype=object, na_value=None)
+    pairs = pd.DataFrame({
+        "original_id": id_values[pair_originals],
+        "duplicate_id": id_values[pair_duplicates],
+        "original_value": values[pair_originals],
+        "duplicate_value": values[pair_duplicates]
+    })
+
+    orphan_rows = duplicate_rows[~matched]
+    pairing = {
+        "originals": len(original_rows) - repeated,
+        "duplicates": len(duplicate_rows),
+        "pairs": len(pairs),
+        "orphans": len(orphan_rows),
+        "orphan_ids": pd.DataFrame({
+            "duplicate_id": id_values[orphan_rows],
+            "parent_id": parents.to_numpy(dtype=object, na_value=None)[orphan_rows]
+        }),
+        "multi_duplicates": int((duplicates_per_original > 1).sum()),
+        "repeated_originals": repeated
+    }
+    return pairs, pairing
+
+
+# Analyse des duplicatas listés sur des lignes séparées: appariement, puis analyse des paires
+def analyze_duplicate_rows(data, regression_method=REGRESSION_OLS):
+    pairs, pairing = pair_duplicates(data)
+    if pairing["pairs"] == 0:
+        raise ValueError("Aucun duplicata n'a pu être associé à son échantillon original.")
+
+    results_df, stats_dict, metrics = analyze_duplicates(pairs, regression_method)
+    metrics["pairing"] = pairing
+
+    stats_dict["Paires formées"] = str(pairing["pairs"])
+    stats_dict["Duplicatas orphelins (original introuvable)"] = str(pairing["orphans"])
+    stats_dict["Originaux avec plusieurs duplicatas"] = str(pairing["multi_duplicates"])
+    if pairing["repeated_originals"]:
+        stats_dict["Identifiants d'originaux en double"] = str(pairing["repeated_originals"])
+
+    return results_df, stats_dict, metrics
+
+
+# ----------------------------------------
+# ANALYSE MULTI-ÉLÉMENTS (un seul passage sur un tableau 2-D)
+# ----------------------------------------
+
+# Colonnes du tableau des paramètres par élément
+ELEMENT_PARAM_COLUMNS = ["element", "reference_value", "reference_stddev", "tolerance_type", "tolerance_value"]
+
+
+# Fonction pour créer le tableau des paramètres par défaut pour une liste d'éléments
+def default_element_params(elements, tolerance_type=TOLERANCE_PERCENT, tolerance_value=10.0):
+    return pd.DataFrame({
+        "element": list(elements),
+        "reference_value": 0.0,
+        "reference_stddev": 0.0,
+        "tolerance_type": tolerance_type,
+        "tolerance_value": tolerance_value
+    }, columns=ELEMENT_PARAM_COLUMNS)
+
+
+# Fonction pour reprendre les paramètres déjà saisis pour les éléments (ou standards) conservés
+def restore_params(params, saved_params, label_column="element"):
+    if saved_params is None or saved_params.empty:
+        return params
+    params = params.copy()
+    saved_params = saved_params.drop_duplicates(label_column, keep="last").set_index(saved_params[label_column].astype(str).to_numpy())
+    labels = params[label_column].astype(str)
+    known = labels.isin(saved_params.index).to_numpy()
+    for column in params.columns.drop(label_column):
+        params.loc[known, column] = saved_params.loc[labels[known], column].to_numpy()
+    return params
+
+
+# Limites de tous les éléments en une opération (tolérances mixtes % / écart-type)
+def element_limits(reference_values, tolerance_types, tolerance_values, reference_stddevs):
+    reference_values = np.asarray(reference_values, dtype=float)
+    tolerance_values = np.asarray(tolerance_values, dtype=float)
+    reference_stddevs = np.asarray(reference_stddevs, dtype=float)
+    is_percent = np.asarray(tolerance_types) == TOLERANCE_PERCENT
+
+    half_width = np.where(
+        is_percent,
+        reference_values * tolerance_values / 100,
+        tolerance_values * reference_stddevs
+    )
+    return reference_values - half_width, reference_values + half_width
+
+
+# Fonction pour vérifier les paramètres par élément (ou par standard) avant l'analyse
+def validate_element_params(element_params, label_column="element"):
+    params = element_params.reset_index(drop=True)
+    errors = []
+
+    missing_reference = params.loc[~(params["reference_value"] > 0), label_column].tolist()
+    if missing_reference:
+        errors.append(f"Valeur de référence manquante pour: {', '.join(map(str, missing_reference))}")
+
+    needs_stddev = (params["tolerance_type"] != TOLERANCE_PERCENT) & ~(params["reference_stddev"] > 0)
+    missing_stddev = params.loc[needs_stddev, label_column].tolist()
+    if missing_stddev:
+        errors.append(
+            "L'écart-type de référence doit être supérieur à zéro pour une tolérance en écart-type: "
+            + ", ".join(map(str, missing_stddev))
+        )
+
+    if errors:
+        raise ValueError(" ".join(errors))
+
+
+# Analyse multi-éléments des CRM: une passe vectorisée sur la matrice échantillons × éléments
+def analyze_crm_multi(data, element_params):
+    id_column = "sample_id"
+    validate_element_params(element_params)
+
+    elements = element_params["element"].tolist()
+    missing = [element for element in elements if element not in data.columns]
+    if missing:
+        raise ValueError(f"Colonnes d'éléments introuvables: {', '.join(missing)}")
+
+    analysis_data = data[[id_column] + elements].dropna(subset=[id_column])
+    values = analysis_data[elements].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    if values.size == 0 or np.isnan(values).all():
+        raise ValueError("Aucune donnée numérique valide trouvée pour l'analyse.")
+
+    reference_values = element_params["reference_value"].to_numpy(dtype=float)
+    reference_stddevs = element_params["reference_stddev"].to_numpy(dtype=float)
+    lower_limits, upper_limits = element_limits(
+        reference_values,
+        element_params["tolerance_type"].to_numpy(),
+        element_params["tolerance_value"].to_numpy(dtype=float),
+        reference_stddevs
+    )
+
+    # Matrices n × m calculées par diffusion (broadcasting)
+    measured = ~np.isnan(values)
+    passed = within_limits(values, lower_limits, upper_limits)
+    failed = measured & ~passed
+    deviations = deviation_percent(values, reference_values)
+    z = z_scores(values, reference_values, np.where(reference_stddevs > 0, reference_stddevs, np.nan))
+
+    status_codes = np.where(measured, ~passed, -1).astype(np.int8)
+
+    summary = describe(values, axis=0)
+    failures = failed.sum(axis=0)
+    counts = measured.sum(axis=0)
+
+    # Tableau de résultats: pour chaque élément, valeur, écart et statut
+    columns = {id_column: analysis_data[id_column].to_numpy()}
+    for j, element in enumerate(elements):
+        columns[element] = values[:, j]
+        columns[f"{element} - Écart (%)"] = deviations[:, j]
+        if reference_stddevs[j] > 0:
+            columns[f"{element} - Z-score"] = z[:, j]
+        columns[f"{element} - Statut"] = pd.Categorical.from_codes(status_codes[:, j], categories=CRM_STATUS_CATEGORIES)
+    columns["Statut global"] = status_categorical(failed.any(axis=1), CRM_STATUS_CATEGORIES)
+    results_df = pd.DataFrame(columns, index=analysis_data.index)
+
+    # Statistiques par élément
+    element_stats = pd.DataFrame({
+        "Élément": elements,
+        "Valeur de référence": reference_values,
+        "Limite inférieure": lower_limits,
+        "Limite supérieure": upper_limits,
+        "N": counts,
+        "Moyenne": summary["mean"],
+        "Écart-type": summary["std"],
+        "Min": summary["min"],
+        "Max": summary["max"],
+        "Hors limites": failures,
+        "Taux de réussite (%)": np.where(counts > 0, (counts - failures) / np.maximum(counts, 1) * 100, np.nan)
+    })
+
+    stats_dict = {
+        "Éléments analysés": str(len(elements)),
+        "Échantillons": str(len(results_df)),
+        "Échantillons hors limites (tous éléments)": str(int(failed.any(axis=1).sum()))
+    }
+    for j, element in enumerate(elements):
+        stats_dict[f"{element} - Moyenne / Référence"] = f"{summary['mean'][j]:.4f} / {reference_values[j]:.4f}"
+        stats_dict[f"{element} - Hors limites"] = f"{int(failures[j])} / {int(counts[j])}"
+
+    metrics = {
+        "elements": elements,
+        "reference_values": reference_values.tolist(),
+        "reference_stddevs": reference_stddevs.tolist(),
+        "lower_limits": lower_limits.tolist(),
+        "upper_limits": upper_limits.tolist(),
+        "pass_matrix": passed,
+        "element_stats": element_stats
+    }
+
+    return results_df, stats_dict, metrics
+
+
+# ----------------------------------------
+# ANALYSE MULTI-STANDARDS (plusieurs CRM intercalés dans un même lot)
+# ----------------------------------------
+
+# Colonnes du tableau des valeurs certifiées par standard
+STANDARD_PARAM_COLUMNS = ["standard_id", "reference_value", "reference_stddev", "tolerance_type", "tolerance_value"]
+
+
+# Fonction pour créer le tableau des paramètres par défaut pour une liste de standards
+def default_standard_params(standards, tolerance_type=TOLERANCE_PERCENT, tolerance_value=10.0):
+    return pd.DataFrame({
+        "standard_id": list(standards),
+        "reference_value": 0.0,
+        "reference_stddev": 0.0,
+        "tolerance_type": tolerance_type,
+        "tolerance_value": tolerance_value
+    }, columns=STANDARD_PARAM_COLUMNS)
+
+
+# Analyse groupée des CRM: chaque ligne reçoit la valeur certifiée et les limites de son standard
+def analyze_crm_grouped(data, standard_params):
+    id_column = "sample_id"
+    standard_column = "standard_id"
+    value_column = "measured_value"
+    validate_element_params(standard_params, label_column=standard_column)
+
+    analysis_data = prepare_analysis_data(data, [id_column, standard_column, value_column], [value_column])
+    if analysis_data.empty:
+        raise ValueError("Aucune donnée numérique valide trouvée pour l'analyse.")
+
+    # Index des standards: une seule recherche vectorisée pour toutes les lignes
+    params = standard_params.drop_duplicates(standard_column, keep="last").reset_index(drop=True)
+    standard_index = pd.Index(params[standard_column].astype(str))
+    codes = standard_index.get_indexer(analysis_data[standard_column].astype(str))
+
+    unknown = analysis_data.loc[codes < 0, standard_column].astype(str).unique()
+    if len(unknown):
+        raise ValueError(f"Valeurs certifiées manquantes pour les standards: {', '.join(sorted(unknown))}")
+
+    reference_values = params["reference_value"].to_numpy(dtype=float)
+    reference_stddevs = params["reference_stddev"].to_numpy(dtype=float)
+    lower_limits, upper_limits = element_limits(
+        reference_values,
+        params["tolerance_type"].to_numpy(),
+        params["tolerance_value"].to_numpy(dtype=float),
+        reference_stddevs
+    )
+
+    # Valeurs par ligne obtenues par indexation (pas de boucle par standard)
+    values = analysis_data[value_column].to_numpy(dtype=float)
+    row_reference = reference_values[codes]
+    row_stddev = reference_stddevs[codes]
+    row_lower = lower_limits[codes]
+    row_upper = upper_limits[codes]
+    passed = within_limits(values, row_lower, row_upper)
+
+    results_df = analysis_data
+    results_df['Valeur de référence'] = row_reference
+    results_df['Limite inférieure'] = row_lower
+    results_df['Limite supérieure'] = row_upper
+    results_df['Écart (%)'] = deviation_percent(values, row_reference)
+    if (reference_stddevs > 0).any():
+        results_df['Z-score'] = z_scores(values, row_reference, np.where(row_stddev > 0, row_stddev, np.nan))
+    results_df['Statut'] = status_categorical(~passed, CRM_STATUS_CATEGORIES)
+
+    # Statistiques par standard calculées en une seule agrégation groupée
+    grouped = pd.DataFrame({"code": codes, "value": values, "failed": ~passed}).groupby("code", sort=True)
+    summary = grouped["value"].agg(["count", "mean", "min", "max"])
+    summary["std"] = grouped["value"].std(ddof=0)
+    summary["failed"] = grouped["failed"].sum()
+    summary = summary.reindex(range(len(params)))
+    counts = summary["count"].fillna(0).to_numpy(dtype=int)
+    failures = summary["failed"].fillna(0).to_numpy(dtype=int)
+
+    standard_stats = pd.DataFrame({
+        "Standard": params[standard_column].to_numpy(),
+        "Valeur de référence": reference_values,
+        "Limite inférieure": lower_limits,
+        "Limite supérieure": upper_limits,
+        "N": counts,
+        "Moyenne": summary["mean"].to_numpy(),
+        "Écart-type": summary["std"].to_numpy(),
+        "Min": summary["min"].to_numpy(),
+        "Max": summary["max"].to_numpy(),
+        "Hors limites": failures,
+        "Taux de réussite (%)": np.where(counts > 0, (counts - failures) / np.maximum(counts, 1) * 100, np.nan)
+    })
+    standard_stats = standard_stats[counts > 0].reset_index(drop=True)
+
+    # Règles de Westgard par standard (écart-type certifié, sinon écart-type observé du standard)
+    observed_stddev = summary["std"].to_numpy(dtype=float)
+    rule_stddev = np.where(row_stddev > 0, row_stddev, observed_stddev[codes])
+    rule_flags = evaluate_rules(values, row_reference, rule_stddev, groups=codes)
+    results_df[RULES_COLUMN] = rules_summary(rule_flags, categorical=True)
+    results_df[QC_FLAGS_COLUMN] = crm_qc_flags(~passed, rule_flags)
+
+    stats_dict = {
+        "Standards analysés": str(len(standard_stats)),
+        "Échantillons": str(len(results_df)),
+        "Échantillons hors limites": str(int((~passed).sum()))
+    }
+    for standard, mean, reference, failed_count, count in zip(
+        standard_stats["Standard"], standard_stats["Moyenne"], standard_stats["Valeur de référence"],
+        standard_stats["Hors limites"], standard_stats["N"]
+    ):
+        stats_dict[f"{standard} - Moyenne / Référence"] = f"{mean:.4f} / {reference:.4f}"
+        stats_dict[f"{standard} - Hors limites"] = f"{int(failed_count)} / {int(count)}"
+
+    metrics = {
+        "standards": standard_stats["Standard"].tolist(),
+        "reference_values": standard_stats["Valeur de référence"].tolist(),
+        "lower_limits": standard_stats["Limite inférieure"].tolist(),
+        "upper_limits": standard_stats["Limite supérieure"].tolist(),
+        "standard_stats": standard_stats
+    }
+    add_rule_metrics(rule_flags, stats_dict, metrics)
+
+    return results_df, stats_dict, metrics
@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from geoqaqc_cache import content_hash
+from geoqaqc_rules import RULES_COLUMN, SHIFT_LENGTH, TREND_LENGTH, evaluate_rules, rules_codes, rules_summary
+from geoqaqc_stream import merge_moments
+
+# Répertoire par défaut de l'historique des CRM
+DEFAULT_HISTORY_DIR = os.environ.get(
+    "GEOQAQC_HISTORY_DIR",
+    os.path.join(os.path.expanduser("~"), ".local", "share", "geoqaqc", "history")
+)
+
+STATE_FILE = "state.json"
+DIGESTS_FILE = "digests.txt"
+BATCH_DIR = "batches"
+CORRECTIONS_DIR = "corrections"
+BATCH_EXTENSION = ".arrow"
+
+# Nombre de dernières valeurs conservées pour poursuivre les règles de Westgard d'un lot à l'autre: une série
+# plus longue que la fin conservée est déjà signalée dans les lots précédents
+RULE_TAIL_LENGTH = max(SHIFT_LENGTH, TREND_LENGTH, 4)
+
+# Colonnes stockées pour chaque point de l'historique
+HISTORY_COLUMNS = ["sequence", "batch", "date_ajout", "sample_id", "measured_value", "Statut", RULES_COLUMN]
+
+
+# Fonction pour construire l'identifiant d'une série (standard × élément)
+def series_key(standard_id, element):
+    return f"{standard_id}|{element}"
+
+
+# Écriture atomique d'un tableau Arrow IPC
+def write_arrow(df, path):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(temp_path, "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temp_path, path)
+
+
+# Lecture de tous les fichiers Arrow d'un répertoire, dans l'ordre des noms
+def read_arrow_dir(directory):
+    if not os.path.isdir(directory):
+        return []
+    tables = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(BATCH_EXTENSION):
+            with pa.memory_map(os.path.join(directory, name), "r") as source:
+                tables.append(ipc.open_file(source).read_all())
+    return tables
+
+
+# Masques des règles reconstruits à partir des codes binaires (bit i: i-ème règle)
+def rules_from_codes(codes, rules):
+    return pd.DataFrame({rule: (codes >> bit & 1).astype(bool) for bit, rule in enumerate(rules)})
+
+
+# Historique persistant des CRM: chaque lot est ajouté sans relire ni réécrire l'historique; les derniers
+# points des lots précédents qu'une nouvelle série signale sont corrigés par un petit fichier de corrections
+class CRMHistory:
+    def __init__(self, history_dir=DEFAULT_HISTORY_DIR):
+        self.history_dir = history_dir
+        self._lock = threading.Lock()
+        os.makedirs(self.history_dir, exist_ok=True)
+
+    def _series_dir(self, key):
+        slug = re.sub(r"\W+", "_", key).strip("_").lower()[:60]
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=6).hexdigest()
+        return os.path.join(self.history_dir, f"{slug}-{digest}")
+
+    # État courant d'une série (statistiques cumulées, limites et fin de série pour les règles), ou None
+    def state(self, standard_id, element):
+        path = os.path.join(self._series_dir(series_key(standard_id, element)), STATE_FILE)
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    # Empreintes des lots déjà ajoutés (index en ajout seul, séparé de l'état)
+    def _digests(self, series_dir, state):
+        digests = set(state.pop("batch_digests", []))
+        try:
+            with open(os.path.join(series_dir, DIGESTS_FILE), encoding="utf-8") as f:
+                digests.update(line.strip() for line in f)
+        except FileNotFoundError:
+            pass
+        return digests
+
+    def series(self):
+        states = []
+        with os.scandir(self.history_dir) as it:
+            for entry in it:
+                path = os.path.join(entry.path, STATE_FILE)
+                if entry.is_dir() and os.path.exists(path):
+                    with open(path, encoding="utf-8") as f:
+                        states.append(json.load(f))
+        return sorted(states, key=lambda state: (state["standard_id"], state["element"]))
+
+    # Ajouter un lot (sample_id, measured_value) à la série; seul le lot est traité
+    def append(self, standard_id, element, batch, reference_value, lower_limit, upper_limit, reference_stddev=0.0):
+        key = series_key(standard_id, element)
+        series_dir = self._series_dir(key)
+
+        batch = batch[["sample_id", "measured_value"]].copy()
+        batch["measured_value"] = pd.to_numeric(batch["measured_value"], errors="coerce")
+        batch = batch.dropna()
+        values = batch["measured_value"].to_numpy(dtype=float)
+        digest = content_hash(pd.util.hash_pandas_object(batch, index=False).to_numpy().tobytes())
+
+        with self._lock:
+            state = self.state(standard_id, element) or {
+                "standard_id": str(standard_id),
+                "element": str(element),
+                "count": 0,
+                "mean": 0.0,
+                "m2": 0.0,
+                "min": None,
+                "max": None,
+                "out_of_limits": 0,
+                "flagged_points": 0,
+                "rule_counts": {},
+                "rule_tail": [],
+                "rule_tail_codes": [],
+                "batches": 0
+            }
+            # États antérieurs: empreintes conservées dans l'état (reprises dans l'index) et nombre de points
+            # signalés absent
+            legacy_digests = state.get("batch_digests", [])
+            state.setdefault("flagged_points", sum(state["rule_counts"].values()))
+
+            # Un lot déjà ajouté n'est pas ajouté une deuxième fois
+            if digest in self._digests(series_dir, state) or len(values) == 0:
+                return state, 0
+
+            # Statistiques cumulées mises à jour avec les moments du lot seulement
+            count, mean, m2 = merge_moments(
+                state["count"], state["mean"], state["m2"],
+                len(values), float(values.mean()), float(((values - values.mean()) ** 2).sum())
+            )
+            state.update(count=count, mean=mean, m2=m2)
+            state["min"] = float(values.min()) if state["min"] is None else min(state["min"], float(values.min()))
+            state["max"] = float(values.max()) if state["max"] is None else max(state["max"], float(values.max()))
+            state.update(
+                reference_value=float(reference_value),
+                reference_stddev=float(reference_stddev or 0.0),
+                lower_limit=float(lower_limit),
+                upper_limit=float(upper_limit)
+            )
+
+            # Statuts et règles du lot, en poursuivant les séries commencées dans les lots précédents
+            passed = (values >= lower_limit) & (values <= upper_limit)
+            tail = np.asarray(state["rule_tail"], dtype=float)
+            tail_codes = np.zeros(len(tail), dtype=np.uint16)
+            tail_codes[len(tail) - len(state.get("rule_tail_codes", [])):] = state.get("rule_tail_codes", [])
+            rule_stddev = reference_stddev if reference_stddev and reference_stddev > 0 else np.sqrt(m2 / count)
+            window = np.concatenate((tail, values))
+            window_flags = evaluate_rules(window, reference_value, rule_stddev)
+            rules = list(window_flags.columns)
+
+            # Les signalements déjà enregistrés sur la fin de série sont conservés; seuls les nouveaux comptent
+            codes = rules_codes(window_flags)
+            codes[:len(tail)] |= tail_codes
+            previous = np.concatenate((tail_codes, np.zeros(len(values), dtype=np.uint16)))
+            added = codes & ~previous
+            for bit, rule in enumerate(rules):
+                state["rule_counts"][rule] = state["rule_counts"].get(rule, 0) + int((added >> bit & 1).sum())
+            state["flagged_points"] += int(((codes != 0) & (previous == 0)).sum())
+            state["out_of_limits"] += int((~passed).sum())
+            state["rule_tail"] = window[-RULE_TAIL_LENGTH:].tolist()
+            state["rule_tail_codes"] = codes[-RULE_TAIL_LENGTH:].tolist()
+
+            batch_number = state["batches"] + 1
+            first_sequence = state["count"] - len(values)
+            records = pd.DataFrame({
+                "sequence": np.arange(first_sequence, state["count"], dtype=np.int64),
+                "batch": np.full(len(values), batch_number, dtype=np.int32),
+                "date_ajout": pd.Timestamp.now().floor("s"),
+                "sample_id": batch["sample_id"].astype(str).to_numpy(),
+                "measured_value": values,
+                "Statut": np.where(passed, 'OK', 'Hors limites'),
+                RULES_COLUMN: rules_summary(rules_from_codes(codes[len(tail):], rules))
+            }, columns=HISTORY_COLUMNS)
+
+            # Écriture du lot dans un nouveau fichier, puis de l'état (remplacements atomiques)
+            os.makedirs(os.path.join(series_dir, BATCH_DIR), exist_ok=True)
+            write_arrow(records, os.path.join(series_dir, BATCH_DIR, f"{batch_number:06d}{BATCH_EXTENSION}"))
+
+            # Points de la fin de série nouvellement signalés: corrections appliquées à la relecture
+            changed = np.flatnonzero(codes[:len(tail)] != tail_codes)
+            if len(changed):
+                os.makedirs(os.path.join(series_dir, CORRECTIONS_DIR), exist_ok=True)
+                corrections = pd.DataFrame({
+                    "sequence": (first_sequence - len(tail) + changed).astype(np.int64),
+                    RULES_COLUMN: rules_summary(rules_from_codes(codes[changed], rules))
+                })
+                write_arrow(
+                    corrections,
+                    os.path.join(series_dir, CORRECTIONS_DIR, f"{batch_number:06d}{BATCH_EXTENSION}")
+                )
+
+            # Empreinte du lot ajoutée à l'index (les empreintes d'un ancien état y sont reprises une fois)
+            with open(os.path.join(series_dir, DIGESTS_FILE), "a", encoding="utf-8") as f:
+                f.writelines(f"{previous_digest}\n" for previous_digest in legacy_digests)
+                f.write(f"{digest}\n")
+
+            state["batches"] = batch_number
+            state["updated_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            state_path = os.path.join(series_dir, STATE_FILE)
+            with open(f"{state_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(f"{state_path}.tmp", state_path)
+
+        return state, len(values)
+
+    # Ajouter les lignes de chaque standard à sa propre série (mode multi-standards)
+    def append_grouped(self, results_df, element, reference_stddevs=None):
+        reference_stddevs = reference_stddevs or {}
+        added = 0
+        for standard_id, group in results_df.groupby("standard_id", sort=False):
+            _, rows = self.append(
+                standard_id,
+                element,
+                group,
+                group["Valeur de référence"].iloc[0],
+                group["Limite inférieure"].iloc[0],
+                group["Limite supérieure"].iloc[0],
+                reference_stddevs.get(str(standard_id), 0.0)
+            )
+            added += rows
+        return added
+
+    # Relire l'historique complet d'une série (fichiers des lots projetés en mémoire, corrections appliquées)
+    def load(self, standard_id, element):
+        series_dir = self._series_dir(series_key(standard_id, element))
+        tables = read_arrow_dir(os.path.join(series_dir, BATCH_DIR))
+        if not tables:
+            return pd.DataFrame(columns=HISTORY_COLUMNS)
+        history_df = pa.concat_tables(tables).to_pandas()
+
+        # La séquence est la position du point dans l'historique; la dernière correction l'emporte
+        corrections = read_arrow_dir(os.path.join(series_dir, CORRECTIONS_DIR))
+        if corrections:
+            corrections = pa.concat_tables(corrections).to_pandas()
+            rules_text = history_df[RULES_COLUMN].to_numpy(dtype=object, copy=True)
+            rules_text[corrections["sequence"].to_numpy()] = corrections[RULES_COLUMN].to_numpy(dtype=object)
+            history_df[RULES_COLUMN] = rules_text
+        return history_df
+
+
+# Fonction pour résumer l'état d'une série (statistiques cumulées)
+def state_summary(state):
+    count = state["count"]
+    return {
+        "Standard": state["standard_id"],
+        "Élément": state["element"],
+        "Lots": state["batches"],
+        "N": count,
+        "Moyenne": state["mean"],
+        "Écart-type": float(np.sqrt(state["m2"] / count)) if count else np.nan,
+        "Min": state["min"],
+        "Max": state["max"],
+        "Hors limites": state["out_of_limits"],
+        "Signalements (règles)": state.get("flagged_points", sum(state["rule_counts"].values())),
+        "Dernier ajout": state.get("updated_at", "")
+    }
@@ -0,0 +1,225 @@
+import os
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # Repli sur openpyxl/xlrd en lecture seule
+    CalamineWorkbook = None
+
+# Taille par défaut des blocs pour la lecture en continu des gros fichiers
+DEFAULT_CHUNKSIZE = 200_000
+
+# Nombre de lignes lues pour deviner les colonnes numériques
+SAMPLE_ROWS = 1000
+
+# Séparateurs proposés dans l'interface
+SEPARATORS = {",": ",", ";": ";", "Tab": "\t"}
+
+
+# Fonction pour obtenir la taille d'un fichier téléchargé ou d'un chemin
+def get_file_size(file):
+    if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+        return os.path.getsize(file)
+    if hasattr(file, "size") and file.size:
+        return file.size
+    if hasattr(file, "getbuffer"):
+        return file.getbuffer().nbytes
+    return None
+
+
+# Fonction pour revenir au début d'un fichier téléchargé
+def rewind(file):
+    if hasattr(file, "seek"):
+        file.seek(0)
+
+
+# Fonction pour lire l'en-tête et un échantillon d'un fichier CSV sans le charger entièrement
+def read_csv_sample(file, sep, nrows=SAMPLE_ROWS):
+    rewind(file)
+    sample = pd.read_csv(file, sep=sep, nrows=nrows)
+    rewind(file)
+    return sample
+
+
+# Fonction pour deviner les colonnes numériques à partir d'un échantillon
+def guess_numeric_columns(sample, min_ratio=0.9):
+    numeric_columns = []
+    for column in sample.columns:
+        values = sample[column].dropna()
+        if values.empty:
+            continue
+        converted = pd.to_numeric(values, errors="coerce")
+        if converted.notna().mean() >= min_ratio:
+            numeric_columns.append(column)
+    return numeric_columns
+
+
+# Fonction pour convertir les colonnes numériques d'un bloc en types numériques
+def coerce_numeric_columns(df, numeric_columns):
+    for column in numeric_columns:
+        if column in df.columns and not pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+    return df
+
+
+# Générateur des blocs d'un fichier CSV (colonnes utiles seulement, colonnes numériques converties)
+def iter_csv_chunks(file, sep, usecols=None, numeric_columns=None,
+                    chunksize=DEFAULT_CHUNKSIZE, progress_callback=None):
+    numeric_columns = list(numeric_columns or [])
+    if usecols is not None:
+        usecols = list(usecols)
+        numeric_columns = [c for c in numeric_columns if c in usecols]
+
+    # Les colonnes non numériques sont lues comme texte pour éviter l'inférence de type par bloc
+    dtype = None
+    if usecols is not None:
+        dtype = {c: str for c in usecols if c not in numeric_columns}
+
+    total_size = get_file_size(file)
+    rewind(file)
+
+    rows_read = 0
+    reader = pd.read_csv(file, sep=sep, usecols=usecols, dtype=dtype, chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            rows_read += len(chunk)
+            if usecols is not None:
+                # Conserver l'ordre des colonnes choisi par l'utilisateur
+                chunk = chunk[[c for c in usecols if c in chunk.columns]]
+            yield coerce_numeric_columns(chunk, numeric_columns)
+
+            if progress_callback is not None:
+                fraction = None
+                if total_size and hasattr(file, "tell"):
+                    fraction = min(file.tell() / total_size, 1.0)
+                progress_callback(fraction, rows_read)
+
+    rewind(file)
+
+
+# Fonction pour lire un fichier CSV par blocs en ne gardant que les colonnes utiles
+def read_csv_chunked(file, sep, usecols=None, numeric_columns=None,
+                     chunksize=DEFAULT_CHUNKSIZE, progress_callback=None):
+    chunks = list(iter_csv_chunks(file, sep, usecols, numeric_columns, chunksize, progress_callback))
+
+    if not chunks:
+        columns = usecols if usecols is not None else read_csv_sample(file, sep, nrows=0).columns
+        return pd.DataFrame(columns=columns)
+
+    return pd.concat(chunks, ignore_index=True)
+
+
+# Nom de la colonne ajoutée pour identifier la feuille d'origine
+SHEET_COLUMN = "Feuille"
+
+
+# Fonction pour choisir le nom de la colonne de la feuille d'origine sans écraser une colonne des feuilles
+# (ex.: "Feuille_2" si une feuille a déjà une colonne "Feuille")
+def sheet_column_name(frames):
+    name = SHEET_COLUMN
+    suffix = 2
+    while any(name in frame.columns for frame in frames):
+        name = f"{SHEET_COLUMN}_{suffix}"
+        suffix += 1
+    return name
+
+
+# Fonction pour lister les feuilles d'un classeur Excel sans charger les cellules
+def list_excel_sheets(file, file_extension="xlsx"):
+    rewind(file)
+    if CalamineWorkbook is not None:
+        workbook = CalamineWorkbook.from_filelike(BytesIO(_read_bytes(file)))
+        rewind(file)
+        return list(workbook.sheet_names)
+
+    if file_extension == "xls":
+        import xlrd
+        workbook = xlrd.open_workbook(file_contents=_read_bytes(file), on_demand=True)
+        try:
+            return workbook.sheet_names()
+        finally:
+            workbook.release_resources()
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+        rewind(file)
+
+
+def _read_bytes(file):
+    if isinstance(file, str) or hasattr(file, "__fspath__"):
+        with open(file, "rb") as f:
+            return f.read()
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    rewind(file)
+    return file.read()
+
+
+# Fonction pour construire un DataFrame typé à partir des lignes d'une feuille
+def _rows_to_frame(rows):
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+
+    # Générer des noms pour les colonnes sans en-tête
+    columns = [
+        str(name) if name not in (None, "") else f"Colonne_{i + 1}"
+        for i, name in enumerate(header)
+    ]
+    df = pd.DataFrame.from_records(list(rows), columns=columns)
+
+    # Les cellules vides peuvent être lues comme des chaînes vides
+    df = df.replace("", np.nan)
+
+    # Supprimer les lignes et colonnes entièrement vides
+    df = df.dropna(how="all").dropna(axis=1, how="all").reset_index(drop=True)
+    df = df.infer_objects()
+    return coerce_numeric_columns(df, guess_numeric_columns(df))
+
+
+# Fonction pour lire seulement les feuilles choisies d'un classeur Excel en mode lecture seule
+def read_excel_sheets(file, sheets, file_extension="xlsx"):
+    rewind(file)
+    frames = []
+
+    if CalamineWorkbook is not None:
+        workbook = CalamineWorkbook.from_filelike(BytesIO(_read_bytes(file)))
+        for sheet_name in sheets:
+            frames.append(_rows_to_frame(workbook.get_sheet_by_name(sheet_name).to_python()))
+    elif file_extension == "xls":
+        import xlrd
+        workbook = xlrd.open_workbook(file_contents=_read_bytes(file), on_demand=True)
+        try:
+            for sheet_name in sheets:
+                sheet = workbook.sheet_by_name(sheet_name)
+                frames.append(_rows_to_frame(sheet.row_values(i) for i in range(sheet.nrows)))
+                workbook.unload_sheet(sheet_name)
+        finally:
+            workbook.release_resources()
+    else:
+        from openpyxl import load_workbook
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            for sheet_name in sheets:
+                frames.append(_rows_to_frame(workbook[sheet_name].iter_rows(values_only=True)))
+        finally:
+            workbook.close()
+
+    rewind(file)
+
+    if len(frames) == 1:
+        return frames[0]
+
+    # Plusieurs feuilles: les empiler en conservant la feuille d'origine
+    sheet_column = sheet_column_name(frames)
+    for sheet_name, frame in zip(sheets, frames):
+        frame.insert(0, sheet_column, sheet_name)
+    return pd.concat(frames, ignore_index=True)
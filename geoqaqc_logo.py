@@ -0,0 +1,69 @@
+import os
+from functools import lru_cache
+from io import BytesIO
+
+import numpy as np
+
+# Logo pré-rendu livré avec l'application (évite de charger matplotlib au démarrage)
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "geoqaqc_logo.png")
+
+
+# Fonction pour générer un logo géologique
+def generate_geology_logo():
+    import matplotlib.pyplot as plt
+
+    # Créer une figure matplotlib
+    fig, ax = plt.subplots(figsize=(2, 2), dpi=150)
+    
+    # Définir un fond beige clair
+    ax.set_facecolor('#f5f2e9')
+    
+    # Créer un cercle qui représente une coupe géologique
+    circle = plt.Circle((0.5, 0.5), 0.4, fill=False, edgecolor='#8c6d46', linewidth=2.5)
+    ax.add_patch(circle)
+    
+    # Ajouter quelques lignes de stratification
+    for i in range(5):
+        y = 0.3 + i * 0.08
+        ax.plot([0.1, 0.9], [y, y], color='#8c6d46', linewidth=1.5, linestyle='-')
+    
+    # Ajouter un symbole représentant un cristal/minéral
+    crystal_x = [0.5, 0.6, 0.5, 0.4, 0.5]
+    crystal_y = [0.7, 0.5, 0.3, 0.5, 0.7]
+    ax.fill(crystal_x, crystal_y, color='#3a7359', alpha=0.8)
+    
+    # Ajouter des points représentant des minéraux
+    for i in range(8):
+        x = 0.2 + 0.6 * np.random.random()
+        y = 0.2 + 0.6 * np.random.random()
+        size = 20 + 30 * np.random.random()
+        ax.scatter(x, y, color='#b5651d', s=size, alpha=0.7, zorder=3)
+    
+    # Supprimer les axes
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    ax.axis('off')
+    
+    # Convertir la figure en image
+    buf = BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight', transparent=True)
+    plt.close(fig)
+    buf.seek(0)
+    
+    return buf
+
+
+# Fonction pour obtenir le logo en PNG, rendu une seule fois par processus
+@lru_cache(maxsize=1)
+def get_logo_png():
+    if os.path.exists(LOGO_PATH):
+        with open(LOGO_PATH, "rb") as f:
+            return f.read()
+    return generate_geology_logo().getvalue()
+
+
+if __name__ == "__main__":
+    # Régénérer le logo pré-rendu
+    os.makedirs(os.path.dirname(LOGO_PATH), exist_ok=True)
+    with open(LOGO_PATH, "wb") as f:
+        f.write(generate_geology_logo().getvalue())
@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+# Facteur de conversion de la médiane des différences absolues en écart-type (Thompson et Howarth)
+MEDIAN_TO_STDDEV = 1.0484
+
+# Taille des groupes de paires pour la méthode de Thompson-Howarth
+TH_GROUP_SIZE = 11
+
+# Seuils HARD usuels (%)
+HARD_THRESHOLDS = (5.0, 10.0, 20.0)
+
+# Nombre de classes de teneur du tableau de précision
+DEFAULT_PRECISION_BINS = 10
+
+
+# Demi-différence relative absolue (HARD), en pourcentage: |x - y| / (x + y) × 100
+def hard(x, y):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.abs(x - y) / (x + y) * 100
+
+
+# Courbe de classement HARD: valeurs triées et rang centile de chaque paire
+def hard_ranking(values):
+    values = np.sort(values[np.isfinite(values)])
+    ranks = np.arange(1, len(values) + 1) / max(len(values), 1) * 100
+    return values, ranks
+
+
+# Pourcentage des paires dont le HARD est inférieur ou égal à chaque seuil (recherche dichotomique)
+def hard_pass_rates(sorted_values, thresholds=HARD_THRESHOLDS):
+    if len(sorted_values) == 0:
+        return {threshold: np.nan for threshold in thresholds}
+    counts = np.searchsorted(sorted_values, thresholds, side="right")
+    return {threshold: float(count / len(sorted_values) * 100) for threshold, count in zip(thresholds, counts)}
+
+
+# Coefficient de variation moyen quadratique des paires (%), selon Stanley et Lawie (2007)
+def average_cv(x, y):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pair_cv2 = 2 * (x - y) ** 2 / (x + y) ** 2
+    pair_cv2 = pair_cv2[np.isfinite(pair_cv2)]
+    return float(np.sqrt(pair_cv2.mean()) * 100) if len(pair_cv2) else np.nan
+
+
+# Précision de Thompson-Howarth: médianes par groupes de paires triées, puis droite écart = a + b × teneur
+def thompson_howarth(x, y, group_size=TH_GROUP_SIZE):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    means = (x + y) / 2
+    differences = np.abs(x - y)
+    valid = np.isfinite(means) & np.isfinite(differences) & (means > 0)
+    means = means[valid]
+    differences = differences[valid]
+
+    n_groups = len(means) // group_size
+    if n_groups < 2:
+        return None
+
+    # Tri par teneur, puis groupes contigus de taille égale (le reste, de plus forte teneur, est ignoré)
+    order = np.argsort(means, kind="stable")[:n_groups * group_size]
+    group_means = means[order].reshape(n_groups, group_size).mean(axis=1)
+    group_medians = np.median(differences[order].reshape(n_groups, group_size), axis=1)
+
+    slope, intercept = np.polyfit(group_means, group_medians, 1)
+
+    return {
+        "group_means": group_means,
+        "group_medians": group_medians,
+        "intercept": float(intercept),
+        "slope": float(slope),
+        # Écart-type de reproductibilité: s(c) = 1.0484 × (a + b × c)
+        "s0": float(MEDIAN_TO_STDDEV * intercept),
+        "k": float(MEDIAN_TO_STDDEV * slope),
+        "group_size": group_size
+    }
+
+
+# Précision (2 écarts-types, en %) prédite par la droite de Thompson-Howarth à une teneur donnée
+def thompson_howarth_precision(fit, concentration):
+    concentration = np.asarray(concentration, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 2 * (fit["s0"] + fit["k"] * concentration) / concentration * 100
+
+
+# Tableau de précision par classes de teneur (quantiles), calculé par bincount
+def binned_precision(x, y, n_bins=DEFAULT_PRECISION_BINS):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    means = (x + y) / 2
+    pair_hard = hard(x, y)
+    valid = np.isfinite(means) & np.isfinite(pair_hard) & (means > 0)
+    means = means[valid]
+    pair_hard = pair_hard[valid]
+    x = x[valid]
+    y = y[valid]
+    if len(means) == 0:
+        return pd.DataFrame()
+
+    edges = np.unique(np.quantile(means, np.linspace(0, 1, n_bins + 1)))
+    if len(edges) < 2:
+        edges = np.array([means.min(), means.max()])
+    bins = np.clip(np.digitize(means, edges[1:-1], right=True), 0, len(edges) - 2)
+    n = len(edges) - 1
+
+    counts = np.bincount(bins, minlength=n)
+    safe_counts = np.maximum(counts, 1)
+    pair_cv2 = 2 * (x - y) ** 2 / (x + y) ** 2
+
+    # Médiane du HARD par classe: tri par (classe, HARD) puis lecture au milieu de chaque classe
+    order = np.lexsort((pair_hard, bins))
+    sorted_hard = pair_hard[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    lower_mid = starts + (counts - 1) // 2
+    upper_mid = starts + counts // 2
+    medians = np.where(
+        counts > 0,
+        (sorted_hard[np.minimum(lower_mid, len(sorted_hard) - 1)] + sorted_hard[np.minimum(upper_mid, len(sorted_hard) - 1)]) / 2,
+        np.nan
+    )
+
+    table = pd.DataFrame({
+        "Teneur min": edges[:-1],
+        "Teneur max": edges[1:],
+        "Paires": counts,
+        "Teneur moyenne": np.bincount(bins, weights=means, minlength=n) / safe_counts,
+        "HARD moyen (%)": np.bincount(bins, weights=pair_hard, minlength=n) / safe_counts,
+        "HARD médian (%)": medians,
+        "HARD ≤ 10% (%)": np.bincount(bins, weights=(pair_hard <= 10.0), minlength=n) / safe_counts * 100,
+        "CV moyen (%)": np.sqrt(np.bincount(bins, weights=pair_cv2, minlength=n) / safe_counts) * 100
+    })
+    return table[counts > 0].reset_index(drop=True)
+
+
+# Suite complète de précision des duplicatas: HARD, Thompson-Howarth et tableau par classes
+def duplicate_precision(x, y, n_bins=DEFAULT_PRECISION_BINS, group_size=TH_GROUP_SIZE):
+    pair_hard = hard(x, y)
+    sorted_hard, _ = hard_ranking(pair_hard)
+
+    precision = {
+        "hard_median": float(np.median(sorted_hard)) if len(sorted_hard) else np.nan,
+        "hard_90": float(np.quantile(sorted_hard, 0.9)) if len(sorted_hard) else np.nan,
+        "hard_pass_rates": hard_pass_rates(sorted_hard),
+        "average_cv": average_cv(x, y),
+        "thompson_howarth": thompson_howarth(x, y, group_size),
+        "binned": binned_precision(x, y, n_bins)
+    }
+    return pair_hard, precision
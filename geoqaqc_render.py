@@ -0,0 +1,245 @@
+import atexit
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import plotly.io as pio
+
+from geoqaqc_cache import content_hash
+
+# Dimensions et échelle par défaut des images exportées
+DEFAULT_WIDTH = 1200
+DEFAULT_HEIGHT = 800
+DEFAULT_SCALE = 2
+DEFAULT_FORMAT = "png"
+
+# Taille maximale du cache mémoire des images rendues
+DEFAULT_IMAGE_CACHE_BYTES = int(os.environ.get("GEOQAQC_IMAGE_CACHE_MB", "128")) * 1024 * 1024
+
+# Nombre d'onglets Chromium du moteur de rendu persistant (rendus simultanés)
+DEFAULT_RENDER_WORKERS = min(4, os.cpu_count() or 1)
+
+# Nombre de processus de rendu pour les rapports de nombreuses figures; en dessous de PARALLEL_MIN_FIGURES
+# figures à rendre, le rendu reste dans le processus courant
+DEFAULT_RENDER_PROCESSES = os.cpu_count() or 1
+PARALLEL_MIN_FIGURES = 8
+
+
+# Fonction pour calculer la clé d'une image: empreinte du JSON de la figure, dimensions, échelle et format
+def figure_key(fig, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, scale=DEFAULT_SCALE, image_format=DEFAULT_FORMAT):
+    options = f"|{width}|{height}|{scale}|{image_format}".encode("utf-8")
+    return content_hash(pio.to_json(fig, validate=False).encode("utf-8") + options)
+
+
+# Moteur de rendu des figures réutilisé entre les exportations, avec cache des images par empreinte
+class FigureRenderer:
+    def __init__(self, max_bytes=DEFAULT_IMAGE_CACHE_BYTES, workers=DEFAULT_RENDER_WORKERS):
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.hits = 0
+        self.misses = 0
+        self._images = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._server = False
+
+    # Démarrer une seule fois le processus Chromium de kaleido (>= 1.0) au lieu d'un lancement par image;
+    # les versions antérieures gardent déjà leur processus de rendu entre les appels
+    def _start(self):
+        if self._server:
+            return
+        try:
+            import kaleido
+        except ImportError:
+            return
+        start_sync_server = getattr(kaleido, "start_sync_server", None)
+        if start_sync_server is not None:
+            try:
+                start_sync_server(n=self.workers, silence_warnings=True)
+            except TypeError:
+                start_sync_server()
+            except RuntimeError:
+                # Serveur déjà démarré par un autre moteur de rendu du processus
+                pass
+            stop_sync_server = getattr(kaleido, "stop_sync_server", None)
+            if stop_sync_server is not None:
+                atexit.register(stop_sync_server, silence_warnings=True)
+        self._server = True
+
+    def _get(self, key):
+        with self._lock:
+            image = self._images.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._images.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def _put(self, key, image):
+        if len(image) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._images:
+                return
+            self._images[key] = image
+            self._size += len(image)
+            # Éviction des images les moins récemment utilisées
+            while self._size > self.max_bytes:
+                _, removed = self._images.popitem(last=False)
+                self._size -= len(removed)
+
+    # Image d'une figure (PNG par défaut); une figure inchangée est retournée depuis le cache
+    def render(self, fig, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, scale=DEFAULT_SCALE, image_format=DEFAULT_FORMAT):
+        key = figure_key(fig, width, height, scale, image_format)
+        image = self._get(key)
+        if image is not None:
+            return image
+
+        with self._render_lock:
+            self._start()
+            image = pio.to_image(fig, format=image_format, width=width, height=height, scale=scale)
+        self._put(key, image)
+        return image
+
+    # Images de plusieurs figures: les figures absentes du cache sont rendues ensemble (onglets simultanés)
+    def render_many(self, figs, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, scale=DEFAULT_SCALE,
+                    image_format=DEFAULT_FORMAT):
+        keys = [figure_key(fig, width, height, scale, image_format) for fig in figs]
+        images = [self._get(key) for key in keys]
+        missing = [i for i, image in enumerate(images) if image is None]
+        if not missing:
+            return images
+
+        with self._render_lock:
+            self._start()
+            rendered = self._render_batch([figs[i] for i in missing], width, height, scale, image_format)
+
+        for i, image in zip(missing, rendered):
+            images[i] = image
+            self._put(keys[i], image)
+        return images
+
+    # Rendu groupé par plotly.io.write_images (kaleido >= 1.0), sinon figure par figure
+    def _render_batch(self, figs, width, height, scale, image_format):
+        write_images = getattr(pio, "write_images", None)
+        if write_images is None or len(figs) == 1:
+            return [pio.to_image(fig, format=image_format, width=width, height=height, scale=scale) for fig in figs]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = [os.path.join(temp_dir, f"{i}.{image_format}") for i in range(len(figs))]
+            try:
+                write_images(figs, paths, format=image_format, width=width, height=height, scale=scale)
+            except RuntimeError:
+                # Ancienne version de kaleido: pas de rendu groupé
+                return [pio.to_image(fig, format=image_format, width=width, height=height, scale=scale)
+                        for fig in figs]
+            images = []
+            for path in paths:
+                with open(path, "rb") as f:
+                    images.append(f.read())
+        return images
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._images),
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes
+        }
+
+
+_default_renderer = None
+_default_lock = threading.Lock()
+
+
+# Moteur de rendu partagé par toutes les exportations du processus
+def get_renderer():
+    global _default_renderer
+    with _default_lock:
+        if _default_renderer is None:
+            _default_renderer = FigureRenderer()
+        return _default_renderer
+
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+# Pool de processus de rendu gardé entre les exportations: processus lancés par « spawn » (aucune copie des
+# fils du serveur kaleido du processus parent), chacun gardant son propre moteur de rendu d'une exportation
+# à l'autre
+def get_render_pool():
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=DEFAULT_RENDER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            atexit.register(_render_pool.shutdown, cancel_futures=True)
+        return _render_pool
+
+
+# Abandon d'un pool dont un processus s'est arrêté (ex.: plantage de Chromium); recréé à la prochaine exportation
+def _discard_render_pool(pool):
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is pool:
+            _render_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Rendu d'un groupe de figures dans un processus du pool (moteur de rendu propre au processus)
+def _render_block(figs, width, height, scale, image_format):
+    return get_renderer().render_many(figs, width, height, scale, image_format)
+
+
+# Images de nombreuses figures réparties entre les processus du pool persistant (un moteur Chromium par
+# processus); les figures déjà en cache ne sont pas envoyées aux processus
+def render_in_processes(figs, workers=None, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, scale=DEFAULT_SCALE,
+                        image_format=DEFAULT_FORMAT):
+    renderer = get_renderer()
+    figs = list(figs)
+    workers = min(workers or DEFAULT_RENDER_PROCESSES, DEFAULT_RENDER_PROCESSES)
+    if workers <= 1 or len(figs) < PARALLEL_MIN_FIGURES:
+        return renderer.render_many(figs, width, height, scale, image_format)
+
+    keys = [figure_key(fig, width, height, scale, image_format) for fig in figs]
+    images = [renderer._get(key) for key in keys]
+    missing = [i for i, image in enumerate(images) if image is None]
+    if not missing:
+        return images
+
+    # Figures manquantes distribuées en alternance entre les processus
+    workers = min(workers, len(missing))
+    blocks = [missing[k::workers] for k in range(workers)]
+    pool = get_render_pool()
+    futures = [
+        pool.submit(_render_block, [figs[i] for i in block], width, height, scale, image_format)
+        for block in blocks
+    ]
+    try:
+        results = [future.result() for future in futures]
+    except BrokenProcessPool:
+        _discard_render_pool(pool)
+        raise
+
+    for block, rendered in zip(blocks, results):
+        for i, image in zip(block, rendered):
+            images[i] = image
+            renderer._put(keys[i], image)
+    return images
@@ -0,0 +1,353 @@
+from datetime import datetime
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, Flowable, PageBreak
+from reportlab.platypus.tableofcontents import TableOfContents
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+
+from geoqaqc_logo import get_logo_png
+from geoqaqc_render import get_renderer, render_in_processes
+
+
+# Fonction pour exporter un graphique Plotly en PNG (moteur de rendu persistant, images en cache)
+def export_plotly_to_png(fig):
+    img_bytes = get_renderer().render(fig)
+    return img_bytes
+
+
+# Fonction pour exporter plusieurs graphiques Plotly en PNG (rendus simultanés)
+def export_plotly_figures_to_png(figs):
+    return get_renderer().render_many(list(figs))
+
+
+# Nombre de lignes de résultats par page (en-tête répété sur chaque page)
+PDF_ROWS_PER_PAGE = 60
+
+# Statuts signalés dans le rapport (lignes surlignées, ou seules lignes retenues)
+FAILED_STATUSES = ['Hors limites', 'Élevé']
+
+# Police du tableau des résultats, hauteur des lignes et largeur utile de la page
+PDF_TABLE_FONT = 'Helvetica'
+PDF_TABLE_HEADER_FONT = 'Helvetica-Bold'
+PDF_TABLE_FONT_SIZE = 7
+PDF_TABLE_ROW_HEIGHT = 10
+PDF_CONTENT_WIDTH = 6.5 * inch
+
+# Nombre de décimales des valeurs numériques du tableau
+PDF_DIGITS = 4
+
+
+# Masque des lignes non conformes (statut hors limites ou élevé)
+def failed_rows(results_df):
+    if 'Statut' not in results_df.columns:
+        return np.zeros(len(results_df), dtype=bool)
+    return results_df['Statut'].isin(FAILED_STATUSES).to_numpy()
+
+
+# Conversion vectorisée d'une colonne en texte (valeurs manquantes: texte vide)
+def format_column(series, digits=PDF_DIGITS):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Texte de chaque catégorie construit une seule fois, puis repris par code (-1: vide)
+        labels = np.array([str(c) for c in series.cat.categories] + [""], dtype=object)
+        return labels[series.cat.codes.to_numpy()]
+    if pd.api.types.is_float_dtype(series.dtype):
+        values = series.to_numpy(dtype=float)
+        text = np.char.mod(f"%.{digits}f", values).astype(object)
+        text[np.isnan(values)] = ""
+        return text
+    return series.astype("string").fillna("").to_numpy(dtype=object)
+
+
+# Longueur du texte le plus long d'une colonne, calculée sans formater chaque cellule
+def column_text_length(series, digits=PDF_DIGITS):
+    if len(series) == 0:
+        return 0
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        used = series.cat.categories[np.unique(series.cat.codes[series.cat.codes >= 0])]
+        return max((len(str(c)) for c in used), default=0)
+    if pd.api.types.is_float_dtype(series.dtype):
+        values = series.to_numpy(dtype=float)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return 0
+        return max(len(f"{values.min():.{digits}f}"), len(f"{values.max():.{digits}f}"))
+    lengths = series.astype("string").str.len()
+    return int(lengths.max()) if lengths.notna().any() else 0
+
+
+# Largeur des colonnes proportionnelle au texte le plus long (en-tête compris)
+def column_widths(results_df, available_width=PDF_CONTENT_WIDTH):
+    lengths = np.array([
+        max(len(str(column)), column_text_length(results_df[column]), 3)
+        for column in results_df.columns
+    ], dtype=float)
+    return lengths / lengths.sum() * available_width
+
+
+# Page du tableau des résultats dessinée directement sur le canevas: un objet texte par colonne au lieu
+# d'une cellule Table par valeur; les cellules ne sont formatées qu'au dessin de la page
+class ResultsPage(Flowable):
+    def __init__(self, rows_df, failed, widths):
+        super().__init__()
+        self.rows_df = rows_df
+        self.failed = failed
+        self.widths = widths
+        self._columns = None
+
+    # Texte des colonnes de la page, formaté au premier dessin puis réutilisé (une mise en page en plusieurs
+    # passes, pour la table des matières, dessine chaque page plusieurs fois)
+    def formatted_columns(self):
+        if self._columns is None:
+            self._columns = [list(format_column(self.rows_df[column])) for column in self.rows_df.columns]
+        return self._columns
+
+    def wrap(self, available_width, available_height):
+        return float(self.widths.sum()), (len(self.rows_df) + 1) * PDF_TABLE_ROW_HEIGHT
+
+    def draw(self):
+        canvas = self.canv
+        row_height = PDF_TABLE_ROW_HEIGHT
+        n = len(self.rows_df)
+        width = float(self.widths.sum())
+        top = (n + 1) * row_height
+        edges = np.concatenate(([0.0], np.cumsum(self.widths)))
+
+        # Fonds: en-tête et lignes non conformes
+        canvas.setFillColor(colors.lightgrey)
+        canvas.rect(0, top - row_height, width, row_height, stroke=0, fill=1)
+        canvas.setFillColor(colors.lightpink)
+        for i in np.flatnonzero(self.failed):
+            canvas.rect(0, top - (i + 2) * row_height, width, row_height, stroke=0, fill=1)
+
+        # Grille en un seul appel
+        canvas.setStrokeColor(colors.black)
+        canvas.setLineWidth(0.5)
+        lines = [(0, y, width, y) for y in np.arange(n + 2) * row_height]
+        lines += [(x, 0, x, top) for x in edges]
+        canvas.lines(lines)
+
+        # Texte colonne par colonne
+        canvas.setFillColor(colors.black)
+        baseline = top - row_height + (row_height - PDF_TABLE_FONT_SIZE) / 2 + 1
+        for j, (column, lines) in enumerate(zip(self.rows_df.columns, self.formatted_columns())):
+            header = canvas.beginText(edges[j] + 2, baseline)
+            header.setFont(PDF_TABLE_HEADER_FONT, PDF_TABLE_FONT_SIZE)
+            header.textLine(str(column))
+            canvas.drawText(header)
+
+            text = canvas.beginText(edges[j] + 2, baseline - row_height)
+            text.setFont(PDF_TABLE_FONT, PDF_TABLE_FONT_SIZE, row_height)
+            text.textLines(lines)
+            canvas.drawText(text)
+
+
+# Pages du tableau des résultats (une page de lignes par élément, en-tête répété)
+def results_pages(results_df, failed, rows_per_page=PDF_ROWS_PER_PAGE):
+    widths = column_widths(results_df)
+    pages = []
+    for start in range(0, len(results_df), rows_per_page):
+        stop = start + rows_per_page
+        pages.append(ResultsPage(results_df.iloc[start:stop], failed[start:stop], widths))
+    return pages
+
+
+# Styles des rapports PDF
+def report_styles():
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'TitleStyle', 
+            parent=styles['Heading1'], 
+            fontSize=16, 
+            spaceAfter=12
+        ),
+        'subtitle': ParagraphStyle(
+            'SubtitleStyle', 
+            parent=styles['Heading2'], 
+            fontSize=14, 
+            spaceAfter=10
+        ),
+        'section_subtitle': ParagraphStyle(
+            'SectionSubtitleStyle',
+            parent=styles['Heading3'],
+            fontSize=12,
+            spaceAfter=8
+        ),
+        'normal': styles['Normal'],
+        'italic': styles['Italic']
+    }
+
+
+# En-tête du rapport: logo pré-rendu, titre, date et auteur
+def header_elements(title, author, styles):
+    logo_img = Image(BytesIO(get_logo_png()), width=0.8*inch, height=0.8*inch)
+    header_data = [[logo_img, Paragraph(f"<b>GeoQAQC - {title}</b>", styles['title'])]]
+    header_table = Table(header_data, colWidths=[1*inch, 5*inch])
+    header_table.setStyle(TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ALIGN', (1, 0), (1, 0), 'LEFT'),
+        ('LEFTPADDING', (0, 0), (0, 0), 0),
+        ('RIGHTPADDING', (0, 0), (0, 0), 10),
+    ]))
+    return [
+        header_table,
+        Paragraph(f"Date: {datetime.now().strftime('%d-%m-%Y %H:%M')}", styles['normal']),
+        Paragraph(f"Auteur: {author}", styles['normal']),
+        Spacer(1, 0.2*inch)
+    ]
+
+
+# Contenu d'une analyse: graphique (PNG), statistiques et tableau des résultats; row_counts donne le nombre
+# de lignes analysées et non conformes d'un tableau déjà réduit aux non-conformités
+def analysis_elements(image, stats_dict, results_df, styles, failures_only=False, heading_style=None, note=None,
+                      row_counts=None):
+    heading_style = heading_style or styles['subtitle']
+    elements = []
+    
+    # Ajouter le graphique (PNG en mémoire), ou la raison de son absence
+    if image is not None:
+        elements.append(Image(BytesIO(image), width=6*inch, height=4*inch))
+        elements.append(Spacer(1, 0.2*inch))
+    if note:
+        elements.append(Paragraph(escape(note), styles['italic']))
+        elements.append(Spacer(1, 0.2*inch))
+    
+    # Ajouter les statistiques
+    elements.append(Paragraph("Statistiques", heading_style))
+    stats_data = [[k, str(v)] for k, v in stats_dict.items()]
+    if stats_data:
+        stats_table = Table(stats_data, colWidths=[3*inch, 3*inch])
+        stats_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('PADDING', (0, 0), (-1, -1), 6),
+        ]))
+        elements.append(stats_table)
+        elements.append(Spacer(1, 0.2*inch))
+    
+    # Analyse sans tableau par ligne (lecture en continu)
+    if results_df is None:
+        return elements
+    
+    # Résumé des lignes (toutes, non conformes)
+    failed = failed_rows(results_df)
+    total_rows, failed_count = row_counts or (len(results_df), int(failed.sum()))
+    elements.append(Paragraph(
+        f"Lignes analysées: {total_rows} | Non conformes: {failed_count}",
+        styles['normal']
+    ))
+    elements.append(Spacer(1, 0.2*inch))
+    
+    # Ajouter les résultats (toutes les lignes, ou seulement les non-conformités, y compris un tableau déjà réduit)
+    if failures_only or row_counts:
+        elements.append(Paragraph("Résultats non conformes", heading_style))
+        results_df = results_df[failed]
+        failed = failed[failed]
+    else:
+        elements.append(Paragraph("Résultats détaillés", heading_style))
+    
+    if len(results_df):
+        elements.extend(results_pages(results_df, failed))
+    else:
+        elements.append(Paragraph("Aucune ligne non conforme.", styles['normal']))
+    return elements
+
+
+# Pied de page du rapport
+def footer_elements(styles):
+    return [
+        Spacer(1, 0.3*inch),
+        Paragraph("GeoQAQC © 2025 - Rapport généré automatiquement", styles['italic'])
+    ]
+
+
+# Fonction pour exporter un DataFrame en PDF (document, logo et graphique en mémoire)
+def export_to_pdf(title, fig, stats_dict, results_df, author="Didier Ouedraogo, P.Geo", failures_only=False):
+    buffer = BytesIO()
+    
+    # Créer un document PDF
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    styles = report_styles()
+    
+    elements = header_elements(title, author, styles)
+    elements.extend(analysis_elements(export_plotly_to_png(fig), stats_dict, results_df, styles, failures_only))
+    elements.extend(footer_elements(styles))
+    
+    # Créer le document PDF et le retourner comme bytes
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+# Document dont les titres de section alimentent la table des matières (numéro de page et signet)
+class CampaignDocTemplate(SimpleDocTemplate):
+    def afterFlowable(self, flowable):
+        key = getattr(flowable, 'toc_key', None)
+        if key is not None:
+            self.canv.bookmarkPage(key)
+            self.canv.addOutlineEntry(flowable.getPlainText(), key, level=0)
+            self.notify('TOCEntry', (0, flowable.getPlainText(), self.page, key))
+
+
+# Section d'un rapport de campagne; l'image PNG peut être fournie déjà rendue (ex.: par un processus du lot),
+# note explique l'absence du graphique
+def campaign_section(title, fig, stats_dict, results_df, image=None, note=None, row_counts=None):
+    return {"title": title, "fig": fig, "stats": stats_dict, "results": results_df, "image": image,
+            "note": note, "row_counts": row_counts}
+
+
+# Nombre maximal de sections gardées en mémoire pour un rapport de campagne (application)
+CAMPAIGN_MAX_SECTIONS = 150
+
+
+# Réduire le tableau d'une section aux lignes non conformes (nombres de lignes analysées et non conformes
+# conservés pour le résumé)
+def keep_failed_rows(section):
+    results_df = section["results"]
+    if results_df is None:
+        return section
+    failed = failed_rows(results_df)
+    section["row_counts"] = section.get("row_counts") or (len(results_df), int(failed.sum()))
+    section["results"] = results_df[failed].reset_index(drop=True)
+    return section
+
+
+# Rapport de campagne: toutes les analyses dans un seul PDF avec table des matières;
+# les graphiques sans image sont rendus ensemble, répartis entre plusieurs processus
+def export_campaign_to_pdf(title, sections, author="Didier Ouedraogo, P.Geo", failures_only=False, workers=None):
+    sections = list(sections)
+    pending = [i for i, section in enumerate(sections) if section.get("image") is None and section.get("fig") is not None]
+    images = [section.get("image") for section in sections]
+    for i, image in zip(pending, render_in_processes([sections[i]["fig"] for i in pending], workers)):
+        images[i] = image
+    
+    buffer = BytesIO()
+    doc = CampaignDocTemplate(buffer, pagesize=A4)
+    styles = report_styles()
+    
+    elements = header_elements(title, author, styles)
+    
+    # Table des matières (numéros de page résolus par une mise en page en plusieurs passes)
+    elements.append(Paragraph("Table des matières", styles['subtitle']))
+    toc = TableOfContents()
+    toc.levelStyles = [ParagraphStyle('TOCLevel0', parent=styles['normal'], leftIndent=10, firstLineIndent=-10)]
+    elements.append(toc)
+    
+    for i, (section, image) in enumerate(zip(sections, images)):
+        elements.append(PageBreak())
+        heading = Paragraph(escape(str(section["title"])), styles['subtitle'])
+        heading.toc_key = f"section-{i}"
+        elements.append(heading)
+        elements.extend(analysis_elements(
+            image, section["stats"], section["results"], styles, failures_only, styles['section_subtitle'],
+            section.get("note"), section.get("row_counts")
+        ))
+    
+    elements.extend(footer_elements(styles))
+    doc.multiBuild(elements)
+    return buffer.getvalue()
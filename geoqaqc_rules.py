@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+# Règles de Westgard / Nelson évaluées sur les séries de CRM (dans l'ordre des analyses)
+RULE_1_2S = "1_2s"
+RULE_1_3S = "1_3s"
+RULE_2_2S = "2_2s"
+RULE_R_4S = "R_4s"
+RULE_4_1S = "4_1s"
+RULE_SHIFT = "7_x"
+RULE_TREND = "6_T"
+
+RULE_DESCRIPTIONS = {
+    RULE_1_2S: "1 valeur au-delà de ±2 écarts-types (avertissement)",
+    RULE_1_3S: "1 valeur au-delà de ±3 écarts-types",
+    RULE_2_2S: "2 valeurs consécutives au-delà de 2 écarts-types du même côté",
+    RULE_R_4S: "Écart de plus de 4 écarts-types entre 2 valeurs consécutives",
+    RULE_4_1S: "4 valeurs consécutives au-delà de 1 écart-type du même côté",
+    RULE_SHIFT: "7 valeurs consécutives du même côté de la valeur de référence",
+    RULE_TREND: "6 valeurs consécutives en hausse ou en baisse"
+}
+
+# Règles appliquées par défaut
+DEFAULT_RULES = [RULE_1_2S, RULE_1_3S, RULE_2_2S, RULE_R_4S, RULE_4_1S, RULE_SHIFT, RULE_TREND]
+
+# Longueurs des séries pour les règles de dérive
+SHIFT_LENGTH = 7
+TREND_LENGTH = 6
+
+RULES_COLUMN = "Règles violées"
+
+
+# Position du début du groupe de chaque point (0 sans groupes)
+def group_starts(groups, n):
+    if groups is None:
+        return np.zeros(n, dtype=np.int64)
+    boundary = np.ones(n, dtype=bool)
+    boundary[1:] = groups[1:] != groups[:-1]
+    return np.maximum.accumulate(np.where(boundary, np.arange(n), 0))
+
+
+# Masque des points appartenant à une série d'au moins k valeurs vraies consécutives (même groupe)
+def runs_of(mask, k, starts):
+    n = len(mask)
+    if k <= 1:
+        return mask.copy()
+    if n < k:
+        return np.zeros(n, dtype=bool)
+
+    # Nombre de valeurs vraies dans la fenêtre [i - k + 1, i] par différence de sommes cumulées
+    counts = np.cumsum(mask, dtype=np.int64)
+    window = counts.copy()
+    window[k:] -= counts[:-k]
+    positions = np.arange(n)
+    ends = (window == k) & (positions - k + 1 >= starts)
+
+    # Propager chaque fin de série sur les k points qui la composent
+    end_counts = np.cumsum(ends, dtype=np.int64)
+    ahead = np.minimum(positions + k - 1, n - 1)
+    before = np.concatenate(([0], end_counts[:-1]))
+    return (end_counts[ahead] - before) > 0
+
+
+# Évaluation vectorisée des règles; retourne un DataFrame de masques (une colonne par règle)
+def evaluate_rules(values, reference_value, reference_stddev, groups=None, rules=DEFAULT_RULES,
+                   shift_length=SHIFT_LENGTH, trend_length=TREND_LENGTH):
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+
+    # Séries intercalées: tri stable par groupe pour rendre chaque série contiguë (ordre conservé)
+    order = None
+    if groups is not None:
+        groups = np.asarray(groups)
+        order = np.argsort(groups, kind="stable")
+        groups = groups[order]
+        values = values[order]
+        reference_value = np.broadcast_to(reference_value, n)[order]
+        reference_stddev = np.broadcast_to(reference_stddev, n)[order]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (values - reference_value) / reference_stddev
+
+    starts = group_starts(groups, n)
+    same_as_previous = np.zeros(n, dtype=bool)
+    same_as_previous[1:] = starts[1:] == starts[:-1]
+
+    above = {k: z > k for k in (1, 2, 3)}
+    below = {k: z < -k for k in (1, 2, 3)}
+
+    flags = {}
+    for rule in rules:
+        if rule == RULE_1_2S:
+            flags[rule] = above[2] | below[2]
+        elif rule == RULE_1_3S:
+            flags[rule] = above[3] | below[3]
+        elif rule == RULE_2_2S:
+            flags[rule] = runs_of(above[2], 2, starts) | runs_of(below[2], 2, starts)
+        elif rule == RULE_R_4S:
+            # Une valeur au-delà de +2s suivie (ou précédée) d'une valeur au-delà de -2s
+            pair = np.zeros(n, dtype=bool)
+            pair[1:] = same_as_previous[1:] & (
+                (above[2][1:] & below[2][:-1]) | (below[2][1:] & above[2][:-1])
+            )
+            flags[rule] = pair | np.concatenate((pair[1:], [False]))
+        elif rule == RULE_4_1S:
+            flags[rule] = runs_of(above[1], 4, starts) | runs_of(below[1], 4, starts)
+        elif rule == RULE_SHIFT:
+            flags[rule] = runs_of(z > 0, shift_length, starts) | runs_of(z < 0, shift_length, starts)
+        elif rule == RULE_TREND:
+            # trend_length points = trend_length - 1 variations successives de même signe
+            delta = np.diff(values)
+            trend = np.zeros(n, dtype=bool)
+            for direction in (delta > 0, delta < 0):
+                steps = np.zeros(n, dtype=bool)
+                steps[1:] = direction & same_as_previous[1:]
+                run = runs_of(steps, trend_length - 1, starts)
+                # Le point précédant la première variation fait aussi partie de la série
+                trend |= run | np.concatenate((run[1:] & ~run[:-1], [False]))
+            flags[rule] = trend
+        else:
+            raise ValueError(f"Règle inconnue: {rule}")
+
+    if order is not None:
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(n)
+        flags = {rule: mask[inverse] for rule, mask in flags.items()}
+
+    return pd.DataFrame(flags)
+
+
+# Code binaire des règles violées par chaque point (bit i: i-ème règle du DataFrame de masques)
+def rules_codes(flags):
+    codes = np.zeros(len(flags), dtype=np.uint16)
+    for bit, rule in enumerate(flags.columns):
+        codes |= flags[rule].to_numpy().astype(np.uint16) << bit
+    return codes
+
+
+# Fonction pour résumer les règles violées de chaque point en texte (ex.: "1_3s, 2_2s")
+def rules_summary(flags, categorical=False):
+    rules = list(flags.columns)
+    if not rules:
+        texts = np.full(len(flags), "", dtype=object)
+        return pd.Categorical(texts) if categorical else texts
+
+    # Une combinaison de règles par code binaire: le texte n'est construit qu'une fois par combinaison
+    codes = rules_codes(flags)
+    present = np.flatnonzero(np.bincount(codes, minlength=1 << len(rules)))
+    positions = np.zeros(1 << len(rules), dtype=np.int64)
+    positions[present] = np.arange(len(present))
+    texts = np.array([
+        ", ".join(rule for bit, rule in enumerate(rules) if code >> bit & 1)
+        for code in present
+    ], dtype=object)
+
+    # Type catégoriel: un code par ligne au lieu d'une chaîne Python
+    if categorical:
+        return pd.Categorical.from_codes(positions[codes], categories=texts)
+    return texts[positions[codes]]
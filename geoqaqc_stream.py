@@ -0,0 +1,471 @@
+import numpy as np
+import pandas as pd
+
+from geoqaqc_engine import (
+    TOLERANCE_PERCENT, REGRESSION_OLS, REGRESSION_RMA, REGRESSION_THEIL_SEN,
+    LOD_MEAN_STDDEV, LOD_MEDIAN_MAD, LOD_PERCENTILE, LOD_TRIMMED,
+    MAD_TO_STDDEV, LOD_QUANTILE, LOD_TRIM_FRACTION,
+    calculate_crm_limits, prepare_analysis_data, within_limits, absolute_differences, relative_differences,
+    theil_sen_regression, add_rule_counts
+)
+from geoqaqc_precision import HARD_THRESHOLDS, hard
+from geoqaqc_rules import DEFAULT_RULES, SHIFT_LENGTH, TREND_LENGTH, evaluate_rules
+
+# Précision relative des quantiles estimés par l'esquisse (0.5%)
+SKETCH_RELATIVE_ACCURACY = 0.005
+
+# Nombre de paires conservées (échantillon aléatoire uniforme) pour la pente de Theil-Sen en continu
+THEIL_SEN_RESERVOIR = 20_000
+
+# Nombre de points avant et après chaque point nécessaires pour évaluer les règles de Westgard
+RULE_CONTEXT = max(SHIFT_LENGTH, TREND_LENGTH) + 1
+
+
+# Fonction pour fusionner deux ensembles de moments (effectif, moyenne, somme des carrés des écarts)
+def merge_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    count = count_a + count_b
+    if count == 0:
+        return 0, 0.0, 0.0
+    delta = mean_b - mean_a
+    mean = mean_a + delta * count_b / count
+    m2 = m2_a + m2_b + delta * delta * count_a * count_b / count
+    return count, mean, m2
+
+
+# Moments d'une variable (Welford par blocs): effectif, moyenne, somme des carrés des écarts, min et max
+class MomentAccumulator:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    # Ajouter un bloc de valeurs: moments du bloc calculés en une fois, puis fusionnés
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return self
+        mean = values.mean()
+        self.count, self.mean, self.m2 = merge_moments(
+            self.count, self.mean, self.m2, len(values), float(mean), float(((values - mean) ** 2).sum())
+        )
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        return self
+
+    def merge(self, other):
+        self.count, self.mean, self.m2 = merge_moments(self.count, self.mean, self.m2, other.count, other.mean, other.m2)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    # Écart-type de population (ddof=0, comme np.std)
+    @property
+    def std(self):
+        return float(np.sqrt(self.m2 / self.count)) if self.count else np.nan
+
+
+# Moments croisés de deux variables (régression OLS / RMA et corrélation en un seul passage)
+class CoMomentAccumulator:
+    def __init__(self):
+        self.x = MomentAccumulator()
+        self.y = MomentAccumulator()
+        self.cxy = 0.0
+
+    def _merge_cross(self, count, mean_x, mean_y, cxy):
+        if count == 0:
+            return
+        n = self.x.count + count
+        self.cxy += cxy + (mean_x - self.x.mean) * (mean_y - self.y.mean) * self.x.count * count / n
+
+    def update(self, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if len(x) == 0:
+            return self
+        mean_x = x.mean()
+        mean_y = y.mean()
+        # Produit croisé fusionné avant les moments, qui servent de moyennes courantes
+        self._merge_cross(len(x), mean_x, mean_y, float(((x - mean_x) * (y - mean_y)).sum()))
+        self.x.update(x)
+        self.y.update(y)
+        return self
+
+    def merge(self, other):
+        self._merge_cross(other.x.count, other.x.mean, other.y.mean, other.cxy)
+        self.x.merge(other.x)
+        self.y.merge(other.y)
+        return self
+
+    @property
+    def count(self):
+        return self.x.count
+
+    # Pente, ordonnée à l'origine et coefficient r (mêmes formules que linear_regression et rma_regression)
+    def regression(self, method=REGRESSION_OLS):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = np.float64(self.cxy) / np.sqrt(np.float64(self.x.m2) * self.y.m2)
+            if method == REGRESSION_RMA:
+                slope = np.sign(r) * np.sqrt(np.float64(self.y.m2) / self.x.m2)
+            else:
+                slope = np.float64(self.cxy) / self.x.m2
+        intercept = self.y.mean - slope * self.x.mean
+        return float(slope), float(intercept), float(r)
+
+
+# Esquisse de quantiles fusionnable (classes logarithmiques, erreur relative bornée)
+class QuantileSketch:
+    def __init__(self, relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        # Classes des valeurs positives et des valeurs absolues des négatives: indices triés et effectifs
+        self.positive = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        self.negative = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        self.zeros = 0
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @staticmethod
+    def _merge_store(store, indices, counts):
+        indices = np.concatenate((store[0], indices))
+        counts = np.concatenate((store[1], counts))
+        merged, inverse = np.unique(indices, return_inverse=True)
+        return merged, np.bincount(inverse, weights=counts, minlength=len(merged)).astype(np.int64)
+
+    def _bin_indices(self, magnitudes):
+        return np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+        for sign, store in ((1, "positive"), (-1, "negative")):
+            selected = values[values * sign > 0]
+            if len(selected):
+                indices, counts = np.unique(self._bin_indices(selected * sign), return_counts=True)
+                setattr(self, store, self._merge_store(getattr(self, store), indices, counts))
+        self.zeros += int((values == 0).sum())
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        return self
+
+    def merge(self, other):
+        self.positive = self._merge_store(self.positive, *other.positive)
+        self.negative = self._merge_store(self.negative, *other.negative)
+        self.zeros += other.zeros
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    # Valeur représentative (centre) de chaque classe et effectifs, par valeur croissante
+    def bins(self):
+        centers = lambda indices: 2 * self.gamma ** indices.astype(float) / (self.gamma + 1)
+        values = np.concatenate((-centers(self.negative[0])[::-1], [0.0], centers(self.positive[0])))
+        counts = np.concatenate((self.negative[1][::-1], [self.zeros], self.positive[1]))
+        return np.clip(values, self.min, self.max), counts
+
+    def quantile(self, q):
+        if self.count == 0:
+            return np.nan
+        values, counts = self.bins()
+        return weighted_quantile(values, counts, q)
+
+    # Nombre (estimé) de valeurs inférieures ou égales à un seuil: effectifs cumulés interpolés entre les classes
+    def rank(self, threshold):
+        if self.count == 0:
+            return 0.0
+        if threshold >= self.max:
+            return float(self.count)
+        values, counts = self.bins()
+        present = counts > 0
+        values, counts = values[present], counts[present]
+        # Chaque classe est centrée sur sa valeur: la moitié de son effectif est comptée avant le centre
+        midpoints = np.cumsum(counts) - counts / 2
+        return float(np.interp(threshold, values, midpoints, left=0.0, right=self.count))
+
+    # Nombre (estimé) de valeurs strictement supérieures à un seuil
+    def count_above(self, threshold):
+        return int(round(self.count - self.rank(threshold)))
+
+
+# Quantile de valeurs pondérées par des effectifs (interpolé entre les centres des classes)
+def weighted_quantile(values, counts, q):
+    order = np.argsort(values, kind="stable")
+    values = values[order]
+    counts = counts[order]
+    values, counts = values[counts > 0], counts[counts > 0]
+    if len(counts) == 0:
+        return np.nan
+    midpoints = np.cumsum(counts) - counts / 2
+    return float(np.interp(q * counts.sum(), midpoints, values))
+
+
+# Limite de détection à partir des moments (exacte) ou de l'esquisse (estimateurs robustes, approchés)
+def sketch_lod(moments, sketch, method=LOD_MEAN_STDDEV, k=3):
+    if method == LOD_MEAN_STDDEV:
+        return moments.mean + k * moments.std
+    if method == LOD_PERCENTILE:
+        return sketch.quantile(LOD_QUANTILE)
+
+    values, counts = sketch.bins()
+    if method == LOD_MEDIAN_MAD:
+        median = weighted_quantile(values, counts, 0.5)
+        mad = weighted_quantile(np.abs(values - median), counts, 0.5)
+        return median + k * MAD_TO_STDDEV * mad
+    if method == LOD_TRIMMED:
+        # Effectifs de chaque classe compris entre les rangs conservés [t, n - t)
+        trimmed = np.floor(LOD_TRIM_FRACTION * sketch.count)
+        upper = np.cumsum(counts)
+        lower = upper - counts
+        kept = np.clip(upper, trimmed, sketch.count - trimmed) - np.clip(lower, trimmed, sketch.count - trimmed)
+        mean = np.average(values, weights=kept)
+        return mean + k * np.sqrt(np.average((values - mean) ** 2, weights=kept))
+    raise ValueError(f"Estimateur de la limite de détection inconnu: {method}")
+
+
+# Règles de Westgard évaluées bloc par bloc: chaque point est compté une fois que ses voisins sont connus
+class RuleStream:
+    def __init__(self, reference_value, reference_stddev, rules=DEFAULT_RULES):
+        self.reference_value = reference_value
+        self.reference_stddev = reference_stddev
+        self.rules = list(rules)
+        self.rule_counts = {rule: 0 for rule in self.rules}
+        self.flagged = 0
+        self._context = np.empty(0)
+        self._pending = np.empty(0)
+
+    def _count(self, values, start, stop):
+        flags = evaluate_rules(values, self.reference_value, self.reference_stddev, rules=self.rules)
+        finalized = flags.iloc[start:stop]
+        for rule, count in finalized.sum().items():
+            self.rule_counts[rule] += int(count)
+        self.flagged += int(finalized.any(axis=1).sum())
+
+    def update(self, values):
+        values = np.concatenate((self._context, self._pending, np.asarray(values, dtype=float)))
+        # Les RULE_CONTEXT derniers points restent en attente: une série peut encore les inclure
+        stop = max(len(values) - RULE_CONTEXT, len(self._context))
+        if stop > len(self._context):
+            self._count(values, len(self._context), stop)
+        self._context = values[max(stop - RULE_CONTEXT, 0):stop]
+        self._pending = values[stop:]
+        return self
+
+    def finish(self):
+        values = np.concatenate((self._context, self._pending))
+        if len(self._pending):
+            self._count(values, len(self._context), len(values))
+        self._context = values[-RULE_CONTEXT:]
+        self._pending = np.empty(0)
+        return self
+
+
+# Échantillon aléatoire uniforme de taille fixe (clés aléatoires: les plus grandes sont conservées)
+class PairReservoir:
+    def __init__(self, size=THEIL_SEN_RESERVOIR, seed=0):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.empty(0)
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+
+    def update(self, x, y):
+        keys = np.concatenate((self.keys, self.rng.random(len(x))))
+        x = np.concatenate((self.x, np.asarray(x, dtype=float)))
+        y = np.concatenate((self.y, np.asarray(y, dtype=float)))
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, len(keys) - self.size)[len(keys) - self.size:]
+            keep.sort()
+            keys, x, y = keys[keep], x[keep], y[keep]
+        self.keys, self.x, self.y = keys, x, y
+        return self
+
+
+# ----------------------------------------
+# ANALYSES EN CONTINU (blocs de DataFrames mappés en entrée, un seul passage)
+# ----------------------------------------
+
+# Analyse des standards CRM par blocs: statistiques et métriques de analyze_crm, sans tableau par ligne
+def stream_crm(chunks, reference_value, tolerance_type, tolerance_value, reference_stddev=0):
+    reference_stddev = reference_stddev or 0
+    lower_limit, upper_limit = calculate_crm_limits(reference_value, tolerance_type, tolerance_value, reference_stddev)
+
+    moments = MomentAccumulator()
+    # Les règles ont besoin de l'écart-type avant le premier point: seul l'écart-type certifié le permet
+    rule_stream = RuleStream(reference_value, reference_stddev) if reference_stddev > 0 else None
+    failures = 0
+
+    for chunk in chunks:
+        analysis_data = prepare_analysis_data(chunk, ["sample_id", "measured_value"], ["measured_value"])
+        values = analysis_data["measured_value"].to_numpy(dtype=float)
+        moments.update(values)
+        failures += int((~within_limits(values, lower_limit, upper_limit)).sum())
+        if rule_stream is not None:
+            rule_stream.update(values)
+
+    if moments.count == 0:
+        raise ValueError("Aucune donnée numérique valide trouvée pour l'analyse.")
+
+    metrics = {
+        "reference_value": reference_value,
+        "reference_stddev": reference_stddev,
+        "tolerance_type": tolerance_type,
+        "tolerance_value": tolerance_value,
+        "lower_limit": float(lower_limit),
+        "upper_limit": float(upper_limit),
+        "mean": moments.mean,
+        "std": moments.std,
+        "min": moments.min,
+        "max": moments.max,
+        "count": moments.count,
+        "failures": failures
+    }
+
+    stats_dict = {
+        "Valeur de référence": f"{reference_value:.4f}",
+        "Moyenne": f"{metrics['mean']:.4f}",
+        "Écart-type": f"{metrics['std']:.4f}",
+        "Min": f"{metrics['min']:.4f}",
+        "Max": f"{metrics['max']:.4f}"
+    }
+
+    if reference_stddev > 0:
+        stats_dict["Écart-type de référence"] = f"{reference_stddev:.4f}"
+
+    if tolerance_type == TOLERANCE_PERCENT:
+        stats_dict["Tolérance"] = f"{tolerance_value:.2f}%"
+    else:
+        stats_dict["Tolérance"] = f"{tolerance_value:.1f} × écart-type"
+
+    stats_dict["Hors limites"] = str(failures)
+
+    if rule_stream is not None:
+        rule_stream.finish()
+        add_rule_counts(rule_stream.rule_counts, rule_stream.flagged, stats_dict, metrics)
+    else:
+        stats_dict["Règles de Westgard"] = "Non évaluées (écart-type de référence requis en continu)"
+
+    return stats_dict, metrics
+
+
+# Analyse des blancs par blocs (LOD sur l'ensemble des blancs)
+def stream_blanks(chunks, lod_method=LOD_MEAN_STDDEV):
+    moments = MomentAccumulator()
+    sketch = QuantileSketch()
+
+    for chunk in chunks:
+        analysis_data = prepare_analysis_data(chunk, ["sample_id", "measured_value"], ["measured_value"])
+        values = analysis_data["measured_value"].to_numpy(dtype=float)
+        moments.update(values)
+        sketch.update(values)
+
+    if moments.count == 0:
+        raise ValueError("Aucune donnée numérique valide trouvée pour l'analyse.")
+
+    lod = float(sketch_lod(moments, sketch, lod_method))
+    metrics = {
+        "mean": moments.mean,
+        "std": moments.std,
+        "min": moments.min,
+        "max": moments.max,
+        "lod": lod,
+        "lod_method": lod_method,
+        "count": moments.count,
+        # La LOD n'est connue qu'à la fin du passage: nombre de blancs élevés estimé par l'esquisse
+        "failures": sketch.count_above(lod)
+    }
+
+    stats_dict = {
+        "Moyenne": f"{metrics['mean']:.4f}",
+        "Écart-type": f"{metrics['std']:.4f}",
+        "Min": f"{metrics['min']:.4f}",
+        "Max": f"{metrics['max']:.4f}",
+        "Limite de détection estimée (LOD)": f"{metrics['lod']:.4f}"
+    }
+    if lod_method != LOD_MEAN_STDDEV:
+        stats_dict["Estimateur de la LOD"] = lod_method
+    stats_dict["Blancs élevés (estimation)"] = str(metrics["failures"])
+
+    return stats_dict, metrics
+
+
+# Analyse des duplicatas par blocs: régression et précision sans tableau par paire
+def stream_duplicates(chunks, regression_method=REGRESSION_OLS):
+    comoments = CoMomentAccumulator()
+    differences = MomentAccumulator()
+    relative = MomentAccumulator()
+    hard_sketch = QuantileSketch()
+    reservoir = PairReservoir() if regression_method == REGRESSION_THEIL_SEN else None
+    cv2_sum = 0.0
+    cv2_count = 0
+
+    for chunk in chunks:
+        analysis_data = prepare_analysis_data(
+            chunk, ["original_value", "duplicate_value"], ["original_value", "duplicate_value"]
+        )
+        x = analysis_data["original_value"].to_numpy(dtype=float)
+        y = analysis_data["duplicate_value"].to_numpy(dtype=float)
+        comoments.update(x, y)
+        differences.update(absolute_differences(x, y))
+        relative_diff = relative_differences(x, y)
+        relative.update(relative_diff[~np.isnan(relative_diff)])
+        hard_sketch.update(hard(x, y))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pair_cv2 = 2 * (x - y) ** 2 / (x + y) ** 2
+        pair_cv2 = pair_cv2[np.isfinite(pair_cv2)]
+        cv2_sum += float(pair_cv2.sum())
+        cv2_count += len(pair_cv2)
+        if reservoir is not None:
+            reservoir.update(x, y)
+
+    if comoments.count == 0:
+        raise ValueError("Aucune donnée numérique valide trouvée pour l'analyse.")
+
+    slope, intercept, r = comoments.regression(regression_method)
+    if reservoir is not None:
+        slope, intercept = theil_sen_regression(reservoir.x, reservoir.y)
+
+    precision = {
+        "hard_median": hard_sketch.quantile(0.5),
+        "hard_90": hard_sketch.quantile(0.9),
+        "hard_pass_rates": {
+            threshold: hard_sketch.rank(threshold) / max(hard_sketch.count, 1) * 100
+            for threshold in HARD_THRESHOLDS
+        },
+        "average_cv": float(np.sqrt(cv2_sum / cv2_count) * 100) if cv2_count else np.nan,
+        # Ces méthodes trient toutes les paires: non disponibles en continu
+        "thompson_howarth": None,
+        "binned": pd.DataFrame()
+    }
+
+    metrics = {
+        "regression_method": regression_method,
+        "slope": float(slope),
+        "intercept": float(intercept),
+        "r": r,
+        "r_squared": r * r,
+        "mean_diff": differences.mean,
+        "mean_relative_diff": relative.mean if relative.count else np.nan,
+        "x_min": comoments.x.min,
+        "x_max": comoments.x.max,
+        "count": comoments.count,
+        "precision": precision
+    }
+
+    stats_dict = {
+        "Méthode de régression": regression_method,
+        "Équation de régression": f"y = {slope:.4f}x + {intercept:.4f}",
+        "Coefficient de corrélation (R²)": f"{metrics['r_squared']:.4f}",
+        "Différence absolue moyenne": f"{metrics['mean_diff']:.4f}",
+        "Différence relative moyenne": f"{metrics['mean_relative_diff']:.2f}%",
+        "HARD médian": f"{precision['hard_median']:.2f}%",
+        "Paires avec HARD ≤ 10%": f"{precision['hard_pass_rates'][10.0]:.1f}%",
+        "CV moyen": f"{precision['average_cv']:.2f}%"
+    }
+
+    return stats_dict, metrics
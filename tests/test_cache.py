@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from geoqaqc_cache import AnalysisMemo, estimate_nbytes
+
+
+def make_results(n=10_000):
+    return pd.DataFrame({
+        "sample_id": [f"S{i}" for i in range(n)],
+        "measured_value": np.linspace(0.5, 1.5, n),
+        "Statut": np.where(np.arange(n) % 7 == 0, "Hors limites", "OK")
+    })
+
+
+def test_shared_views_counted_once():
+    results_df = make_results()
+    display_df = results_df.rename(columns={"measured_value": "Au_ppm"})
+
+    assert estimate_nbytes(results_df, display_df) == estimate_nbytes(results_df)
+    assert estimate_nbytes(display_df, display_df.style) == estimate_nbytes(display_df)
+    copied = results_df.assign(measured_value=results_df["measured_value"] * 2)
+    assert estimate_nbytes(copied, results_df) == estimate_nbytes(results_df) + 8 * len(results_df)
+
+
+def test_figure_payload_counted():
+    results_df = make_results()
+    fig = go.Figure(go.Scattergl(x=np.arange(len(results_df)), y=results_df["measured_value"].to_numpy()))
+
+    assert estimate_nbytes(fig) >= 8 * len(results_df)
+    assert estimate_nbytes({"fig": fig, "figures": [fig]}) == estimate_nbytes(fig)
+
+
+def test_memo_put_estimates_entry_size():
+    memo = AnalysisMemo(max_entries=4, max_bytes=10**9)
+    results_df = make_results()
+    fig = go.Figure(go.Scatter(x=np.arange(len(results_df)), y=results_df["measured_value"].to_numpy()))
+
+    memo.put("a", {"fig": fig, "results": results_df, "styled": results_df.style})
+    assert memo._sizes["a"] == estimate_nbytes(fig) + estimate_nbytes(results_df)
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from geoqaqc_charts import DENSITY_MAX_OUTLIERS, DENSITY_OUTLIER_HARD, add_density_traces
+
+
+def test_density_legend_reports_true_outlier_count():
+    rng = np.random.default_rng(0)
+    n = 3 * DENSITY_MAX_OUTLIERS
+    x = rng.lognormal(0.0, 1.0, n)
+    y = x * rng.normal(1.0, 0.5, n)
+    results_df = pd.DataFrame({"HARD (%)": np.abs(y - x) / (x + y) * 100})
+    total = int((results_df["HARD (%)"] > DENSITY_OUTLIER_HARD).sum())
+
+    fig = go.Figure()
+    add_density_traces(fig, results_df, x, y, log_scale=True)
+    outliers = fig.data[-1]
+
+    assert total > DENSITY_MAX_OUTLIERS
+    assert len(outliers.x) == DENSITY_MAX_OUTLIERS
+    assert f"{total:,}".replace(",", " ") in outliers.name
+    assert "plus éloignées affichées" in outliers.name
+    assert outliers.text.min() >= np.sort(results_df["HARD (%)"].to_numpy())[-DENSITY_MAX_OUTLIERS]
@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from geoqaqc_engine import (
+    LOD_MEAN_STDDEV, LOD_MEDIAN_MAD, LOD_PERCENTILE, LOD_TRIMMED, MAD_TO_STDDEV, REGRESSION_METHODS,
+    REGRESSION_OLS, REGRESSION_RMA, REGRESSION_THEIL_SEN, TOLERANCE_PERCENT, TOLERANCE_STDDEV,
+    analyze_crm, analyze_crm_grouped, calculate_crm_limits, default_standard_params, element_limits,
+    fit_regression, grouped_lod, linear_regression, pair_duplicates, rma_regression, theil_sen_regression
+)
+from geoqaqc_rules import (
+    DEFAULT_RULES, RULE_1_2S, RULE_1_3S, RULE_2_2S, RULE_4_1S, RULE_R_4S, RULE_SHIFT, RULE_TREND,
+    RULES_COLUMN, evaluate_rules
+)
+
+
+# ----------------------------------------
+# LIMITES
+# ----------------------------------------
+
+def test_crm_limits_percent_and_stddev():
+    assert calculate_crm_limits(100.0, TOLERANCE_PERCENT, 10.0) == pytest.approx((90.0, 110.0))
+    assert calculate_crm_limits(100.0, TOLERANCE_STDDEV, 2.0, 5.0) == pytest.approx((90.0, 110.0))
+
+
+def test_crm_limits_require_stddev():
+    with pytest.raises(ValueError):
+        calculate_crm_limits(100.0, TOLERANCE_STDDEV, 2.0, 0)
+    with pytest.raises(ValueError):
+        calculate_crm_limits(100.0, TOLERANCE_STDDEV, 2.0)
+
+
+def test_element_limits_match_scalar_limits():
+    reference_values = [1.0, 50.0, 0.2]
+    tolerance_types = [TOLERANCE_PERCENT, TOLERANCE_STDDEV, TOLERANCE_PERCENT]
+    tolerance_values = [10.0, 3.0, 5.0]
+    reference_stddevs = [0.0, 2.0, 0.01]
+
+    lower, upper = element_limits(reference_values, tolerance_types, tolerance_values, reference_stddevs)
+    for i in range(3):
+        expected = calculate_crm_limits(
+            reference_values[i], tolerance_types[i], tolerance_values[i], reference_stddevs[i] or None
+        )
+        assert (lower[i], upper[i]) == pytest.approx(expected)
+
+
+def test_analyze_crm_status_bounds_inclusive():
+    data = pd.DataFrame({"sample_id": ["A", "B", "C", "D", "E"], "measured_value": [95, 110, 120, 89.9, "n.d."]})
+    results_df, stats_dict, metrics = analyze_crm(data, 100.0, TOLERANCE_PERCENT, 10.0)
+
+    assert results_df["Statut"].astype(str).tolist() == ["OK", "OK", "Hors limites", "Hors limites"]
+    assert results_df["Écart (%)"].to_numpy() == pytest.approx([-5.0, 10.0, 20.0, -10.1])
+    assert (metrics["lower_limit"], metrics["upper_limit"]) == pytest.approx((90.0, 110.0))
+    assert RULES_COLUMN in results_df
+
+
+def test_analyze_crm_grouped_stats_per_standard():
+    data = pd.DataFrame({
+        "sample_id": [f"S{i}" for i in range(6)],
+        "standard_id": ["A", "B", "A", "B", "A", "B"],
+        "measured_value": [1.0, 2.0, 1.2, 2.1, 0.95, 1.5]
+    })
+    params = default_standard_params(["A", "B"])
+    params["reference_value"] = [1.0, 2.0]
+    _, stats_dict, _ = analyze_crm_grouped(data, params)
+
+    assert stats_dict["A - Moyenne / Référence"] == "1.0500 / 1.0000"
+    assert stats_dict["A - Hors limites"] == "1 / 3"
+    assert stats_dict["B - Moyenne / Référence"] == "1.8667 / 2.0000"
+    assert stats_dict["B - Hors limites"] == "1 / 3"
+
+
+# ----------------------------------------
+# LIMITES DE DÉTECTION
+# ----------------------------------------
+
+def trimmed_lod(values, k=3):
+    values = np.sort(values)
+    cut = int(np.floor(0.1 * len(values)))
+    kept = values[cut:len(values) - cut]
+    return kept.mean() + k * kept.std()
+
+
+@pytest.mark.parametrize("method, reference", [
+    (LOD_MEAN_STDDEV, lambda v: v.mean() + 3 * v.std()),
+    (LOD_MEDIAN_MAD, lambda v: np.median(v) + 3 * MAD_TO_STDDEV * np.median(np.abs(v - np.median(v)))),
+    (LOD_PERCENTILE, lambda v: np.quantile(v, 0.99)),
+    (LOD_TRIMMED, trimmed_lod),
+])
+def test_grouped_lod_matches_per_group_estimator(method, reference):
+    rng = np.random.default_rng(5)
+    sizes = [1, 2, 37, 500]
+    values = rng.lognormal(-3.0, 0.5, sum(sizes))
+    codes = np.repeat(np.arange(len(sizes)), sizes)
+    shuffle = rng.permutation(len(values))
+
+    lod = grouped_lod(values[shuffle], codes[shuffle], len(sizes) + 1, method)
+
+    expected = [reference(values[codes == g]) for g in range(len(sizes))]
+    assert lod[:len(sizes)] == pytest.approx(expected)
+    assert np.isnan(lod[-1])
+
+
+def test_grouped_lod_unknown_method():
+    with pytest.raises(ValueError):
+        grouped_lod(np.ones(3), np.zeros(3, dtype=np.int64), 1, "inconnu")
+
+
+# ----------------------------------------
+# RÉGRESSIONS
+# ----------------------------------------
+
+@pytest.mark.parametrize("method", REGRESSION_METHODS)
+def test_regressions_recover_exact_line(method):
+    x = np.linspace(0.1, 10.0, 50)
+    slope, intercept = fit_regression(x, 2.0 * x + 1.0, method)
+    assert (slope, intercept) == pytest.approx((2.0, 1.0))
+
+
+def test_ols_and_rma_against_numpy():
+    rng = np.random.default_rng(1)
+    x = rng.normal(5.0, 1.0, 200)
+    y = 0.8 * x + rng.normal(0.0, 0.5, 200)
+
+    slope, intercept, r = linear_regression(x, y)
+    assert (slope, intercept) == pytest.approx(tuple(np.polyfit(x, y, 1)))
+    assert r == pytest.approx(np.corrcoef(x, y)[0, 1])
+
+    rma_slope, rma_intercept = rma_regression(x, y)
+    assert rma_slope == pytest.approx(np.std(y) / np.std(x))
+    assert rma_intercept == pytest.approx(y.mean() - rma_slope * x.mean())
+    assert rma_slope == pytest.approx(slope / r)
+
+
+def test_theil_sen_resists_outliers_and_sampling():
+    rng = np.random.default_rng(2)
+    x = rng.uniform(0.0, 10.0, 400)
+    y = 1.5 * x + rng.normal(0.0, 0.05, 400)
+    y[:20] += 50.0
+
+    slope, intercept = theil_sen_regression(x, y)
+    assert slope == pytest.approx(1.5, abs=0.02)
+    assert intercept == pytest.approx(0.0, abs=0.1)
+
+    sampled_slope, _ = theil_sen_regression(x, y, max_exact=10, sample_pairs=200_000)
+    assert sampled_slope == pytest.approx(slope, abs=0.01)
+
+
+def test_theil_sen_degenerate_and_unknown_method():
+    assert np.isnan(theil_sen_regression(np.ones(5), np.arange(5.0))[0])
+    with pytest.raises(ValueError):
+        fit_regression(np.arange(3.0), np.arange(3.0), "inconnue")
+    assert fit_regression(np.arange(3.0), np.arange(3.0), REGRESSION_OLS) == pytest.approx((1.0, 0.0))
+    assert fit_regression(np.arange(3.0), -np.arange(3.0), REGRESSION_RMA) == pytest.approx((-1.0, 0.0))
+    assert fit_regression(np.arange(3.0), np.arange(3.0), REGRESSION_THEIL_SEN) == pytest.approx((1.0, 0.0))
+
+
+# ----------------------------------------
+# APPARIEMENT DES DUPLICATAS
+# ----------------------------------------
+
+def test_pair_duplicates():
+    data = pd.DataFrame({
+        "sample_id": ["S1", " S2 ", "S3", "S1", "D1", "D2", "D3", "D4", "D5"],
+        "parent_id": [None, "", None, None, "S1", "S2", "S2", "S9", " S3"],
+        "measured_value": [1.0, 2.0, 3.0, 9.0, 1.1, 2.1, 2.2, 5.0, "x"]
+    })
+    pairs, pairing = pair_duplicates(data)
+
+    assert pairs["original_id"].tolist() == ["S1", "S2", "S2", "S3"]
+    assert pairs["duplicate_id"].tolist() == ["D1", "D2", "D3", "D5"]
+    # Identifiant d'original répété: la première ligne est retenue
+    assert pairs["original_value"].tolist() == [1.0, 2.0, 2.0, 3.0]
+    assert pairs["duplicate_value"].iloc[:3].tolist() == [1.1, 2.1, 2.2]
+    assert np.isnan(pairs["duplicate_value"].iloc[3])
+
+    assert pairing["originals"] == 3
+    assert pairing["duplicates"] == 5
+    assert pairing["pairs"] == 4
+    assert pairing["orphans"] == 1
+    assert pairing["orphan_ids"].to_dict("records") == [{"duplicate_id": "D4", "parent_id": "S9"}]
+    assert pairing["multi_duplicates"] == 1
+    assert pairing["repeated_originals"] == 1
+
+
+# ----------------------------------------
+# RÈGLES DE WESTGARD
+# ----------------------------------------
+
+def flagged(z, rule):
+    return np.flatnonzero(evaluate_rules(np.asarray(z, dtype=float), 0.0, 1.0)[rule]).tolist()
+
+
+def test_single_point_rules():
+    z = [0.0, 2.5, -3.5, 0.5, -2.1]
+    assert flagged(z, RULE_1_2S) == [1, 2, 4]
+    assert flagged(z, RULE_1_3S) == [2]
+
+
+def test_consecutive_rules():
+    assert flagged([0.0, 2.5, 2.2, -2.5, 0.0], RULE_2_2S) == [1, 2]
+    assert flagged([0.0, 2.5, -2.5, 0.0, -2.1], RULE_R_4S) == [1, 2]
+    assert flagged([0.5, 1.5, 1.2, 1.1, 1.3, -0.5, -1.5, -1.5, -1.5], RULE_4_1S) == [1, 2, 3, 4]
+    assert flagged([0.1] * 7 + [-0.1] * 6, RULE_SHIFT) == list(range(7))
+    assert flagged([0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.3, 0.2, 0.1], RULE_TREND) == [0, 1, 2, 3, 4, 5]
+    assert flagged([0.0, 0.1, 0.2, 0.3, 0.4, 0.3], RULE_TREND) == []
+
+
+def test_interleaved_groups_evaluated_separately():
+    rng = np.random.default_rng(4)
+    a = rng.normal(0.3, 1.0, 60)
+    b = rng.normal(-0.3, 1.0, 40)
+    # Ordre d'analyse intercalé, ordre conservé au sein de chaque série
+    in_a = rng.permutation(np.arange(100) < 60)
+    values = np.empty(100)
+    values[in_a] = a
+    values[~in_a] = b
+    flags = evaluate_rules(values, 0.0, 1.0, groups=np.where(in_a, "A", "B"))
+
+    expected_a = evaluate_rules(a, 0.0, 1.0)
+    expected_b = evaluate_rules(b, 0.0, 1.0)
+    for rule in DEFAULT_RULES:
+        assert (flags[rule].to_numpy()[in_a] == expected_a[rule].to_numpy()).all()
+        assert (flags[rule].to_numpy()[~in_a] == expected_b[rule].to_numpy()).all()
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from geoqaqc_history import CRMHistory, state_summary
+from geoqaqc_rules import RULES_COLUMN, evaluate_rules, rules_summary
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(3)
+    n = 1000
+    values = rng.normal(1.0, 0.05, n) + np.sin(np.arange(n) / 40) * 0.05
+    return pd.DataFrame({"sample_id": [f"S{i}" for i in range(n)], "measured_value": values})
+
+
+def append_in_batches(history, data, sizes):
+    start = 0
+    state = None
+    for size in sizes:
+        state, _ = history.append("OREAS-501", "Au", data.iloc[start:start + size], 1.0, 0.9, 1.1, 0.05)
+        start += size
+    return state
+
+
+@pytest.mark.parametrize("sizes", [[1000], [500, 500], [333, 1, 2, 300, 364], [7] * 142 + [6]])
+def test_incremental_rules_match_full_evaluation(tmp_path, series, sizes):
+    history = CRMHistory(str(tmp_path))
+    state = append_in_batches(history, series, sizes)
+
+    flags = evaluate_rules(series["measured_value"].to_numpy(), 1.0, 0.05)
+    expected = rules_summary(flags)
+
+    assert state["rule_counts"] == {rule: int(count) for rule, count in flags.sum().items()}
+    assert state["flagged_points"] == int((expected != "").sum())
+    loaded = history.load("OREAS-501", "Au")
+    assert (loaded[RULES_COLUMN].to_numpy() == expected).all()
+
+
+def test_flagged_points_counted_once(tmp_path, series):
+    history = CRMHistory(str(tmp_path))
+    state = append_in_batches(history, series, [1000])
+
+    summary = state_summary(state)
+    assert summary["Signalements (règles)"] == state["flagged_points"]
+    assert summary["Signalements (règles)"] <= sum(state["rule_counts"].values())
+
+
+def test_duplicate_batch_not_appended(tmp_path, series):
+    history = CRMHistory(str(tmp_path))
+    append_in_batches(history, series, [500])
+
+    state, added = history.append("OREAS-501", "Au", series.iloc[:500], 1.0, 0.9, 1.1, 0.05)
+    assert added == 0
+    assert state["count"] == 500
+    assert "batch_digests" not in history.state("OREAS-501", "Au")
@@ -0,0 +1,37 @@
+from io import BytesIO
+
+from openpyxl import Workbook
+
+from geoqaqc_io import SHEET_COLUMN, read_excel_sheets
+
+
+def workbook_bytes(sheets):
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for name, rows in sheets.items():
+        sheet = workbook.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_multiple_sheets_keep_origin():
+    file = workbook_bytes({"Lot 1": [["Échantillon", "Au"], ["S1", 1.0]], "Lot 2": [["Échantillon", "Au"], ["S2", 2.0]]})
+    df = read_excel_sheets(file, ["Lot 1", "Lot 2"])
+
+    assert df[SHEET_COLUMN].tolist() == ["Lot 1", "Lot 2"]
+    assert df["Au"].tolist() == [1.0, 2.0]
+
+
+def test_sheet_column_does_not_collide():
+    file = workbook_bytes({
+        "Lot 1": [[SHEET_COLUMN, "Au"], ["F-12", 1.0]],
+        "Lot 2": [["Échantillon", "Au"], ["S2", 2.0]]
+    })
+    df = read_excel_sheets(file, ["Lot 1", "Lot 2"])
+
+    assert df[f"{SHEET_COLUMN}_2"].tolist() == ["Lot 1", "Lot 2"]
+    assert df[SHEET_COLUMN].iloc[0] == "F-12"
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from geoqaqc_engine import (
+    LOD_MEAN_STDDEV, LOD_METHODS, REGRESSION_OLS, REGRESSION_RMA, REGRESSION_THEIL_SEN, TOLERANCE_PERCENT,
+    analyze_blanks, analyze_crm, analyze_duplicates
+)
+from geoqaqc_stream import SKETCH_RELATIVE_ACCURACY, stream_blanks, stream_crm, stream_duplicates
+
+N = 50_003
+
+
+def chunks(df, size):
+    return (df.iloc[start:start + size] for start in range(0, len(df), size))
+
+
+@pytest.fixture(scope="module")
+def rng():
+    return np.random.default_rng(11)
+
+
+@pytest.fixture(scope="module")
+def crm_data(rng):
+    # Dérive lente pour déclencher les règles de série à cheval sur les blocs
+    values = 1.0 + np.cumsum(rng.normal(0.0, 0.01, N)) * 0.05 + rng.normal(0.0, 0.05, N)
+    values[rng.random(N) < 0.001] = np.nan
+    return pd.DataFrame({"sample_id": np.arange(N).astype(str), "measured_value": values})
+
+
+@pytest.fixture(scope="module")
+def blank_data(rng):
+    values = rng.lognormal(-3.0, 1.0, N)
+    values[:20] = 0.0
+    return pd.DataFrame({"sample_id": np.arange(N).astype(str), "measured_value": values})
+
+
+@pytest.fixture(scope="module")
+def duplicate_data(rng):
+    x = rng.lognormal(0.0, 1.0, N)
+    return pd.DataFrame({"original_value": x, "duplicate_value": x * rng.normal(1.0, 0.1, N)})
+
+
+@pytest.mark.parametrize("chunk_size", [1_000, 7_777, N])
+@pytest.mark.parametrize("reference_stddev", [0.05, 0])
+def test_crm_stream_matches_in_memory(crm_data, chunk_size, reference_stddev):
+    results_df, _, metrics = analyze_crm(crm_data.copy(), 1.0, TOLERANCE_PERCENT, 10.0, reference_stddev)
+    _, stream_metrics = stream_crm(chunks(crm_data, chunk_size), 1.0, TOLERANCE_PERCENT, 10.0, reference_stddev)
+
+    for key in ("mean", "std", "min", "max", "lower_limit", "upper_limit"):
+        assert stream_metrics[key] == pytest.approx(metrics[key], rel=1e-10)
+    assert stream_metrics["failures"] == int((results_df["Statut"] == "Hors limites").sum())
+    if reference_stddev:
+        assert stream_metrics["rule_counts"] == metrics["rule_counts"]
+        assert stream_metrics["rule_flagged"] == metrics["rule_flagged"]
+
+
+@pytest.mark.parametrize("lod_method", LOD_METHODS)
+def test_blank_stream_lod_close_to_in_memory(blank_data, lod_method):
+    _, _, metrics = analyze_blanks(blank_data.copy(), lod_method)
+    _, stream_metrics = stream_blanks(chunks(blank_data, 7_777), lod_method)
+
+    if lod_method == LOD_MEAN_STDDEV:
+        assert stream_metrics["lod"] == pytest.approx(metrics["lod"], rel=1e-10)
+    else:
+        # Estimateurs par quantiles: erreur relative bornée par le croquis
+        assert stream_metrics["lod"] == pytest.approx(metrics["lod"], rel=2 * SKETCH_RELATIVE_ACCURACY)
+    assert stream_metrics["mean"] == pytest.approx(metrics["mean"], rel=1e-10)
+    assert stream_metrics["max"] == metrics["max"]
+
+
+@pytest.mark.parametrize("method", [REGRESSION_OLS, REGRESSION_RMA])
+def test_duplicate_stream_regression_exact(duplicate_data, method):
+    _, _, metrics = analyze_duplicates(duplicate_data.copy(), method)
+    _, stream_metrics = stream_duplicates(chunks(duplicate_data, 7_777), method)
+
+    for key in ("slope", "intercept", "r", "mean_diff", "mean_relative_diff", "x_min", "x_max"):
+        assert stream_metrics[key] == pytest.approx(metrics[key], rel=1e-9)
+    assert stream_metrics["precision"]["average_cv"] == pytest.approx(metrics["precision"]["average_cv"])
+    assert stream_metrics["precision"]["hard_median"] == pytest.approx(
+        metrics["precision"]["hard_median"], rel=2 * SKETCH_RELATIVE_ACCURACY
+    )
+
+
+def test_duplicate_stream_theil_sen_close(duplicate_data):
+    _, _, metrics = analyze_duplicates(duplicate_data.copy(), REGRESSION_THEIL_SEN)
+    _, stream_metrics = stream_duplicates(chunks(duplicate_data, 7_777), REGRESSION_THEIL_SEN)
+
+    # Réservoir de paires: estimation proche de la pente calculée sur toutes les paires
+    assert stream_metrics["slope"] == pytest.approx(metrics["slope"], abs=0.01)
+    assert stream_metrics["intercept"] == pytest.approx(metrics["intercept"], abs=0.01)